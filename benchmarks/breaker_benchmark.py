@@ -0,0 +1,55 @@
+"""
+Benchmark the cost of the circuit breaker on healthy and on failing endpoints
+"""
+import os
+import sys
+import timeit
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.breaker import CircuitBreaker  # noqa: E402
+from eskiz.exception import CircuitOpen  # noqa: E402
+
+NUMBER = 200000
+ENDPOINT = "/api/message/sms/send"
+
+
+def report(label, statement):
+    """
+    Print the mean cost of `statement` in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=NUMBER, repeat=3))
+    print(f"{label:<40} {seconds / NUMBER * 1e6:8.3f} us/call")
+
+
+def run_benchmark():
+    """
+    Time a guarded successful attempt and a request rejected by an open circuit
+    """
+    print("Eskiz.uz circuit breaker benchmark")
+    print("==================================")
+
+    closed = CircuitBreaker()
+
+    def guarded():
+        with closed.guard(ENDPOINT) as call:
+            call.status = 200
+
+    opened = CircuitBreaker(window_size=1, min_calls=1, open_duration=3600)
+    with opened.guard(ENDPOINT) as call:
+        call.status = 503
+
+    def rejected():
+        try:
+            opened.check(ENDPOINT)
+        except CircuitOpen:
+            pass
+
+    report("closed circuit, guarded attempt", guarded)
+    report("open circuit, rejected request", rejected)
+    print("(an unguarded request to an unresponsive endpoint waits for the 60s timeout)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
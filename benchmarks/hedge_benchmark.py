@@ -0,0 +1,69 @@
+"""
+Benchmark the tail latency of send_sms with and without hedging
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.hedge import HedgePolicy  # noqa: E402
+from tests.mock_server import make_mock_server  # noqa: E402
+
+CALLS = 500
+# Share of sends the mock server answers slowly, and how slowly
+SLOW_RATE = 0.02
+SLOW_SECONDS = 0.3
+
+
+def bench(label, client, httpd):
+    """
+    Time CALLS send_sms calls with the same slow sends and print their latency quantiles
+    """
+    rng = random.Random(42)
+    latencies = []
+    for _ in range(CALLS):
+        if rng.random() < SLOW_RATE:
+            httpd.send_delays.append(SLOW_SECONDS)
+        started = time.perf_counter()
+        client.send_sms(998901234567, "Your code is 1234")
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{label:<24} {p50 * 1e3:8.2f} {p99 * 1e3:8.2f} {latencies[-1] * 1e3:8.2f}")
+
+
+def run_benchmark():
+    """
+    Compare send_sms latencies without hedging and with a HedgePolicy
+    """
+    print("Eskiz.uz hedged requests benchmark")
+    print("==================================")
+
+    httpd = make_mock_server(0, keep_alive=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    network = f"http://localhost:{httpd.server_address[1]}"
+
+    policy = HedgePolicy()
+    print(f"{'':<24} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    with ClientSync(email="test@example.com", password="password", network=network,
+                    token="mock_token_12345") as plain:
+        bench("send_sms", plain, httpd)
+    with ClientSync(email="test@example.com", password="password", network=network,
+                    token="mock_token_12345", hedge_policy=policy) as hedged:
+        bench("send_sms, hedged", hedged, httpd)
+    httpd.shutdown()
+
+    stats = policy.stats.snapshot()
+    print()
+    print(f"hedged {stats['hedged']} of {stats['requests']} sends, {stats['wins']} hedges won, "
+          f"{stats['suppressed']} suppressed by the budget")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,60 @@
+"""
+Benchmark the cost of the lifecycle hooks and show where the time of a call goes
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.enum import Phase  # noqa: E402
+from eskiz.hooks import PhaseTimings  # noqa: E402
+from tests.mock_server import make_mock_server  # noqa: E402
+
+CALLS = 2000
+
+
+def bench(label, client, count):
+    """
+    Time `count` send_sms calls and print the mean duration of one
+    """
+    started = time.perf_counter()
+    for _ in range(count):
+        client.send_sms(998901234567, "Hello")
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed / count * 1e6:8.1f} us/call")
+
+
+def run_benchmark():
+    """
+    Compare send_sms without hooks and with PhaseTimings, then print the phase quantiles
+    """
+    print("Eskiz.uz lifecycle hooks benchmark")
+    print("==================================")
+
+    httpd = make_mock_server(0, keep_alive=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    network = f"http://localhost:{httpd.server_address[1]}"
+
+    timings = PhaseTimings(buckets=[i / 100000 for i in range(1, 1000)])
+    plain = ClientSync(email="test@example.com", password="password", network=network, token="mock_token_12345")
+    traced = ClientSync(
+        email="test@example.com", password="password", network=network, token="mock_token_12345", hooks=timings
+    )
+    bench("send_sms, no hooks", plain, CALLS)
+    bench("send_sms, PhaseTimings", traced, CALLS)
+    httpd.shutdown()
+
+    print()
+    print(f"{'phase':<12} {'p50 us':>8} {'p99 us':>8}")
+    histograms = timings.snapshot()
+    for phase in Phase:
+        histogram = histograms[("/api/message/sms/send", phase)]
+        print(f"{phase.value:<12} {histogram.quantile(0.5) * 1e6:8.1f} {histogram.quantile(0.99) * 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
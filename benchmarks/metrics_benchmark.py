@@ -0,0 +1,76 @@
+"""
+Benchmark the per-request overhead of the metrics, disabled and enabled
+"""
+import os
+import sys
+import threading
+import timeit
+
+import requests
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.client.http import HttpClient  # noqa: E402
+from eskiz.metrics import MetricsRegistry, PrometheusExporter  # noqa: E402
+from tests.mock_server import make_mock_server  # noqa: E402
+
+NUMBER = 50000
+REQUESTS = 2000
+URL = "https://notify.eskiz.uz/api/user/get-limit"
+HEADERS = {"Authorization": "Bearer mock_token_12345"}
+
+
+class CannedSession:
+    """
+    Session answering every request with the same parsed response, so only
+    the client's own work is measured
+    """
+    def __init__(self):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = b'{"status": "success", "data": {"balance": 1000}}'
+        response.request = requests.Request("GET", URL).prepare()
+        self.response = response
+
+    def request(self, **kwargs):
+        return self.response
+
+
+def report(label, statement, number):
+    """
+    Print the mean cost of `statement` in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print(f"{label:<44} {seconds / number * 1e6:8.2f} us/request")
+
+
+def run_benchmark():
+    """
+    Compare a client without metrics with one recording into a MetricsRegistry
+    """
+    print("Eskiz.uz metrics overhead benchmark")
+    print("===================================")
+
+    session = CannedSession()
+    plain = HttpClient(session=session)
+    registry = MetricsRegistry()
+    measured = HttpClient(session=session, metrics=registry)
+    report("client only, metrics disabled", lambda: plain.request("GET", URL, headers=HEADERS), NUMBER)
+    report("client only, MetricsRegistry", lambda: measured.request("GET", URL, headers=HEADERS), NUMBER)
+
+    httpd = make_mock_server(0, keep_alive=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://localhost:{httpd.server_address[1]}/api/user/get-limit"
+    plain = HttpClient()
+    measured = HttpClient(metrics=MetricsRegistry())
+    report("mock server, metrics disabled", lambda: plain.request("GET", url, headers=HEADERS), REQUESTS)
+    report("mock server, MetricsRegistry", lambda: measured.request("GET", url, headers=HEADERS), REQUESTS)
+    httpd.shutdown()
+
+    report("PrometheusExporter.render", PrometheusExporter(registry).render, 1000)
+
+
+if __name__ == "__main__":
+    run_benchmark()
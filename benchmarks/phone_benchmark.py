@@ -0,0 +1,60 @@
+"""
+Micro-benchmarks of the per-number cost of normalizing phone numbers
+"""
+import os
+import re
+import sys
+import timeit
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.phone import normalize_messages, normalize_numbers  # noqa: E402
+
+NUMBER = 20
+BATCH_SIZE = 10000
+
+FORMATS = ["+998 90 {0:03d}-{1:02d}-{2:02d}", "99890{0:03d}{1:02d}{2:02d}", "090{0:03d}{1:02d}{2:02d}",
+           "(90) {0:03d} {1:02d} {2:02d}", "90{0:03d}{1:02d}{2:02d}", "9989{0:03d}"]
+BATCH = [FORMATS[i % len(FORMATS)].format(i % 1000, i % 100, i % 97) for i in range(BATCH_SIZE)]
+MESSAGES = [{"user_sms_id": str(i), "to": number, "text": "Your code is 1234"} for i, number in enumerate(BATCH)]
+
+PATTERN = re.compile(r"(?:(?:\+|00)?998|[08])?(\d{9})")
+
+
+def normalize_loop(numbers):
+    """
+    Reference implementation normalizing one number at a time
+    """
+    values, rejected = [], []
+    for number in numbers:
+        digits = re.sub(r"[\s\-().]", "", str(number))
+        match = PATTERN.fullmatch(digits)
+        values.append(int("998" + match.group(1)) if match else 0)
+        rejected.append(match is None)
+    return values, rejected
+
+
+def report(label, statement, number=NUMBER, per=BATCH_SIZE):
+    """
+    Print the mean cost of `statement` per number in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print(f"{label:<48} {seconds / number / per * 1e6:8.3f} us/number")
+
+
+def run_benchmark():
+    """
+    Compare the batch normalizer with a per-number loop
+    """
+    print("Eskiz.uz phone normalization benchmark")
+    print("======================================")
+
+    assert tuple(normalize_numbers(BATCH)) == normalize_loop(BATCH)
+    report("per-number loop", lambda: normalize_loop(BATCH))
+    report("normalize_numbers", lambda: normalize_numbers(BATCH))
+    report("normalize_messages", lambda: normalize_messages(MESSAGES))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,60 @@
+"""
+Benchmark requests/sec against the mock server with and without connection pooling
+"""
+import os
+import sys
+import threading
+import time
+
+import requests
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.client.http import HttpClient  # noqa: E402
+from tests.mock_server import make_mock_server  # noqa: E402
+
+REQUESTS = 2000
+
+
+def bench(label, send, count=REQUESTS):
+    """
+    Run `send` `count` times and print the throughput
+    """
+    started = time.perf_counter()
+    for _ in range(count):
+        send()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {count / elapsed:10.1f} req/s")
+
+
+def run_benchmark():
+    """
+    Compare per-call connections with a pooled keep-alive session
+    """
+    httpd = make_mock_server(0, keep_alive=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://localhost:{httpd.server_address[1]}/api/user/get-limit"
+    headers = {"Authorization": "Bearer mock_token_12345"}
+
+    def unpooled():
+        response = requests.request("GET", url, headers=headers, timeout=60)
+        response.raise_for_status()
+        response.json()
+
+    client = HttpClient()
+
+    def pooled():
+        client.request("GET", url, headers=headers)
+
+    print("Eskiz.uz HTTP pool benchmark")
+    print("============================")
+    bench("without pool", unpooled)
+    bench("with pool", pooled)
+
+    client.close()
+    httpd.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark()
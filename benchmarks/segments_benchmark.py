@@ -0,0 +1,67 @@
+"""
+Micro-benchmarks of the per-message cost of counting SMS segments
+"""
+import os
+import sys
+import timeit
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.segments import GSM7_BASIC, GSM7_EXTENDED, count_parts, estimate_cost  # noqa: E402
+
+NUMBER = 100000
+BATCH_SIZE = 10000
+
+TEXTS = {
+    "latin (1 part)": "Your verification code is 123456. Do not share it with anyone.",
+    "latin (3 parts)": "Hello {name}, your order #12345 has shipped. " * 8,
+    "uzbek cyrillic (1 part)": "Сизнинг тасдиқлаш кодингиз 123456.",
+    "uzbek cyrillic (3 parts)": "Ҳурматли мижоз, буюртмангиз йўлга чиқди. " * 4,
+}
+BATCH = [f"Hello user{i}, your code is {i:06d}" for i in range(BATCH_SIZE // 2)] + \
+    [f"Салом user{i}, кодингиз {i:06d}" for i in range(BATCH_SIZE // 2)]
+
+
+def count_parts_loop(text):
+    """
+    Reference implementation checking one character at a time
+    """
+    septets = 0
+    for char in text:
+        if char in GSM7_BASIC:
+            septets += 1
+        elif char in GSM7_EXTENDED:
+            septets += 2
+        else:
+            units = len(text.encode("utf-16-le")) // 2
+            return 1 if units <= 70 else -(-units // 67)
+    return 1 if septets <= 160 else -(-septets // 153)
+
+
+def report(label, statement, number=NUMBER, per=1):
+    """
+    Print the mean cost of `statement` per message in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print(f"{label:<48} {seconds / number / per * 1e6:8.3f} us/message")
+
+
+def run_benchmark():
+    """
+    Compare the table-driven counter with a per-character loop
+    """
+    print("Eskiz.uz segment benchmark")
+    print("==========================")
+
+    for name, text in TEXTS.items():
+        assert count_parts(text) == count_parts_loop(text)
+        report(f"{name} (per-character loop)", lambda: count_parts_loop(text))
+        report(f"{name} (table-driven)", lambda: count_parts(text))
+
+    batch_number = max(1, NUMBER // BATCH_SIZE)
+    report("estimate_cost of a mixed batch", lambda: estimate_cost(BATCH), number=batch_number, per=BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    run_benchmark()
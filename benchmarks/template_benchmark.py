@@ -0,0 +1,49 @@
+"""
+Micro-benchmarks of the per-message cost of rendering templates
+"""
+import os
+import sys
+import timeit
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.template import CompiledTemplate  # noqa: E402
+
+NUMBER = 10
+BATCH_SIZE = 100000
+
+TEMPLATE = "Hello, {name}! Your order {order} will arrive on {date}."
+COLUMNS = {
+    "name": [f"user{i}" for i in range(BATCH_SIZE)],
+    "order": list(range(BATCH_SIZE)),
+    "date": ["2024-05-01"] * BATCH_SIZE,
+}
+ROWS = [dict(zip(COLUMNS, values)) for values in zip(*COLUMNS.values())]
+
+
+def report(label, statement, number=NUMBER, per=BATCH_SIZE):
+    """
+    Print the mean cost of `statement` per message in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print(f"{label:<40} {seconds / number / per * 1e6:8.3f} us/message")
+
+
+def run_benchmark():
+    """
+    Compare str.format per message with the compiled batch renderer
+    """
+    print("Eskiz.uz template benchmark")
+    print("===========================")
+
+    template = CompiledTemplate(TEMPLATE)
+    report("str.format per message", lambda: [TEMPLATE.format(**row) for row in ROWS])
+    report("render per message", lambda: [template.render(**row) for row in ROWS])
+    report("format per message", lambda: [template.format(**row) for row in ROWS])
+    report("render_batch (validated)", lambda: template.render_batch(COLUMNS))
+    report("render_batch (not validated)", lambda: template.render_batch(COLUMNS, validate=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
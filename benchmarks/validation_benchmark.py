@@ -0,0 +1,97 @@
+"""
+Micro-benchmarks of the per-message CPU cost of building requests and parsing responses
+"""
+import json
+import os
+import sys
+import timeit
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz import request as eskiz_request  # noqa: E402
+from eskiz import response as eskiz_response  # noqa: E402
+from eskiz.client.validation import send_sms_files, prepare_batch_messages  # noqa: E402
+
+NUMBER = 20000
+BATCH_SIZE = 1000
+
+SEND_FIELDS = {
+    "phone_number": 998901234567,
+    "message": "Your verification code is 123456",
+    "from_": "4546",
+    "callback_url": "",
+}
+SEND_RESPONSE = {"id": "e837dec2-2f5a-44a9-a1d1-6fcc13e94d86", "message": "Waiting for SMS provider", "status": "waiting"}
+BATCH = [
+    {"user_sms_id": f"msg{i}", "to": 998901234567 + i, "text": "Your verification code is 123456"}
+    for i in range(BATCH_SIZE)
+]
+
+
+def report(label, statement, number=NUMBER, per=1):
+    """
+    Print the mean cost of `statement` per message in microseconds
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=5))
+    print(f"{label:<44} {seconds / number / per * 1e6:8.3f} us/message")
+
+
+def baseline_send():
+    """
+    Build a send request and parse its response as the clients did before the fast path
+    """
+    files = eskiz_request.SendSMSRequest(
+        phone_number=SEND_FIELDS["phone_number"],
+        message=SEND_FIELDS["message"],
+        from_=SEND_FIELDS["from_"],
+        callback_url=SEND_FIELDS["callback_url"],
+    ).to_file()
+    return files, eskiz_response.SendSMSResponse(**SEND_RESPONSE)
+
+
+def client_send(validate):
+    """
+    Build a send request and parse its response as the clients do with `validate`
+    """
+    files = send_sms_files(
+        SEND_FIELDS["phone_number"], SEND_FIELDS["message"], SEND_FIELDS["from_"], SEND_FIELDS["callback_url"], validate
+    )
+    return files, eskiz_response.SendSMSResponse(**SEND_RESPONSE)
+
+
+def baseline_batch_body():
+    """
+    Encode a batch request body as the clients did before batch validation existed
+    """
+    return json.dumps({"messages": BATCH, "from": "4546"})
+
+
+def client_batch_body(validate_batches):
+    """
+    Encode a batch request body as the clients do with `validate_batches`
+    """
+    return json.dumps({"messages": prepare_batch_messages(BATCH, validate_batches), "from": "4546"})
+
+
+def run_benchmark():
+    """
+    Compare the send paths of the clients with the baseline they replaced
+    """
+    print("Eskiz.uz validation benchmark")
+    print("=============================")
+
+    report("send_sms request + response (baseline)", baseline_send)
+    report("send_sms (default, validate=True)", lambda: client_send(True))
+    report("send_sms (validate=False)", lambda: client_send(False))
+
+    batch_number = max(1, NUMBER // BATCH_SIZE)
+    report("send_batch_sms body (baseline)", baseline_batch_body, number=batch_number, per=BATCH_SIZE)
+    report("send_batch_sms body (default)",
+           lambda: client_batch_body(False), number=batch_number, per=BATCH_SIZE)
+    report("send_batch_sms body (validate_batches=True)",
+           lambda: client_batch_body(True), number=batch_number, per=BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    run_benchmark()
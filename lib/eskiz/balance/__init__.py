@@ -0,0 +1,4 @@
+"""
+local balance tracking for eskiz
+"""
+from .accountant import BalanceAccountant, Reservation # noqa
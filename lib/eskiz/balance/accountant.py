@@ -0,0 +1,289 @@
+"""
+the locally tracked SMS balance
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import ContextManager, Dict, Iterator, Optional, Tuple
+
+from eskiz.exception import InsufficientBalance
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESYNC_INTERVAL = 300
+DEFAULT_RESYNC_PARTS = 1000
+DEFAULT_DRIFT_TOLERANCE = 0
+
+
+class BalanceAccountant:
+    """
+    Tracks the account balance locally between get-limit requests
+
+    The balance is fetched once, then every send is charged locally by its
+    number of parts times `part_price`. A charge is held as in flight until
+    the request completes, then either settled or refunded. A charge made
+    before a resync is not added to the spent amount when it settles, as
+    the fetched balance may include it already. The balance is fetched again
+    every `resync_interval` seconds, after `resync_parts` parts, or after
+    `invalidate`. All methods are safe to call from threads and from
+    asyncio tasks; none of them block on I/O.
+
+    The accountant does not fetch the balance itself: clients given one as
+    `balance` resync it before a send when `claim_sync` says so.
+    """
+    def __init__(
+        self,
+        part_price: float = 1,
+        resync_interval: float = DEFAULT_RESYNC_INTERVAL,
+        resync_parts: int = DEFAULT_RESYNC_PARTS,
+        drift_tolerance: float = DEFAULT_DRIFT_TOLERANCE,
+    ):
+        """
+        Args:
+            part_price: Balance charged per SMS part
+            resync_interval: Seconds after which the balance is fetched again
+            resync_parts: Number of locally charged parts after which the balance is fetched again
+            drift_tolerance: Difference from the fetched balance logged as drift when exceeded
+        """
+        self.part_price = part_price
+        self.resync_interval = resync_interval
+        self.resync_parts = resync_parts
+        self.drift_tolerance = drift_tolerance
+        self.last_drift = 0.0
+        self._lock = threading.Lock()
+        self._balance: Optional[float] = None
+        self._spent = 0.0
+        self._in_flight = 0.0
+        self._reserved = 0.0
+        self._parts_since_sync = 0
+        self._synced_at = 0.0
+        self._syncing = False
+        # Incremented by every update, to tell charges made before it
+        self._generation = 0
+
+    @property
+    def available(self) -> Optional[float]:
+        """
+        Balance left for new sends, or None before the first sync
+        """
+        with self._lock:
+            return self._available()
+
+    def _available(self) -> Optional[float]:
+        if self._balance is None:
+            return None
+        return self._balance - self._spent - self._in_flight - self._reserved
+
+    def cost(self, parts: int) -> float:
+        """
+        Return the balance charged for `parts` SMS parts
+        """
+        return parts * self.part_price
+
+    def check(self, parts: int) -> bool:
+        """
+        Return whether the available balance covers `parts` more parts
+        """
+        available = self.available
+        return available is None or self.cost(parts) <= available
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """
+        Return a copy of the tracked amounts
+        """
+        with self._lock:
+            return {
+                "balance": self._balance,
+                "spent": self._spent,
+                "in_flight": self._in_flight,
+                "reserved": self._reserved,
+                "available": self._available(),
+            }
+
+    @property
+    def needs_sync(self) -> bool:
+        """
+        Whether the balance should be fetched before the next send
+        """
+        with self._lock:
+            return self._needs_sync()
+
+    def _needs_sync(self) -> bool:
+        return (
+            self._balance is None
+            or self._parts_since_sync >= self.resync_parts
+            or time.monotonic() - self._synced_at >= self.resync_interval
+        )
+
+    def claim_sync(self) -> bool:
+        """
+        Return True if the caller should fetch the balance and pass it to `update`
+
+        Only one caller is told to resync at a time, except before the
+        first sync, when every caller needs the balance.
+        """
+        with self._lock:
+            if not self._needs_sync():
+                return False
+            if self._syncing and self._balance is not None:
+                return False
+            self._syncing = True
+            return True
+
+    def release_sync(self) -> None:
+        """
+        Let another caller resync after a failed balance request
+        """
+        with self._lock:
+            self._syncing = False
+
+    def update(self, balance: float) -> None:
+        """
+        Replace the tracked balance with a freshly fetched one
+
+        Charges still in flight stay held until their sends complete, but
+        are not added to the spent amount when they settle, since the
+        fetched balance may include them already. Open reservations are kept.
+        """
+        with self._lock:
+            if self._balance is not None:
+                self.last_drift = balance - (self._balance - self._spent)
+                if abs(self.last_drift) > self.drift_tolerance:
+                    logger.warning("Balance drifted by %g from the local estimate", self.last_drift)
+            self._balance = balance
+            self._spent = 0.0
+            self._parts_since_sync = 0
+            self._synced_at = time.monotonic()
+            self._syncing = False
+            self._generation += 1
+
+    def invalidate(self) -> None:
+        """
+        Fetch the balance again before the next send
+        """
+        with self._lock:
+            self._synced_at = float("-inf")
+
+    def _debit(self, cost: float, parts: int, reservation: Optional["Reservation"]) -> Tuple[float, int]:
+        """
+        Move `cost` to in flight, drawing from `reservation` first
+
+        Returns:
+            tuple: The amount taken from the reservation, and the generation of the balance charged
+        """
+        with self._lock:
+            reserved = min(cost, reservation.remaining) if reservation is not None else 0.0
+            available = self._available()
+            if available is not None and cost - reserved > available:
+                raise InsufficientBalance(cost - reserved, available)
+            if reservation is not None:
+                reservation.remaining -= reserved
+                self._reserved -= reserved
+            self._in_flight += cost
+            self._parts_since_sync += parts
+            return reserved, self._generation
+
+    def _settle(self, cost: float, generation: int) -> None:
+        with self._lock:
+            self._in_flight -= cost
+            # A balance fetched since the charge was made may include it
+            if generation == self._generation:
+                self._spent += cost
+
+    def _refund(self, cost: float, parts: int, reservation: Optional["Reservation"], reserved: float,
+                generation: int) -> None:
+        with self._lock:
+            self._in_flight -= cost
+            if generation == self._generation:
+                self._parts_since_sync -= parts
+            # A released reservation gives the refund to the free balance
+            if reservation is not None and not reservation.released:
+                reservation.remaining += reserved
+                self._reserved += reserved
+
+    @contextmanager
+    def charge(self, parts: int, reservation: Optional["Reservation"] = None) -> Iterator[float]:
+        """
+        Charge `parts` parts for the duration of a send
+
+        The charge is settled when the block completes and refunded if it
+        raises.
+
+        Args:
+            parts: Number of SMS parts sent
+            reservation: Optional reservation drawn from before the free balance
+
+        Raises:
+            InsufficientBalance: If the available balance does not cover the parts
+        """
+        cost = self.cost(parts)
+        reserved, generation = self._debit(cost, parts, reservation)
+        try:
+            yield cost
+        except BaseException:
+            self._refund(cost, parts, reservation, reserved, generation)
+            raise
+        self._settle(cost, generation)
+
+    def _release(self, reservation: "Reservation") -> float:
+        with self._lock:
+            released, reservation.remaining = reservation.remaining, 0.0
+            reservation.released = True
+            self._reserved -= released
+            return released
+
+    def reserve(self, parts: int) -> "Reservation":
+        """
+        Set aside the balance of `parts` parts for a campaign
+
+        Raises:
+            InsufficientBalance: If the available balance does not cover the parts
+        """
+        amount = self.cost(parts)
+        with self._lock:
+            available = self._available()
+            if available is not None and amount > available:
+                raise InsufficientBalance(amount, available)
+            self._reserved += amount
+        return Reservation(self, amount)
+
+
+class Reservation:
+    """
+    Balance set aside for a campaign by `BalanceAccountant.reserve`
+
+    Sends charged to the reservation draw from it first, then from the
+    free balance. `release` returns the unused amount; the reservation is
+    also a context manager releasing it on exit.
+    """
+    def __init__(self, accountant: BalanceAccountant, amount: float):
+        self.accountant = accountant
+        self.amount = amount
+        self.remaining = amount
+        self.released = False
+
+    def charge(self, parts: int) -> ContextManager[float]:
+        """
+        Charge `parts` parts to the reservation for the duration of a send
+
+        Raises:
+            InsufficientBalance: If the reservation and the free balance do not cover the parts
+        """
+        return self.accountant.charge(parts, self)
+
+    def release(self) -> float:
+        """
+        Return the unused amount to the free balance
+
+        Returns:
+            float: The released amount
+        """
+        return self.accountant._release(self)  # pylint: disable=protected-access
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
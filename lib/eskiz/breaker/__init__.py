@@ -0,0 +1,4 @@
+"""
+circuit breakers for eskiz
+"""
+from .circuit import CircuitBreaker, CircuitCall # noqa
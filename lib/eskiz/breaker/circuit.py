@@ -0,0 +1,327 @@
+"""
+the per-endpoint circuit breaker
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from eskiz.enum import CircuitState
+from eskiz.exception import CircuitOpen
+from eskiz.metrics import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Key of the circuit shared by every endpoint when circuits are not per endpoint
+GLOBAL_KEY = "*"
+
+_FAILED = 1
+_SLOW = 2
+
+# Looked up once, as enum member access is slow on the request path
+_CLOSED, _OPEN, _HALF_OPEN = CircuitState.CLOSED, CircuitState.OPEN, CircuitState.HALF_OPEN
+
+StateListener = Callable[[str, CircuitState, CircuitState], None]
+
+
+class _Circuit:
+    """
+    The state of one circuit and the outcomes of its latest calls
+    """
+    __slots__ = ("state", "outcomes", "failures", "slow", "opened_at", "trials", "successes")
+
+    def __init__(self, window_size: int):
+        self.state = _CLOSED
+        self.outcomes: Deque[int] = deque(maxlen=window_size)
+        self.failures = 0
+        self.slow = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.successes = 0
+
+    def push(self, outcome: int) -> None:
+        """
+        Add the outcome of a call to the window, dropping the oldest one when full
+        """
+        if len(self.outcomes) == self.outcomes.maxlen:
+            dropped = self.outcomes[0]
+            self.failures -= dropped & _FAILED
+            self.slow -= (dropped & _SLOW) >> 1
+        self.outcomes.append(outcome)
+        self.failures += outcome & _FAILED
+        self.slow += (outcome & _SLOW) >> 1
+
+    def clear(self) -> None:
+        self.outcomes.clear()
+        self.failures = 0
+        self.slow = 0
+
+
+class CircuitCall:
+    """
+    Context manager guarding one request attempt, returned by `CircuitBreaker.guard`
+
+    Entering raises CircuitOpen if the circuit does not allow the attempt.
+    The attempt fails if it raises, unless the exception carries an HTTP
+    `status` outside `failure_statuses`; set `status` to report the status
+    of a response that did not raise.
+    """
+    __slots__ = ("breaker", "endpoint", "status", "_trial", "_started")
+
+    def __init__(self, breaker: "CircuitBreaker", endpoint: str):
+        self.breaker = breaker
+        self.endpoint = endpoint
+        self.status: Optional[int] = None
+
+    def __enter__(self) -> "CircuitCall":
+        self._trial = self.breaker._acquire(self.endpoint)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        seconds = time.perf_counter() - self._started
+        if exc_val is not None and not isinstance(exc_val, Exception):
+            # Cancelled or interrupted: the call says nothing about the server
+            self.breaker._release(self.endpoint, self._trial)
+            return
+        status = getattr(exc_val, "status", None) if exc_val is not None else self.status
+        failed = status in self.breaker.failure_statuses if status is not None else exc_val is not None
+        self.breaker._record(self.endpoint, seconds, failed, self._trial)
+
+
+class CircuitBreaker:
+    """
+    Rejects requests to an endpoint while it is failing, instead of letting them wait for timeouts
+
+    Each circuit starts closed and keeps the outcomes of its last
+    `window_size` calls. Once it holds at least `min_calls` of them and the
+    share of failed calls reaches `failure_rate_threshold`, or the share of
+    calls slower than `slow_call_duration` reaches `slow_call_rate_threshold`,
+    the circuit opens: requests fail at once with CircuitOpen for
+    `open_duration` seconds. Then the circuit is half-open and lets
+    `half_open_calls` trial requests through; it closes if they all succeed
+    in time and opens again otherwise.
+
+    Connection errors, timeouts and responses with a status in
+    `failure_statuses` are failures. Other statuses, such as a 401 or a 400,
+    show the server is up and count as successes. Circuits are kept per
+    endpoint, or shared by every endpoint if `per_endpoint` is False. One
+    breaker can be shared by several sync and async clients.
+    """
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_duration: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_calls: int = 1,
+        failure_statuses: Iterable[int] = (500, 502, 503, 504),
+        per_endpoint: bool = True,
+        on_state_change: Optional[StateListener] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Args:
+            failure_rate_threshold: Share of failed calls in the window that opens the circuit
+            slow_call_duration: Seconds above which a call is slow, or None to ignore latency
+            slow_call_rate_threshold: Share of slow calls in the window that opens the circuit
+            window_size: Number of latest calls whose outcome is kept
+            min_calls: Number of calls needed in the window before the circuit may open
+            open_duration: Seconds the circuit stays open before trial requests are let through
+            half_open_calls: Number of trial requests of a half-open circuit
+            failure_statuses: HTTP statuses counted as failures
+            per_endpoint: Keep one circuit per endpoint instead of one for the account
+            on_state_change: Optional callback called with the endpoint, the old and the new state
+            metrics: Optional Metrics receiving the state changes and rejected requests
+        """
+        if not 0 < failure_rate_threshold <= 1 or not 0 < slow_call_rate_threshold <= 1:
+            raise ValueError("thresholds must be in (0, 1]")
+        if window_size < 1 or not 1 <= min_calls <= window_size:
+            raise ValueError("min_calls must be between 1 and window_size")
+        if half_open_calls < 1:
+            raise ValueError("half_open_calls must be at least 1")
+
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self.per_endpoint = per_endpoint
+        self.on_state_change = on_state_change
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def guard(self, endpoint: str) -> CircuitCall:
+        """
+        Return a context manager guarding one request attempt to `endpoint`
+
+        Raises:
+            CircuitOpen: On entering, if the circuit of the endpoint is open
+        """
+        return CircuitCall(self, endpoint)
+
+    def check(self, endpoint: str) -> None:
+        """
+        Fail fast if an attempt to `endpoint` would be rejected, without letting it through
+
+        Clients call this before waiting on the rate limiter, so rejected
+        requests do not queue for tokens.
+
+        Raises:
+            CircuitOpen: If the circuit of the endpoint is open
+        """
+        key = self._key(endpoint)
+        with self._lock:
+            circuit = self._circuits.get(key)
+            rejected = self._rejection(circuit) if circuit is not None else None
+        if rejected is not None:
+            if self.metrics is not None:
+                self.metrics.record_rejected(key)
+            raise CircuitOpen(key, rejected)
+
+    def state(self, endpoint: str) -> CircuitState:
+        """
+        Return the current state of the circuit of `endpoint`
+        """
+        key = self._key(endpoint)
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return _CLOSED
+            if circuit.state is _OPEN and time.monotonic() >= circuit.opened_at + self.open_duration:
+                return _HALF_OPEN
+            return circuit.state
+
+    def reset(self) -> None:
+        """
+        Close every circuit and forget the outcomes of past calls
+        """
+        with self._lock:
+            circuits = [(key, circuit.state) for key, circuit in self._circuits.items()]
+            self._circuits.clear()
+        for key, state in circuits:
+            if state is not _CLOSED:
+                self._notify(key, state, _CLOSED)
+
+    def _rejection(self, circuit: _Circuit) -> Optional[float]:
+        """
+        Return the seconds until `circuit` lets attempts through again, or None if it does now
+        """
+        if circuit.state is _OPEN:
+            remaining = circuit.opened_at + self.open_duration - time.monotonic()
+            return remaining if remaining > 0 else None
+        if circuit.state is _HALF_OPEN and circuit.trials >= self.half_open_calls:
+            return 0.0
+        return None
+
+    def _key(self, endpoint: str) -> str:
+        return endpoint if self.per_endpoint else GLOBAL_KEY
+
+    def _circuit(self, key: str) -> _Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window_size)
+        return circuit
+
+    def _acquire(self, endpoint: str) -> bool:
+        """
+        Let an attempt through the circuit of `endpoint`
+
+        Returns:
+            bool: True if the attempt is a trial request of a half-open circuit
+
+        Raises:
+            CircuitOpen: If the circuit is open, or half-open with all its trials in flight
+        """
+        key = self._key(endpoint)
+        transition = None
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state is _CLOSED:
+                return False
+
+            rejected = self._rejection(circuit)
+            if rejected is None:
+                if circuit.state is _OPEN:
+                    circuit.state = _HALF_OPEN
+                    circuit.trials = circuit.successes = 0
+                    transition = _OPEN
+                circuit.trials += 1
+
+        if transition is not None:
+            self._notify(key, transition, _HALF_OPEN)
+        if rejected is not None:
+            if self.metrics is not None:
+                self.metrics.record_rejected(key)
+            raise CircuitOpen(key, rejected)
+        return True
+
+    def _release(self, endpoint: str, trial: bool) -> None:
+        """
+        Give back the trial slot of an attempt that ended without an outcome
+        """
+        if not trial:
+            return
+        with self._lock:
+            circuit = self._circuit(self._key(endpoint))
+            if circuit.state is _HALF_OPEN:
+                circuit.trials -= 1
+
+    def _record(self, endpoint: str, seconds: float, failed: bool, trial: bool) -> None:
+        """
+        Add the outcome of an attempt, opening or closing the circuit as needed
+        """
+        key = self._key(endpoint)
+        slow = self.slow_call_duration is not None and seconds >= self.slow_call_duration
+        transition = None
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state is _CLOSED:
+                circuit.push((_FAILED if failed else 0) | (_SLOW if slow else 0))
+                calls = len(circuit.outcomes)
+                if calls >= self.min_calls and (
+                    circuit.failures >= self.failure_rate_threshold * calls
+                    or circuit.slow >= self.slow_call_rate_threshold * calls
+                ):
+                    transition = self._open(circuit)
+            elif circuit.state is _HALF_OPEN and trial:
+                if failed or slow:
+                    transition = self._open(circuit)
+                else:
+                    circuit.successes += 1
+                    if circuit.successes >= self.half_open_calls:
+                        circuit.state = _CLOSED
+                        circuit.clear()
+                        transition = (_HALF_OPEN, _CLOSED)
+
+        if transition is not None:
+            self._notify(key, *transition)
+
+    def _open(self, circuit: _Circuit):
+        """
+        Open `circuit` and return the transition
+        """
+        old = circuit.state
+        circuit.state = _OPEN
+        circuit.opened_at = time.monotonic()
+        circuit.clear()
+        return old, _OPEN
+
+    def _notify(self, key: str, old: CircuitState, new: CircuitState) -> None:
+        """
+        Report a state change to the log, the metrics and the callback
+        """
+        log = logger.warning if new is _OPEN else logger.info
+        log("Circuit for %s changed from %s to %s", key, old, new)
+        if self.metrics is not None:
+            self.metrics.record_circuit_state(key, new.value)
+        if self.on_state_change is not None:
+            self.on_state_change(key, old, new)
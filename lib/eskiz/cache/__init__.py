@@ -0,0 +1,5 @@
+"""
+response caching for eskiz
+"""
+from .base import CacheEntry, CacheStats, ResponseCache, DEFAULT_TTLS, DEFAULT_INVALIDATIONS # noqa
+from .memory import InMemoryCache # noqa
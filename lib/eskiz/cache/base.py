@@ -0,0 +1,270 @@
+"""
+the response cache interface
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from eskiz.enum import Endpoint
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a response stays fresh, by endpoint; other endpoints are not cached
+DEFAULT_TTLS: Dict[str, float] = {
+    Endpoint.USER.value: 300,
+    Endpoint.TEMPLATES.value: 300,
+    Endpoint.GET_LIMIT.value: 10,
+    Endpoint.TOTALS_BY_RANGE.value: 60,
+    Endpoint.TOTALS_BY_DISPATCH.value: 60,
+    Endpoint.USER_TOTALS.value: 60,
+}
+
+# Endpoints whose responses change with every send
+_SPENDING = (
+    Endpoint.GET_LIMIT.value,
+    Endpoint.TOTALS_BY_RANGE.value,
+    Endpoint.TOTALS_BY_DISPATCH.value,
+    Endpoint.USER_TOTALS.value,
+)
+
+# Cached endpoints invalidated by a successful request to an endpoint
+DEFAULT_INVALIDATIONS: Dict[str, Tuple[str, ...]] = {
+    Endpoint.SEND_SMS.value: _SPENDING,
+    Endpoint.SEND_BATCH.value: _SPENDING,
+    Endpoint.SEND_GLOBAL.value: _SPENDING,
+}
+
+# (scope, endpoint, params); the scope separates the accounts sharing a cache
+Key = Tuple[str, str, Hashable]
+
+
+class CacheEntry:
+    """
+    A cached value with its freshness deadlines, in monotonic time
+    """
+    __slots__ = ("value", "fresh_until", "stale_until", "refreshing")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.refreshing = False
+
+
+class CacheStats:
+    """
+    Thread-safe counters of the lookups made in a cache
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, name: str) -> None:
+        """
+        Increment the counter `name`
+        """
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Return a copy of the counters
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+class ResponseCache:
+    """
+    Base class of the response caches shared by the sync and async clients
+
+    Responses of the endpoints in `ttls` are kept for their TTL. For
+    `stale_while_revalidate` more seconds an expired response is still
+    returned while a background refresh replaces it. A successful request
+    to an endpoint drops the entries listed for it in `invalidations`.
+
+    Subclasses provide the storage by implementing `get_entry`,
+    `set_entry` and `drop_entries`, which are called with the cache lock
+    held.
+    """
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_while_revalidate: float = 0,
+        invalidations: Optional[Dict[str, Iterable[str]]] = None,
+    ):
+        """
+        Args:
+            ttls: Seconds a response stays fresh, keyed by endpoint path (see `Endpoint`)
+            stale_while_revalidate: Seconds an expired response is served while it is refreshed
+            invalidations: Endpoints whose entries are dropped after a request to the key endpoint
+        """
+        self.ttls = {str(key): value for key, value in (DEFAULT_TTLS if ttls is None else ttls).items()}
+        self.stale_while_revalidate = stale_while_revalidate
+        self.invalidations = {
+            str(key): tuple(str(value) for value in values)
+            for key, values in (DEFAULT_INVALIDATIONS if invalidations is None else invalidations).items()
+        }
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # Bumped by invalidations, so a response requested before one is not stored:
+        # for every entry, per scope and per (scope, endpoint)
+        self._epoch = 0
+        self._scope_generations: Dict[str, int] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+
+    def get_entry(self, key: Key) -> Optional[CacheEntry]:
+        """
+        Return the entry stored for `key`, or None
+        """
+        raise NotImplementedError
+
+    def set_entry(self, key: Key, entry: CacheEntry) -> None:
+        """
+        Store `entry` for `key`
+        """
+        raise NotImplementedError
+
+    def drop_entries(self, scope: Optional[str] = None, endpoint: Optional[str] = None) -> None:
+        """
+        Remove the entries of `scope` and `endpoint`, or all entries when None
+        """
+        raise NotImplementedError
+
+    def invalidate(self, scope: str, endpoint: Optional[str] = None) -> None:
+        """
+        Drop the entries of `scope`, only those of `endpoint` if given
+        """
+        with self._lock:
+            # Responses of the dropped entries requested before the invalidation are not stored
+            if endpoint is None:
+                self._scope_generations[scope] = self._scope_generations.get(scope, 0) + 1
+            else:
+                key = (scope, str(endpoint))
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self.stats.record("invalidations")
+            self.drop_entries(scope, None if endpoint is None else str(endpoint))
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self._epoch += 1
+            self.drop_entries()
+
+    def invalidate_after(self, scope: str, endpoint: str) -> None:
+        """
+        Drop the entries made outdated by a successful request to `endpoint`
+        """
+        for outdated in self.invalidations.get(str(endpoint), ()):
+            self.invalidate(scope, outdated)
+
+    def _generation(self, key: Key) -> Tuple[int, int, int]:
+        """
+        Return the invalidation count covering `key`; called with the lock held
+        """
+        scope, endpoint = key[0], key[1]
+        return self._epoch, self._scope_generations.get(scope, 0), self._generations.get((scope, endpoint), 0)
+
+    def _lookup(self, key: Key) -> Tuple[Optional[CacheEntry], bool, Tuple[int, int, int]]:
+        """
+        Return the usable entry for `key`, whether it should be refreshed in
+        the background, marking it as refreshing, and the generation of `key`
+        """
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation(key)
+            entry = self.get_entry(key)
+            if entry is None or now >= entry.stale_until:
+                self.stats.record("misses")
+                return None, False, generation
+            if now < entry.fresh_until:
+                self.stats.record("hits")
+                return entry, False, generation
+            self.stats.record("stale_hits")
+            refresh = not entry.refreshing
+            entry.refreshing = True
+            return entry, refresh, generation
+
+    def _store(self, key: Key, value: Any, generation: Tuple[int, int, int]) -> None:
+        """
+        Store `value` unless `key` was invalidated since it was requested
+        """
+        ttl = self.ttls[key[1]]
+        now = time.monotonic()
+        with self._lock:
+            if generation == self._generation(key):
+                self.set_entry(key, CacheEntry(value, now + ttl, now + ttl + self.stale_while_revalidate))
+
+    def _revalidate(self, key: Key, loader: Callable[[], Any], generation: Tuple[int, int, int]) -> None:
+        try:
+            self._store(key, loader(), generation)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Refreshing cached %s failed: %s", key[1], exc)
+            self._release(key)
+
+    def _release(self, key: Key) -> None:
+        with self._lock:
+            entry = self.get_entry(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def fetch(self, key: Key, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached response for `key`, calling `loader` on a miss
+
+        Stale responses are refreshed on a background thread.
+        """
+        if key[1] not in self.ttls:
+            return loader()
+
+        entry, refresh, generation = self._lookup(key)
+        if entry is not None:
+            if refresh:
+                threading.Thread(target=self._revalidate, args=(key, loader, generation), daemon=True).start()
+            return entry.value
+
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    async def fetch_async(self, key: Key, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached response for `key`, awaiting `loader` on a miss
+
+        Stale responses are refreshed in a background task.
+        """
+        if key[1] not in self.ttls:
+            return await loader()
+
+        entry, refresh, generation = self._lookup(key)
+        if entry is not None:
+            if refresh:
+                task = asyncio.ensure_future(self._revalidate_async(key, loader, generation))
+                self._refreshes.add(task)
+                task.add_done_callback(self._refreshes.discard)
+            return entry.value
+
+        value = await loader()
+        self._store(key, value, generation)
+        return value
+
+    async def _revalidate_async(self, key: Key, loader: Callable[[], Awaitable[Any]], generation: Tuple[int, int, int]) -> None:
+        try:
+            self._store(key, await loader(), generation)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Refreshing cached %s failed: %s", key[1], exc)
+            self._release(key)
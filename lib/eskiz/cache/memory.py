@@ -0,0 +1,54 @@
+"""
+the in-memory LRU response cache
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from .base import CacheEntry, Key, ResponseCache
+
+
+class InMemoryCache(ResponseCache):
+    """
+    Response cache of one process, holding at most `max_entries` entries
+
+    The least recently used entry is dropped when the cache is full.
+    """
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_while_revalidate: float = 0,
+        invalidations: Optional[Dict[str, Iterable[str]]] = None,
+        max_entries: int = 1024,
+    ):
+        """
+        Args:
+            ttls: Seconds a response stays fresh, keyed by endpoint path (see `Endpoint`)
+            stale_while_revalidate: Seconds an expired response is served while it is refreshed
+            invalidations: Endpoints whose entries are dropped after a request to the key endpoint
+            max_entries: Maximum number of cached responses
+        """
+        super().__init__(ttls, stale_while_revalidate, invalidations)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, CacheEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_entry(self, key: Key) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set_entry(self, key: Key, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def drop_entries(self, scope: Optional[str] = None, endpoint: Optional[str] = None) -> None:
+        if scope is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == scope and endpoint in (None, key[1])]:
+            del self._entries[key]
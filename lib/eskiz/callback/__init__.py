@@ -0,0 +1,6 @@
+"""
+delivery report callbacks for eskiz, requires aiohttp
+"""
+from .models import DeliveryReport # noqa
+from .sink import ReportSink, JsonLinesSink # noqa
+from .receiver import DLRReceiver # noqa
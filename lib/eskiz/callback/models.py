@@ -0,0 +1,22 @@
+"""
+the delivery report models
+"""
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DeliveryReport(BaseModel):
+    """
+    A delivery report posted by Eskiz to the `callback_url` of a message
+    """
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    message_id: str
+    status: str
+    request_id: Optional[str] = None
+    user_sms_id: Optional[str] = None
+    country: Optional[str] = None
+    phone_number: Optional[str] = None
+    sms_count: Optional[int] = None
+    status_date: Optional[str] = None
@@ -0,0 +1,284 @@
+"""
+the asyncio receiver of Eskiz delivery report callbacks
+"""
+import asyncio
+import inspect
+import logging
+from typing import Awaitable, Callable, List, Optional, Union
+
+from aiohttp import web
+from pydantic import ValidationError
+
+from .models import DeliveryReport
+from .sink import ReportSink
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "/eskiz/dlr"
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_RETAINED = 100000
+# Longest wait between two writes to a failing sink, in seconds
+MAX_SINK_BACKOFF = 60.0
+
+Handler = Callable[[DeliveryReport], Union[None, Awaitable[None]]]
+SinkErrorHandler = Callable[[List[DeliveryReport], Exception], Union[None, Awaitable[None]]]
+
+
+class DLRReceiver:
+    """
+    Receives delivery report callbacks and dispatches them to handlers
+
+    Requests are answered as soon as the report is parsed and queued;
+    `max_concurrency` worker tasks run the handlers, and reports are
+    written to the sink in batches of `batch_size`, or every
+    `flush_interval` seconds. When the queue is full the callback is
+    answered with 503.
+
+    Reports are acknowledged before they reach the sink, so a batch the
+    sink fails to write is kept and written again, waiting twice as long
+    after each failure. Reports given up, because more than `max_retained`
+    are waiting for the sink or because it still fails on `stop`, are
+    passed to `on_sink_error`, and logged in any case.
+
+    The receiver can run its own server with `serve`, or be mounted on an
+    existing aiohttp application with `add_routes`; in that case `start`
+    and `stop` must be called, for example from the app's startup and
+    cleanup signals.
+    """
+    def __init__(
+        self,
+        handlers: Optional[List[Handler]] = None,
+        sink: Optional[ReportSink] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_retained: int = DEFAULT_MAX_RETAINED,
+        on_sink_error: Optional[SinkErrorHandler] = None,
+    ):
+        """
+        Args:
+            handlers: Functions or coroutine functions called with each report
+            sink: Optional ReportSink receiving the reports in batches
+            max_concurrency: Maximum number of reports handled at the same time
+            queue_size: Maximum number of reports waiting for a handler
+            batch_size: Number of reports written to the sink at once
+            flush_interval: Seconds after which a partial batch is written
+            max_retained: Maximum number of reports kept while the sink fails;
+                the oldest are given up beyond it
+            on_sink_error: Function or coroutine function called with the
+                reports given up and the sink's error
+        """
+        self.handlers = list(handlers or [])
+        self.sink = sink
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retained = max_retained
+        self.on_sink_error = on_sink_error
+        self._sink_failures = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch: List[DeliveryReport] = []
+        self._batch_full: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._runner: Optional[web.AppRunner] = None
+
+    def add_handler(self, handler: Handler) -> Handler:
+        """
+        Register a handler; usable as a decorator
+        """
+        self.handlers.append(handler)
+        return handler
+
+    def add_routes(self, app: web.Application, path: str = DEFAULT_PATH) -> None:
+        """
+        Mount the callback handler on `app` at `path`
+        """
+        app.router.add_post(path, self.handle)
+
+    async def start(self) -> None:
+        """
+        Start the handler workers and the sink flusher
+        """
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(self.queue_size)
+        self._batch_full = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.ensure_future(self._work(self._queue)) for _ in range(self.max_concurrency)]
+        if self.sink is not None:
+            self._flusher = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """
+        Handle the queued reports, flush the sink and stop the workers
+        """
+        if self._queue is None:
+            return
+        # New callbacks are answered with 503 from here on
+        reports, self._queue = self._queue, None
+        await reports.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Let the flusher write the last batches instead of cancelling a write
+        if self._flusher is not None:
+            self._stopping = True
+            self._batch_full.set()
+            await self._flusher
+            self._flusher = None
+
+    async def serve(self, host: str = "0.0.0.0", port: int = 8080, path: str = DEFAULT_PATH) -> web.AppRunner:
+        """
+        Start the receiver on its own HTTP server
+
+        Returns:
+            AppRunner: The runner of the server, cleaned up by `close`
+        """
+        app = web.Application()
+        self.add_routes(app, path)
+        await self.start()
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return self._runner
+
+    async def close(self) -> None:
+        """
+        Stop the server started by `serve`, then the workers
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @staticmethod
+    async def parse(request: web.Request) -> DeliveryReport:
+        """
+        Parse a callback request sent as JSON or as a form
+        """
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+        if not isinstance(data, dict):
+            raise ValueError("delivery report must be an object")
+        data.update((key, value) for key, value in request.query.items() if key not in data)
+        return DeliveryReport(**data)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        The aiohttp handler of the callback URL
+        """
+        if self._queue is None:
+            return web.json_response({"status": "unavailable"}, status=503)
+
+        try:
+            report = await self.parse(request)
+        except (ValidationError, ValueError) as exc:
+            logger.warning("Invalid delivery report: %s", exc)
+            return web.json_response({"status": "invalid"}, status=400)
+
+        try:
+            self._queue.put_nowait(report)
+        except asyncio.QueueFull:
+            logger.warning("Delivery report queue is full, rejecting report %s", report.message_id)
+            return web.json_response({"status": "busy"}, status=503)
+
+        return web.json_response({"status": "ok"})
+
+    async def _work(self, reports: asyncio.Queue) -> None:
+        while True:
+            report = await reports.get()
+            try:
+                for handler in self.handlers:
+                    try:
+                        result = handler(report)
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.error("Delivery report handler failed for %s: %s", report.message_id, exc)
+
+                if self.sink is not None:
+                    self._batch.append(report)
+                    # A failing sink is retried after its backoff, not on every report
+                    if len(self._batch) >= self.batch_size and not self._sink_failures:
+                        self._batch_full.set()
+            finally:
+                reports.task_done()
+
+    async def _flush_periodically(self) -> None:
+        while not self._stopping:
+            delay = self.flush_interval
+            if self._sink_failures:
+                delay = min(self.flush_interval * 2 ** self._sink_failures, MAX_SINK_BACKOFF)
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            await self._flush()
+
+        # Write what is left on stop, and give up what the sink still refuses
+        error = await self._flush()
+        if error is not None:
+            reports, self._batch = self._batch, []
+            await self._give_up(reports, error)
+
+    async def _flush(self) -> Optional[Exception]:
+        """
+        Write the waiting reports to the sink in batches
+
+        A batch leaves the waiting reports only once it is written, so a
+        failed batch stays at their head for the next flush.
+
+        Returns:
+            Exception: The error of the sink if a write failed, else None
+        """
+        while self._batch:
+            batch = self._batch[:self.batch_size]
+            try:
+                await self.sink.write(batch)
+            except Exception as exc:  # pylint: disable=broad-except
+                self._sink_failures += 1
+                logger.error("Writing %d delivery reports to the sink failed, %d reports kept: %s",
+                             len(batch), len(self._batch), exc)
+                excess = len(self._batch) - self.max_retained
+                if excess > 0:
+                    reports = self._batch[:excess]
+                    del self._batch[:excess]
+                    await self._give_up(reports, exc)
+                return exc
+            del self._batch[:len(batch)]
+            self._sink_failures = 0
+        return None
+
+    async def _give_up(self, reports: List[DeliveryReport], error: Exception) -> None:
+        """
+        Pass reports that will not be written to the sink to `on_sink_error`
+        """
+        logger.error("Giving up %d delivery reports the sink failed to write: %s", len(reports), error)
+        if self.on_sink_error is None:
+            return
+        try:
+            result = self.on_sink_error(reports, error)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Delivery report sink error handler failed: %s", exc)
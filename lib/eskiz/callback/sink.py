@@ -0,0 +1,46 @@
+"""
+sinks receiving delivery reports in batches
+"""
+import asyncio
+import threading
+from typing import List
+
+from .models import DeliveryReport
+
+
+class ReportSink:
+    """
+    Base class of the delivery report sinks
+
+    Subclasses implement `write`, which receives the reports buffered by
+    the receiver in batches. A database sink would insert the batch in one
+    statement.
+    """
+    async def write(self, reports: List[DeliveryReport]) -> None:
+        """
+        Persist a batch of reports
+        """
+        raise NotImplementedError
+
+
+class JsonLinesSink(ReportSink):
+    """
+    Appends reports to a file, one JSON object per line
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the file, created on first write
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, lines: str) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+
+    async def write(self, reports: List[DeliveryReport]) -> None:
+        lines = "".join(report.model_dump_json() + "\n" for report in reports)
+        # File I/O runs on a thread so it does not block the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
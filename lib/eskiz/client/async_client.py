@@ -1,13 +1,33 @@
 """
 The HTTP async client for Eskiz.uz
 """
+import asyncio
+import contextvars
+import functools
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from contextlib import nullcontext
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, ContextManager, Hashable, Iterable, Tuple
+from urllib.parse import urlencode
 
 import aiohttp
 from aiohttp import ClientResponseError
 
-from eskiz.enum import Network
+from eskiz.enum import Network, Endpoint, Phase
+from eskiz.balance import BalanceAccountant, Reservation
+from eskiz.breaker import CircuitBreaker
+from eskiz.cache import ResponseCache
+from eskiz.client import bulk, export, hedge, paginate, reports, shard
+from eskiz.client.validation import send_sms_files, prepare_batch_messages
+from eskiz.hedge import HedgePolicy
+from eskiz.hooks import RequestContext, RequestHooks, run_phase
+from eskiz.metrics import Metrics
+from eskiz.ratelimit import RateLimiter
+from eskiz.phone import iter_normalized_messages, normalize_batch
+from eskiz.segments import count_batch_parts, unicode_flag
+from eskiz.retry import RetryPolicy, parse_retry_after
+from eskiz.token import TokenStore, decode_expiry, token_key
 from eskiz import request as eskiz_request
 from eskiz import response as eskiz_response
 from eskiz import exception as eskiz_exception
@@ -15,6 +35,11 @@ from eskiz import exception as eskiz_exception
 
 logger = logging.getLogger(__name__)
 
+# Errors raised before the request reached the server
+_UNSENT_ERRORS = (aiohttp.ClientConnectorError,) + (
+    (aiohttp.ConnectionTimeoutError,) if hasattr(aiohttp, "ConnectionTimeoutError") else ()
+)
+
 
 class AsyncClient:
     """
@@ -28,7 +53,40 @@ class AsyncClient:
         from_: str = "4546",
         callback: str = "",
         token: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_refresh_margin: float = 300,
+        token_store: Optional[TokenStore] = None,
+        validate: bool = True,
+        validate_batches: bool = False,
+        cache: Optional[ResponseCache] = None,
+        balance: Optional[BalanceAccountant] = None,
+        metrics: Optional[Metrics] = None,
+        hooks: Optional[RequestHooks] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
     ):
+        """
+        Args:
+            email: Account email
+            password: Account password
+            network: API base URL
+            from_: Default sender ID
+            callback: Delivery report callback URL
+            token: Optional token to use instead of logging in
+            rate_limiter: Optional RateLimiter consulted before each request
+            retry_policy: Optional RetryPolicy for transient failures
+            token_refresh_margin: Seconds before expiry at which the token is renewed
+            token_store: Optional TokenStore shared with other clients
+            validate: Validate send_sms requests before sending
+            validate_batches: Validate and coerce batch messages before sending
+            cache: Optional ResponseCache for the responses of read-only endpoints
+            balance: Optional BalanceAccountant charged locally for each send
+            metrics: Optional Metrics receiving request latencies, sizes and counters
+            hooks: Optional RequestHooks receiving the phases of each call
+            circuit_breaker: Optional CircuitBreaker rejecting requests to failing endpoints
+            hedge_policy: Optional HedgePolicy sending a second attempt of slow send_sms requests
+        """
         self.from_ = from_
         self.email = email
         self.password = password
@@ -36,11 +94,134 @@ class AsyncClient:
         self.callback = callback
         self.headers = {}
         self.token = token
+        self.token_refresh_margin = token_refresh_margin
+        self.token_store = token_store
+        self.validate = validate
+        self.validate_batches = validate_batches
+        self.cache = cache
+        self.balance = balance
+        self.metrics = metrics
+        self.hooks = hooks
+        self._token_expires_at = None
+        self._token_lifetime = None
+        self._renewal_task = None
         self._session = None
+        self._refresh_lock = None
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.hedge_policy = hedge_policy
+        # Token given to the constructor, written to the token store by initialize
+        self._unsaved_token = token if token and token_store is not None else None
 
         # Set authorization header if token is provided
         if token:
-            self.headers["Authorization"] = f"Bearer {self.token}"
+            self._set_token(token)
+
+    @property
+    def token_expires_in(self) -> Optional[float]:
+        """
+        Seconds until the current token expires, or None if its expiry is unknown
+        """
+        if self._token_expires_at is None:
+            return None
+        return self._token_expires_at - time.time()
+
+    def _set_token(self, token: str) -> None:
+        """
+        Use `token` for the following requests and schedule its renewal
+
+        Args:
+            token: The new token
+        """
+        self.token = token
+        self.headers["Authorization"] = f"Bearer {token}"
+        self._token_expires_at = decode_expiry(token)
+        self._token_lifetime = self.token_expires_in
+        self._schedule_token_renewal()
+
+    async def _save_token(self, token: str) -> None:
+        """
+        Use `token` for the following requests and write it back to the token store
+
+        Args:
+            token: The new token
+        """
+        self._set_token(token)
+        if self.token_store is not None:
+            await self._run_store(self.token_store.set, token_key(self.email, self.network), token)
+
+    async def _run_store(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call a token store method in the default executor
+
+        Stores may block, a file store waits for its lock file, so they are
+        never called on the event loop. The call runs in a copy of the
+        current context, which carries the `async_lock` held by this task.
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(context.run, function, *args)
+        )
+
+    def _load_stored_token(self) -> Optional[str]:
+        """
+        Return the unexpired token of this account from the token store, if any
+
+        It blocks on the store; call it through `_run_store`.
+        """
+        if self.token_store is None:
+            return None
+
+        token = self.token_store.get(token_key(self.email, self.network))
+        if not token:
+            return None
+
+        expires_at = decode_expiry(token)
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return token
+
+    def _get_refresh_lock(self) -> asyncio.Lock:
+        """
+        Return the lock serializing logins and token refreshes
+        """
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        return self._refresh_lock
+
+    def _schedule_token_renewal(self) -> None:
+        """
+        Start a background task renewing the token shortly before it expires
+
+        The task renews the token `token_refresh_margin` seconds before expiry,
+        or at half its lifetime for tokens shorter than twice the margin.
+        """
+        if self._renewal_task is not None and self._renewal_task is not asyncio.current_task():
+            self._renewal_task.cancel()
+        self._renewal_task = None
+
+        expires_in = self.token_expires_in
+        if expires_in is None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scheduled on the first request instead
+            return
+
+        margin = min(self.token_refresh_margin, (self._token_lifetime or 0) / 2)
+        self._renewal_task = loop.create_task(self._renew_token_after(max(0.0, expires_in - margin)))
+
+    async def _renew_token_after(self, delay: float) -> None:
+        """
+        Renew the token after `delay` seconds
+        """
+        await asyncio.sleep(delay)
+        logger.info("Token is about to expire, renewing it")
+        if not await self._handle_token_expired(self.headers.get("Authorization")):
+            logger.error("Proactive token renewal failed")
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """
@@ -50,76 +231,338 @@ class AsyncClient:
             self._session = aiohttp.ClientSession()
         return self._session
 
-    async def _request(self, method: str, url: str, retry_count=0, **kwargs) -> Dict[str, Any]:
+    @staticmethod
+    def _to_form_data(files: Dict[str, Any]) -> aiohttp.FormData:
+        """
+        Convert a request model's `to_file()` dict to aiohttp FormData
+        """
+        form_data = aiohttp.FormData()
+        for key, value in files.items():
+            form_data.add_field(key, value[1])
+        return form_data
+
+    async def _request(self, method: str, url: str, retry_count=0, stream=False,
+                       context: Optional[RequestContext] = None, **kwargs) -> Any:
         """
         Make an HTTP request with automatic token refresh
 
+        Responses are decoded as JSON whatever their content type, as error
+        pages and proxies may serve JSON as text; bodies that are not JSON,
+        such as the CSV of the export endpoint, are read with `stream`.
+
         Args:
             method: HTTP method (GET, POST, etc.)
             url: Request URL
             retry_count: Current retry count (used internally)
-            **kwargs: Additional request parameters
+            stream: Return the open ``aiohttp.ClientResponse`` without reading
+                the body. The caller must release it.
+            context: RequestContext of the call, created here if hooks are set
+            **kwargs: Additional request parameters; `files`, a request model's
+                `to_file()` dict, is sent as multipart form data
         """
         # Maximum number of retries for token refresh
         max_retries = 1
 
         session = await self._get_session()
 
-        try:
-            async with session.request(method, url, **kwargs) as response:
-                response.raise_for_status()
-                return await response.json()
-        except ClientResponseError as exc:
-            logger.error("HTTP error: %s", exc)
-
-            # Handle token expiration with auto-refresh
-            if exc.status == 401 and retry_count < max_retries:
-                logger.info("Token expired, attempting to refresh")
-                try:
-                    # Try to refresh the token
-                    await self._handle_token_expired()
-
-                    # Update headers in kwargs if they exist
-                    if 'headers' in kwargs:
-                        kwargs['headers']["Authorization"] = f"Bearer {self.token}"
-
-                    # Retry the request with the new token
-                    return await self._request(method, url, retry_count + 1, **kwargs)
-                except Exception as refresh_error:
-                    logger.error("Token refresh failed: %s", refresh_error)
-                    raise eskiz_exception.TokenExpired() from exc
-            else:
+        if self._renewal_task is None and self._token_expires_at is not None:
+            self._schedule_token_renewal()
+
+        endpoint = None
+        if (self.rate_limiter is not None or self.metrics is not None or self.hooks is not None
+                or self.circuit_breaker is not None):
+            endpoint = Endpoint.from_url(url)
+        if self.hooks is not None and context is None:
+            context = RequestContext(endpoint, method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if context is not None:
+                context.attempt += 1
+
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.check(endpoint)
+
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(endpoint)
+
+            # Remember the token this attempt is sent with, to detect concurrent refreshes
+            authorization = (kwargs.get("headers") or {}).get("Authorization")
+
+            try:
+                if self.circuit_breaker is None:
+                    return await self._send_attempt(session, endpoint, method, url, stream, kwargs, context)
+                with self.circuit_breaker.guard(endpoint):
+                    return await self._send_attempt(session, endpoint, method, url, stream, kwargs, context)
+            except ClientResponseError as exc:
+                logger.error("HTTP error: %s", exc)
+
+                # Handle token expiration with auto-refresh. A 401 on a request sent
+                # without a token (login) is a credentials error and is not refreshed.
+                if exc.status == 401 and authorization is not None and retry_count < max_retries:
+                    logger.info("Token expired, attempting to refresh")
+                    try:
+                        # Try to refresh the token
+                        await self._handle_token_expired(authorization)
+
+                        # Update headers in kwargs if they exist
+                        if 'headers' in kwargs:
+                            kwargs['headers']["Authorization"] = f"Bearer {self.token}"
+
+                        # Retry the request with the new token
+                        return await self._request(method, url, retry_count + 1, stream, context, **kwargs)
+                    except Exception as refresh_error:
+                        logger.error("Token refresh failed: %s", refresh_error)
+                        raise eskiz_exception.TokenExpired() from exc
+
+                if self.retry_policy is not None and self.retry_policy.should_retry_status(method, exc.status, attempt):
+                    retry_after = parse_retry_after((exc.headers or {}).get("Retry-After"))
+                    await self._wait_before_retry(attempt, str(exc.status), retry_after, endpoint)
+                    continue
+
+                raise exc
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                logger.error("Connection error: %s", exc)
+
+                if self.retry_policy is not None and self.retry_policy.should_retry_error(
+                    method, not isinstance(exc, _UNSENT_ERRORS), attempt
+                ):
+                    await self._wait_before_retry(attempt, type(exc).__name__, endpoint=endpoint)
+                    continue
+
+                raise exc
+            except Exception as exc:
+                logger.error("Unexpected exception: %s", exc)
                 raise exc
+
+    async def _send_attempt(self, session: aiohttp.ClientSession, endpoint: str, method: str, url: str,
+                            stream: bool, kwargs: Dict[str, Any], context: Optional[RequestContext]) -> Any:
+        """
+        Send one attempt, reporting it to the hooks and metrics that are set
+        """
+        if context is not None:
+            return await self._send_traced(session, endpoint, method, url, stream, kwargs, context)
+        if "files" in kwargs:
+            # FormData is consumed by the request it is sent with, so every attempt builds its own
+            kwargs = dict(kwargs)
+            kwargs["data"] = self._to_form_data(kwargs.pop("files"))
+        if self.metrics is None:
+            return await self._send(session, method, url, stream, kwargs)
+        return await self._send_measured(session, endpoint, method, url, stream, kwargs)
+
+    @staticmethod
+    async def _send(session: aiohttp.ClientSession, method: str, url: str, stream: bool,
+                    kwargs: Dict[str, Any], outcome: Optional[Dict[str, Any]] = None, decode: bool = True) -> Any:
+        """
+        Send one attempt and decode its response
+
+        Args:
+            outcome: Optional dict receiving the status and sizes of the response
+            decode: Decode the body; otherwise return the response with its body read
+        """
+        if stream:
+            response = await session.request(method, url, **kwargs)
+            if outcome is not None:
+                outcome["status"] = str(response.status)
+                outcome["sent"] = int(response.request_info.headers.get("Content-Length") or 0)
+                outcome["received"] = response.content_length or 0
+            if response.ok:
+                return response
+            response.release()
+            response.raise_for_status()
+
+        async with session.request(method, url, **kwargs) as response:
+            if outcome is not None:
+                outcome["status"] = str(response.status)
+                outcome["sent"] = int(response.request_info.headers.get("Content-Length") or 0)
+                outcome["received"] = len(await response.read())
+            response.raise_for_status()
+            if not decode:
+                await response.read()
+                return response
+            return await response.json(content_type=None)
+
+    async def _send_traced(self, session: aiohttp.ClientSession, endpoint: str, method: str, url: str,
+                           stream: bool, kwargs: Dict[str, Any], context: RequestContext) -> Any:
+        """
+        Send one attempt, reporting its serialization, round trip and decoding to the hooks
+
+        The body is encoded into an aiohttp payload before the request is
+        sent, so the time spent encoding it is reported apart.
+        """
+        with run_phase(self.hooks, Phase.SERIALIZE, context):
+            kwargs = dict(kwargs)
+            if kwargs.get("json") is not None:
+                kwargs["data"] = aiohttp.JsonPayload(kwargs.pop("json"), dumps=json.dumps)
+            elif "files" in kwargs:
+                kwargs["data"] = self._to_form_data(kwargs.pop("files"))()
+
+        # An error status is a completed round trip; it is raised once the phase is reported
+        failure = None
+        with run_phase(self.hooks, Phase.NETWORK, context):
+            try:
+                if self.metrics is None:
+                    response = await self._send(session, method, url, stream, kwargs, decode=False)
+                else:
+                    response = await self._send_measured(session, endpoint, method, url, stream, kwargs, decode=False)
+                context.status = response.status
+            except ClientResponseError as exc:
+                context.status = exc.status
+                failure = exc
+        if failure is not None:
+            raise failure
+
+        if stream:
+            return response
+        with run_phase(self.hooks, Phase.DECODE, context):
+            return await response.json(content_type=None)
+
+    async def _send_measured(self, session: aiohttp.ClientSession, endpoint: str, method: str, url: str,
+                             stream: bool, kwargs: Dict[str, Any], decode: bool = True) -> Any:
+        """
+        Send one attempt, reporting its latency, status and sizes to the metrics
+        """
+        outcome = {"status": "error", "sent": 0, "received": 0}
+        self.metrics.start_request(endpoint)
+        started = time.perf_counter()
+        try:
+            return await self._send(session, method, url, stream, kwargs, outcome, decode)
         except Exception as exc:
-            logger.error("Unexpected exception: %s", exc)
-            raise exc
+            if outcome["status"] == "error":
+                outcome["status"] = type(exc).__name__
+            raise
+        finally:
+            self.metrics.finish_request(
+                endpoint, method, outcome["status"], time.perf_counter() - started, outcome["sent"], outcome["received"]
+            )
+
+    async def _wait_before_retry(self, attempt: int, reason: str, retry_after: Optional[float] = None,
+                                 endpoint: Optional[str] = None) -> None:
+        """
+        Sleep for the backoff delay of the retry policy
+        """
+        delay = self.retry_policy.backoff(attempt, retry_after)
+        self.retry_policy.stats.record_retry(reason)
+        if self.metrics is not None:
+            self.metrics.record_retry(endpoint, reason)
+        logger.warning("Retrying request after %s in %.2fs (attempt %d)", reason, delay, attempt + 1)
+        await asyncio.sleep(delay)
 
     async def initialize(self) -> None:
         """
         Initialize the client by logging in and setting the token
 
         If a token was provided in the constructor, it will be used.
-        Otherwise, a new token will be obtained by logging in.
+        Otherwise, a valid token from the token store is used, or a new
+        token is obtained by logging in.
         """
-        if self.token is None:
-            logger.info("No token provided, logging in")
-            response = await self.login()
-            self.token = response.data.token
-            self.headers["Authorization"] = f"Bearer {self.token}"
+        if self.token is not None:
+            if self._unsaved_token is not None:
+                token, self._unsaved_token = self._unsaved_token, None
+                await self._run_store(self.token_store.set, token_key(self.email, self.network), token)
+            return
+
+        async with self._get_refresh_lock():
+            if self.token is not None:
+                return
+
+            if self.token_store is None:
+                logger.info("No token provided, logging in")
+                response = await self.login()
+                self._set_token(response.data.token)
+                return
+
+            # Log in under the store lock, so clients sharing the store log in once
+            async with self.token_store.async_lock(token_key(self.email, self.network)):
+                token = await self._run_store(self._load_stored_token)
+                if token is not None:
+                    logger.info("Using token from the token store")
+                    self._set_token(token)
+                else:
+                    logger.info("No token provided, logging in")
+                    response = await self.login()
+                    await self._save_token(response.data.token)
+
+    def _context(self, endpoint: Endpoint, method: str, **fields) -> Optional[RequestContext]:
+        """
+        Return the context of a call to `endpoint`, or None if there are no hooks to trace it
+        """
+        if self.hooks is None:
+            return None
+        return RequestContext(endpoint.value, method, **fields)
+
+    async def _cached(self, endpoint: Endpoint, loader: Callable[[], Awaitable[Any]], params: Hashable = None) -> Any:
+        """
+        Return the cached response of `endpoint`, awaiting `loader` on a miss
+        """
+        if self.cache is None:
+            return await loader()
+        return await self.cache.fetch_async((token_key(self.email, self.network), endpoint.value, params), loader)
+
+    def _invalidate_after(self, endpoint: Endpoint) -> None:
+        """
+        Drop the cached responses made outdated by a request to `endpoint`
+        """
+        if self.cache is not None:
+            self.cache.invalidate_after(token_key(self.email, self.network), endpoint.value)
+
+    async def _charge(self, texts: Iterable[str], reservation: Optional[Reservation] = None) -> ContextManager:
+        """
+        Charge the parts of `texts` to the balance accountant for the duration of a send,
+        fetching the balance first when it is due for a resync
+        """
+        accountant = reservation.accountant if reservation is not None else self.balance
+        if accountant is None:
+            return nullcontext()
+
+        if accountant.claim_sync():
+            await self._sync_balance(accountant)
+        return accountant.charge(count_batch_parts(texts), reservation)
+
+    async def _sync_balance(self, accountant: BalanceAccountant) -> None:
+        """
+        Fetch the balance for a claimed resync and pass it to `accountant`
+
+        A get-limit response without a balance releases the claim instead
+        of recording a balance of 0, so the send goes ahead against the last
+        known balance and the next send tries again.
+        """
+        try:
+            try:
+                response = await self._get_balance()
+            except eskiz_exception.TokenExpired:
+                await self.login()
+                response = await self._get_balance()
+        except Exception:
+            accountant.release_sync()
+            raise
+
+        balance = response.data.get("balance") if response.status == "success" else None
+        if balance is None:
+            logger.warning("Balance resync failed with status %s", response.status)
+            accountant.release_sync()
+            return
+        accountant.update(balance)
 
     async def login(self) -> eskiz_response.LoginResponse:
         """
         Authenticates with the Eskiz server
         """
-        data = eskiz_request.LoginRequest(
-            email=self.email,
-            password=self.password,
-        ).model_dump()
+        context = self._context(Endpoint.LOGIN, "POST")
+        with run_phase(self.hooks, Phase.BUILD, context):
+            data = eskiz_request.LoginRequest(
+                email=self.email,
+                password=self.password,
+            ).model_dump()
 
         url = f"{self.network}/api/auth/login"
-        response = await self._request("POST", url, data=data)
+        if self.metrics is not None:
+            self.metrics.record_login()
+        response = await self._request("POST", url, data=data, context=context)
 
-        return eskiz_response.LoginResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.LoginResponse(**response)
 
     async def refresh_token(self) -> eskiz_response.RefreshTokenResponse:
         """
@@ -134,44 +577,110 @@ class AsyncClient:
             await self.initialize()
             return None
 
-        # Create a new session for token refresh to avoid recursion
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.request("PATCH", url, headers=self.headers) as response:
-                    response.raise_for_status()
-                    response_data = await response.json()
-                    token_response = eskiz_response.RefreshTokenResponse(**response_data)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check(Endpoint.REFRESH.value)
 
-                    # Update token and headers
-                    self.token = token_response.data.token
-                    self.headers["Authorization"] = f"Bearer {self.token}"
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(Endpoint.from_url(url))
 
-                    return token_response
-            except Exception as e:
-                logger.error("Token refresh failed: %s", e)
-                raise
+        # Send a single attempt rather than use _request, to avoid recursion
+        session = await self._get_session()
+        kwargs = {"headers": self.headers}
+        context = self._context(Endpoint.REFRESH, "PATCH")
+        if self.metrics is not None:
+            self.metrics.record_refresh()
+        try:
+            if context is not None:
+                context.attempt = 1
+            if self.circuit_breaker is None:
+                response_data = await self._send_attempt(
+                    session, Endpoint.REFRESH.value, "PATCH", url, False, kwargs, context
+                )
+            else:
+                with self.circuit_breaker.guard(Endpoint.REFRESH.value):
+                    response_data = await self._send_attempt(
+                        session, Endpoint.REFRESH.value, "PATCH", url, False, kwargs, context
+                    )
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                token_response = eskiz_response.RefreshTokenResponse(**response_data)
+
+            # Update token and headers
+            await self._save_token(token_response.data.token)
+
+            return token_response
+        except Exception as e:
+            logger.error("Token refresh failed: %s", e)
+            raise
 
-    async def _handle_token_expired(self) -> bool:
+    async def _handle_token_expired(self, rejected_authorization: Optional[str] = None) -> bool:
         """
         Handle token expiration by attempting to refresh the token
 
+        Concurrent callers are serialized so that a burst of 401 responses
+        triggers a single refresh; callers whose rejected token has already
+        been replaced reuse the new token.
+
+        Args:
+            rejected_authorization: Authorization header of the request that got the 401
+
         Returns:
             bool: True if token was successfully refreshed, False otherwise
         """
-        try:
-            await self.refresh_token()
-            return True
-        except Exception as e:
-            logger.warning("Token refresh failed, attempting to login again: %s", e)
+        async with self._get_refresh_lock():
+            if rejected_authorization is not None and rejected_authorization != self.headers.get("Authorization"):
+                logger.info("Token already refreshed by a concurrent request")
+                return True
+
+            # Another client sharing the token store may have renewed it already
+            stored = await self._run_store(self._load_stored_token)
+            if stored is not None and f"Bearer {stored}" != self.headers.get("Authorization"):
+                logger.info("Using token renewed by another client from the token store")
+                self._set_token(stored)
+                return True
+
             try:
-                # Try to login again
-                response = await self.login()
-                self.token = response.data.token
-                self.headers["Authorization"] = f"Bearer {self.token}"
+                await self.refresh_token()
                 return True
-            except Exception as login_error:
-                logger.error("Login failed after token refresh failure: %s", login_error)
-                return False
+            except Exception as e:
+                logger.warning("Token refresh failed, attempting to login again: %s", e)
+                try:
+                    # Try to login again
+                    response = await self.login()
+                    await self._save_token(response.data.token)
+                    return True
+                except Exception as login_error:
+                    logger.error("Login failed after token refresh failure: %s", login_error)
+                    return False
+
+    async def _user(self) -> eskiz_response.UserResponse:
+        """
+        Retrieves user information
+        """
+        url = f"{self.network}/api/auth/user"
+        context = self._context(Endpoint.USER, "GET")
+
+        async def load():
+            response = await self._request("GET", url, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.UserResponse(**response)
+
+        return await self._cached(Endpoint.USER, load)
+
+    async def user(self) -> eskiz_response.UserResponse:
+        """
+        Retrieves user information
+
+        Returns:
+            UserResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._user()
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._user()
 
     async def _send_sms(self, phone_number: int, message: str) -> eskiz_response.SendSMSResponse:
         """
@@ -182,22 +691,35 @@ class AsyncClient:
             message: The message text
         """
         url = f"{self.network}/api/message/sms/send"
+        context = self._context(Endpoint.SEND_SMS, "POST")
 
-        files = eskiz_request.SendSMSRequest(
-            phone_number=phone_number,
-            message=message,
-            from_=self.from_,
-            callback_url=self.callback,
-        ).to_file()
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = send_sms_files(phone_number, message, self.from_, self.callback, self.validate)
 
-        # Convert files dict to FormData
-        form_data = aiohttp.FormData()
-        for key, value in files.items():
-            form_data.add_field(key, value[1])
+        if self.hedge_policy is None:
+            response = await self._request("POST", url, files=files, headers=self.headers, context=context)
+        else:
+            response = await self._send_hedged(url, files, context)
+        self._invalidate_after(Endpoint.SEND_SMS)
 
-        response = await self._request("POST", url, data=form_data, headers=self.headers)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.SendSMSResponse(**response)
 
-        return eskiz_response.SendSMSResponse(**response)
+    async def _send_hedged(self, url: str, files: Dict[str, Any], context: Optional[RequestContext]) -> Any:
+        """
+        Send a send_sms request, sending it again if it is slower than the hedge policy allows
+
+        Both attempts carry the same Idempotency-Key header; the slower one is cancelled.
+        """
+        headers = {**self.headers, hedge.IDEMPOTENCY_HEADER: hedge.new_idempotency_key()}
+
+        def send(hedging: bool) -> Awaitable[Any]:
+            attempt_context = self._context(Endpoint.SEND_SMS, "POST") if hedging else context
+            return self._request(
+                "POST", url, files=files, headers=dict(headers), context=attempt_context
+            )
+
+        return await hedge.hedged_async(send, self.hedge_policy, Endpoint.SEND_SMS.value, self.metrics)
 
     async def send_sms(self, phone_number: int, message: str) -> eskiz_response.SendSMSResponse:
         """
@@ -213,11 +735,12 @@ class AsyncClient:
         if self.token is None:
             await self.initialize()
 
-        try:
-            return await self._send_sms(phone_number, message)
-        except eskiz_exception.TokenExpired:
-            await self.login()
-            return await self._send_sms(phone_number, message)
+        with await self._charge([message]):
+            try:
+                return await self._send_sms(phone_number, message)
+            except eskiz_exception.TokenExpired:
+                await self.login()
+                return await self._send_sms(phone_number, message)
 
     async def _send_batch_sms(
         self,
@@ -234,12 +757,16 @@ class AsyncClient:
             dispatch_id: Optional dispatch ID
         """
         url = f"{self.network}/api/message/sms/send-batch"
+        context = self._context(Endpoint.SEND_BATCH, "POST", dispatch_id=dispatch_id)
 
         # Convert the messages to JSON format
-        data = {
-            "messages": messages,
-            "from": from_
-        }
+        with run_phase(self.hooks, Phase.BUILD, context):
+            data = {
+                "messages": prepare_batch_messages(messages, self.validate_batches),
+                "from": from_
+            }
+        if context is not None:
+            context.user_sms_ids = bulk.message_ids(data["messages"])
 
         if dispatch_id is not None:
             data["dispatch_id"] = dispatch_id
@@ -247,15 +774,19 @@ class AsyncClient:
         headers = self.headers.copy()
         headers["Content-Type"] = "application/json"
 
-        response = await self._request("POST", url, json=data, headers=headers)
+        response = await self._request("POST", url, json=data, headers=headers, context=context)
+        self._invalidate_after(Endpoint.SEND_BATCH)
 
-        return eskiz_response.SendBatchSMSResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.SendBatchSMSResponse(**response)
 
     async def send_batch_sms(
         self,
         messages: List[Dict[str, Any]],
         from_: Optional[str] = None,
-        dispatch_id: Optional[int] = None
+        dispatch_id: Optional[int] = None,
+        reservation: Optional[Reservation] = None,
+        normalize: bool = False,
     ) -> eskiz_response.SendBatchSMSResponse:
         """
         Sends multiple SMS messages in a single request
@@ -264,20 +795,76 @@ class AsyncClient:
             messages: List of message dictionaries with user_sms_id, to, and text fields
             from_: Sender ID (defaults to the client's from_ if not provided)
             dispatch_id: Optional dispatch ID for tracking
+            reservation: Optional balance Reservation charged instead of the free balance
+            normalize: Normalize the `to` numbers to E.164, dropping messages with invalid numbers
 
         Returns:
             SendBatchSMSResponse: Response from the API
+
+        Raises:
+            InvalidPhoneNumber: If `normalize` is set and every number is invalid
         """
         if self.token is None:
             await self.initialize()
 
         sender = from_ if from_ is not None else self.from_
+        if normalize:
+            messages = normalize_batch(messages)
 
-        try:
-            return await self._send_batch_sms(messages, sender, dispatch_id)
-        except eskiz_exception.TokenExpired:
-            await self.login()
-            return await self._send_batch_sms(messages, sender, dispatch_id)
+        with await self._charge(bulk.message_texts(messages), reservation):
+            try:
+                return await self._send_batch_sms(messages, sender, dispatch_id)
+            except eskiz_exception.TokenExpired:
+                await self.login()
+                return await self._send_batch_sms(messages, sender, dispatch_id)
+
+    async def send_bulk(
+        self,
+        messages: Iterable[bulk.Message],
+        from_: Optional[str] = None,
+        dispatch_id: Optional[int] = None,
+        chunk_size: int = bulk.DEFAULT_CHUNK_SIZE,
+        max_bytes: int = bulk.DEFAULT_MAX_BYTES,
+        max_in_flight: int = bulk.DEFAULT_MAX_IN_FLIGHT,
+        reservation: Optional[Reservation] = None,
+        normalize: bool = False,
+    ) -> AsyncIterator[eskiz_response.SendBatchSMSResponse]:
+        """
+        Sends an arbitrarily large stream of messages as concurrent batch requests
+
+        Messages are consumed lazily and packed into chunks of at most
+        `chunk_size` messages or `max_bytes` of JSON, so memory use is bounded
+        by `max_in_flight` chunks regardless of the number of recipients.
+
+        Args:
+            messages: Iterable of BatchSMSMessage models or message dictionaries
+            from_: Sender ID (defaults to the client's from_ if not provided)
+            dispatch_id: Optional dispatch ID applied to every chunk
+            chunk_size: Maximum number of messages per batch request
+            max_bytes: Maximum JSON size of the messages per batch request
+            max_in_flight: Maximum number of concurrent batch requests
+            reservation: Optional balance Reservation charged instead of the free balance
+            normalize: Normalize the `to` numbers to E.164, dropping messages with invalid numbers
+
+        Yields:
+            SendBatchSMSResponse: Response for each chunk, in completion order
+
+        Raises:
+            BulkSendFailed: After the chunks in flight complete, if any chunk failed;
+                its `failed` list holds each failed chunk with its exception
+        """
+        if self.token is None:
+            await self.initialize()
+
+        def send(chunk):
+            return self.send_batch_sms(chunk, from_, dispatch_id, reservation)
+
+        if normalize:
+            messages = iter_normalized_messages(messages)
+
+        chunks = bulk.iter_chunks(messages, chunk_size, max_bytes)
+        async for response in bulk.iter_completed_async(send, chunks, max_in_flight):
+            yield response
 
     async def _send_global_sms(
         self,
@@ -285,7 +872,7 @@ class AsyncClient:
         message: str,
         country_code: str,
         callback_url: str = "",
-        unicode: str = "0"
+        unicode: Optional[str] = None
     ) -> eskiz_response.SendGlobalSMSResponse:
         """
         Sends SMS to international numbers
@@ -295,24 +882,25 @@ class AsyncClient:
             message: Message text
             country_code: Country code (e.g., "US")
             callback_url: Optional callback URL
-            unicode: Unicode flag (0 or 1)
+            unicode: Unicode flag (0 or 1), chosen from the message text if None
         """
         url = f"{self.network}/api/message/sms/send-global"
-
-        files = eskiz_request.SendGlobalSMSRequest(
-            mobile_phone=mobile_phone,
-            message=message,
-            country_code=country_code,
-            callback_url=callback_url,
-            unicode=unicode
-        ).to_file()
-
-        # Convert files dict to FormData
-        form_data = aiohttp.FormData()
-        for key, value in files.items():
-            form_data.add_field(key, value[1])
-
-        await self._request("POST", url, data=form_data, headers=self.headers)
+        context = self._context(Endpoint.SEND_GLOBAL, "POST")
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.SendGlobalSMSRequest(
+                mobile_phone=mobile_phone,
+                message=message,
+                country_code=country_code,
+                callback_url=callback_url,
+                unicode=unicode if unicode is not None else unicode_flag(message)
+            ).to_file()
+
+        await self._request("POST", url, files=files, headers=self.headers, context=context)
+        self._invalidate_after(Endpoint.SEND_GLOBAL)
+        # International prices differ from the part price, so resync instead
+        if self.balance is not None:
+            self.balance.invalidate()
 
         # Since the API returns 200 OK without a specific response body
         return eskiz_response.SendGlobalSMSResponse(success=True)
@@ -323,7 +911,7 @@ class AsyncClient:
         message: str,
         country_code: str,
         callback_url: str = "",
-        unicode: str = "0"
+        unicode: Optional[str] = None
     ) -> eskiz_response.SendGlobalSMSResponse:
         """
         Sends SMS to international numbers
@@ -333,7 +921,7 @@ class AsyncClient:
             message: Message text
             country_code: Country code (e.g., "US")
             callback_url: Optional callback URL
-            unicode: Unicode flag (0 or 1)
+            unicode: Unicode flag (0 or 1), chosen from the message text if None
 
         Returns:
             SendGlobalSMSResponse: Response from the API
@@ -356,8 +944,14 @@ class AsyncClient:
         Fetches the SMS balance from Eskiz.uz
         """
         url = f"{self.network}/api/user/get-limit"
-        response = await self._request("GET", url, headers=self.headers)
-        return eskiz_response.GetLimitResponse(**response)
+        context = self._context(Endpoint.GET_LIMIT, "GET")
+
+        async def load():
+            response = await self._request("GET", url, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.GetLimitResponse(**response)
+
+        return await self._cached(Endpoint.GET_LIMIT, load)
 
     async def get_balance(self) -> int:
         """
@@ -379,10 +973,699 @@ class AsyncClient:
             response = await self._get_balance()
             return response.data.get("balance", 0) if response.status == "success" else 0
 
+    async def _get_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        page_size: str = "20",
+        count: str = "0",
+        is_ad: str = "",
+        status: Optional[str] = None,
+        page: Optional[int] = None
+    ) -> eskiz_response.GetUserMessagesResponse:
+        """
+        Retrieves user messages within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            page_size: Number of results per page
+            count: Count flag
+            is_ad: Advertisement flag
+            status: Optional status filter
+            page: Optional 1-based page number
+        """
+        url = f"{self.network}/api/message/sms/get-user-messages"
+        context = self._context(Endpoint.USER_MESSAGES, "GET")
+        query = {}
+        if status is not None:
+            query["status"] = status
+        if page is not None:
+            query["page"] = page
+        if query:
+            url += f"?{urlencode(query)}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetUserMessagesRequest(
+                start_date=start_date,
+                end_date=end_date,
+                page_size=page_size,
+                count=count,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        response = await self._request("GET", url, files=files, headers=self.headers, context=context)
+
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetUserMessagesResponse(**response)
+
+    async def get_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        page_size: str = "20",
+        count: str = "0",
+        is_ad: str = "",
+        status: Optional[str] = None,
+        page: Optional[int] = None
+    ) -> eskiz_response.GetUserMessagesResponse:
+        """
+        Retrieves user messages within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            page_size: Number of results per page
+            count: Count flag
+            is_ad: Advertisement flag
+            status: Optional status filter
+            page: Optional 1-based page number
+
+        Returns:
+            GetUserMessagesResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_user_messages(
+                start_date, end_date, page_size, count, is_ad, status, page
+            )
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_user_messages(
+                start_date, end_date, page_size, count, is_ad, status, page
+            )
+
+    async def iter_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        page_size: str = paginate.DEFAULT_PAGE_SIZE,
+        is_ad: str = "",
+        status: Optional[str] = None,
+        prefetch: int = paginate.DEFAULT_PREFETCH,
+    ) -> AsyncIterator[eskiz_response.MessageResult]:
+        """
+        Iterates over every user message within a date range, page by page
+
+        The next `prefetch` pages are fetched as concurrent tasks while the
+        current one is consumed, so memory use stays flat however many
+        messages the range holds. Use a closed date range: messages arriving
+        during iteration shift later pages.
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            page_size: Number of results per page
+            is_ad: Advertisement flag
+            status: Optional status filter
+            prefetch: Number of pages fetched ahead
+
+        Yields:
+            MessageResult: Each message, in page order
+        """
+        async def fetch(page):
+            response = await self.get_user_messages(
+                start_date, end_date, page_size, is_ad=is_ad, status=status, page=page
+            )
+            return response.data
+
+        async for page in paginate.iter_pages_async(fetch, prefetch):
+            for message in page.result:
+                yield message
+
+    async def download_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        shards: int = shard.DEFAULT_SHARDS,
+        max_workers: int = shard.DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+        page_size: str = paginate.DEFAULT_PAGE_SIZE,
+        is_ad: str = "",
+        status: Optional[str] = None,
+    ) -> AsyncIterator[eskiz_response.MessageResult]:
+        """
+        Downloads every user message within a date range over parallel time shards
+
+        The range is split into `shards` consecutive ranges that are paged
+        through concurrently by up to `max_workers` tasks. Messages returned
+        by two adjacent shards are yielded once.
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            shards: Number of time shards
+            max_workers: Maximum number of shards fetched concurrently
+            ordered: Yield messages in range order instead of as pages complete
+            page_size: Number of results per page
+            is_ad: Advertisement flag
+            status: Optional status filter
+
+        Yields:
+            MessageResult: Each message of the range once
+        """
+        def fetch_shard(shard_start, shard_end):
+            async def fetch(page):
+                response = await self.get_user_messages(
+                    shard_start, shard_end, page_size, is_ad=is_ad, status=status, page=page
+                )
+                return response.data
+            return paginate.iter_pages_async(fetch, prefetch=0)
+
+        shards = shard.split_range(start_date, end_date, shards)
+        async for message in shard.iter_sharded_async(fetch_shard, shards, max_workers, ordered):
+            yield message
+
+    async def _get_user_messages_by_dispatch(
+        self,
+        dispatch_id: str,
+        count: str = "0",
+        is_ad: str = "",
+        status: Optional[str] = None,
+        page: Optional[int] = None
+    ) -> eskiz_response.GetUserMessagesResponse:
+        """
+        Retrieves user messages by dispatch ID
+
+        Args:
+            dispatch_id: Dispatch ID
+            count: Count flag
+            is_ad: Advertisement flag
+            status: Optional status filter
+            page: Optional 1-based page number
+        """
+        url = f"{self.network}/api/message/sms/get-user-messages-by-dispatch"
+        context = self._context(Endpoint.USER_MESSAGES_BY_DISPATCH, "GET", dispatch_id=dispatch_id)
+        query = {}
+        if status is not None:
+            query["status"] = status
+        if page is not None:
+            query["page"] = page
+        if query:
+            url += f"?{urlencode(query)}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetUserMessagesByDispatchRequest(
+                dispatch_id=dispatch_id,
+                count=count,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        response = await self._request("GET", url, files=files, headers=self.headers, context=context)
+
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetUserMessagesResponse(**response)
+
+    async def get_user_messages_by_dispatch(
+        self,
+        dispatch_id: str,
+        count: str = "0",
+        is_ad: str = "",
+        status: Optional[str] = None,
+        page: Optional[int] = None
+    ) -> eskiz_response.GetUserMessagesResponse:
+        """
+        Retrieves user messages by dispatch ID
+
+        Args:
+            dispatch_id: Dispatch ID
+            count: Count flag
+            is_ad: Advertisement flag
+            status: Optional status filter
+            page: Optional 1-based page number
+
+        Returns:
+            GetUserMessagesResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, page)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, page)
+
+    async def _get_dispatch_status(
+        self,
+        user_id: str,
+        dispatch_id: str
+    ) -> eskiz_response.GetDispatchStatusResponse:
+        """
+        Retrieves status of a dispatch
+
+        Args:
+            user_id: User ID
+            dispatch_id: Dispatch ID
+        """
+        url = f"{self.network}/api/message/sms/get-dispatch-status"
+        context = self._context(Endpoint.DISPATCH_STATUS, "GET", dispatch_id=dispatch_id)
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetDispatchStatusRequest(
+                user_id=user_id,
+                dispatch_id=dispatch_id
+            ).to_file()
+
+        response = await self._request("GET", url, files=files, headers=self.headers, context=context)
+
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetDispatchStatusResponse(**response)
+
+    async def get_dispatch_status(
+        self,
+        user_id: str,
+        dispatch_id: str
+    ) -> eskiz_response.GetDispatchStatusResponse:
+        """
+        Retrieves status of a dispatch
+
+        Args:
+            user_id: User ID
+            dispatch_id: Dispatch ID
+
+        Returns:
+            GetDispatchStatusResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_dispatch_status(user_id, dispatch_id)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_dispatch_status(user_id, dispatch_id)
+
+    async def _get_message_status(self, message_id: str) -> eskiz_response.MessageStatusResponse:
+        """
+        Retrieves status of a specific message by ID
+
+        Args:
+            message_id: Message ID
+        """
+        url = f"{self.network}/api/message/sms/status_by_id/{message_id}"
+        context = self._context(Endpoint.MESSAGE_STATUS, "GET")
+
+        response = await self._request("GET", url, headers=self.headers, context=context)
+
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.MessageStatusResponse(**response)
+
+    async def get_message_status(self, message_id: str) -> eskiz_response.MessageStatusResponse:
+        """
+        Retrieves status of a specific message by ID
+
+        Args:
+            message_id: Message ID
+
+        Returns:
+            MessageStatusResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_message_status(message_id)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_message_status(message_id)
+
+    async def _get_templates(self) -> eskiz_response.TemplatesResponse:
+        """
+        Retrieves user templates
+        """
+        url = f"{self.network}/api/user/templates"
+        context = self._context(Endpoint.TEMPLATES, "GET")
+
+        async def load():
+            response = await self._request("GET", url, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TemplatesResponse(**response)
+
+        return await self._cached(Endpoint.TEMPLATES, load)
+
+    async def get_templates(self) -> eskiz_response.TemplatesResponse:
+        """
+        Retrieves user templates
+
+        Returns:
+            TemplatesResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_templates()
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_templates()
+
+    async def _get_totals_by_range(
+        self,
+        start_date: str,
+        end_date: str,
+        is_ad: str = "",
+        status: Optional[str] = None
+    ) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            is_ad: Advertisement flag
+            status: Optional status filter
+        """
+        url = f"{self.network}/api/report/total-by-range"
+        context = self._context(Endpoint.TOTALS_BY_RANGE, "POST")
+        if status is not None:
+            url += f"?{urlencode({'status': status})}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.TotalsByRangeRequest(
+                start_date=start_date,
+                end_date=end_date,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        async def load():
+            response = await self._request("POST", url, files=files, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TotalsResponse(**response)
+
+        return await self._cached(Endpoint.TOTALS_BY_RANGE, load, (start_date, end_date, is_ad, status))
+
+    async def get_totals_by_range(
+        self,
+        start_date: str,
+        end_date: str,
+        is_ad: str = "",
+        status: Optional[str] = None
+    ) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            is_ad: Advertisement flag
+            status: Optional status filter
+
+        Returns:
+            TotalsResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_totals_by_range(start_date, end_date, is_ad, status)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_totals_by_range(start_date, end_date, is_ad, status)
+
+    async def _get_totals_by_dispatch(
+        self,
+        dispatch_id: str,
+        is_ad: str = "",
+        status: Optional[str] = None
+    ) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending of a dispatch
+
+        Args:
+            dispatch_id: Dispatch ID
+            is_ad: Advertisement flag
+            status: Optional status filter
+        """
+        url = f"{self.network}/api/report/total-by-dispatch"
+        context = self._context(Endpoint.TOTALS_BY_DISPATCH, "POST", dispatch_id=dispatch_id)
+        if status is not None:
+            url += f"?{urlencode({'status': status})}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.TotalsByDispatchRequest(
+                dispatch_id=dispatch_id,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        async def load():
+            response = await self._request("POST", url, files=files, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TotalsResponse(**response)
+
+        return await self._cached(Endpoint.TOTALS_BY_DISPATCH, load, (dispatch_id, is_ad, status))
+
+    async def get_totals_by_dispatch(
+        self,
+        dispatch_id: str,
+        is_ad: str = "",
+        status: Optional[str] = None
+    ) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending of a dispatch
+
+        Args:
+            dispatch_id: Dispatch ID
+            is_ad: Advertisement flag
+            status: Optional status filter
+
+        Returns:
+            TotalsResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_totals_by_dispatch(dispatch_id, is_ad, status)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_totals_by_dispatch(dispatch_id, is_ad, status)
+
+    async def _get_user_totals(
+        self,
+        year: str,
+        month: str,
+        is_global: str = "0"
+    ) -> eskiz_response.UserTotalsResponse:
+        """
+        Retrieves the packets bought and sent in a month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            is_global: "1" for international messages
+        """
+        url = f"{self.network}/api/user/totals"
+        context = self._context(Endpoint.USER_TOTALS, "POST")
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.UserTotalsRequest(
+                year=year,
+                month=month,
+                is_global=is_global
+            ).to_file()
+
+        async def load():
+            response = await self._request("POST", url, files=files, headers=self.headers, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.UserTotalsResponse(**response)
+
+        return await self._cached(Endpoint.USER_TOTALS, load, (year, month, is_global))
+
+    async def get_user_totals(
+        self,
+        year: str,
+        month: str,
+        is_global: str = "0"
+    ) -> eskiz_response.UserTotalsResponse:
+        """
+        Retrieves the packets bought and sent in a month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            is_global: "1" for international messages
+
+        Returns:
+            UserTotalsResponse: Response from the API
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._get_user_totals(year, month, is_global)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._get_user_totals(year, month, is_global)
+
+    async def get_monthly_totals(
+        self,
+        months: Iterable[Tuple[int, int]],
+        is_ad: str = "",
+        status: Optional[str] = None,
+        max_workers: int = reports.DEFAULT_MAX_WORKERS,
+    ) -> reports.TotalsSummary:
+        """
+        Retrieves the totals of several months concurrently and adds them up
+
+        Args:
+            months: (year, month) pairs, see `reports.months_between`
+            is_ad: Advertisement flag
+            status: Optional status filter
+            max_workers: Maximum number of concurrent requests
+
+        Returns:
+            TotalsSummary: The summed totals, and the totals keyed by (year, month)
+        """
+        if self.token is None:
+            await self.initialize()
+
+        def fetch(month):
+            return self.get_totals_by_range(*reports.month_range(*month), is_ad, status)
+
+        return reports.merge_totals(await reports.fan_out_async(fetch, months, max_workers))
+
+    async def get_dispatch_totals(
+        self,
+        dispatch_ids: Iterable[str],
+        is_ad: str = "",
+        status: Optional[str] = None,
+        max_workers: int = reports.DEFAULT_MAX_WORKERS,
+    ) -> reports.TotalsSummary:
+        """
+        Retrieves the totals of several dispatches concurrently and adds them up
+
+        Args:
+            dispatch_ids: Dispatch IDs
+            is_ad: Advertisement flag
+            status: Optional status filter
+            max_workers: Maximum number of concurrent requests
+
+        Returns:
+            TotalsSummary: The summed totals, and the totals keyed by dispatch ID
+        """
+        if self.token is None:
+            await self.initialize()
+
+        def fetch(dispatch_id):
+            return self.get_totals_by_dispatch(dispatch_id, is_ad, status)
+
+        return reports.merge_totals(await reports.fan_out_async(fetch, dispatch_ids, max_workers))
+
+    async def _export_messages(self, year: str, month: str, status: str = "all", stream=False) -> Any:
+        """
+        Exports messages for a specific month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+            stream: Return the open response instead of the CSV text
+        """
+        url = f"{self.network}/api/message/export?status={status}"
+        context = self._context(Endpoint.EXPORT, "GET")
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.ExportMessagesRequest(
+                year=year,
+                month=month,
+                status=status
+            ).to_file()
+
+        response = await self._request("GET", url, files=files, headers=self.headers, stream=True, context=context)
+        if stream:
+            return response
+
+        # This endpoint returns CSV data, not JSON
+        try:
+            return await response.text()
+        finally:
+            response.release()
+
+    async def export_messages(self, year: str, month: str, status: str = "all") -> str:
+        """
+        Exports messages for a specific month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+
+        Returns:
+            str: CSV data as a string
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._export_messages(year, month, status)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._export_messages(year, month, status)
+
+    async def _open_export(self, year: str, month: str, status: str) -> aiohttp.ClientResponse:
+        """
+        Sends the export request and returns the response with its body unread
+        """
+        if self.token is None:
+            await self.initialize()
+
+        try:
+            return await self._export_messages(year, month, status, stream=True)
+        except eskiz_exception.TokenExpired:
+            await self.login()
+            return await self._export_messages(year, month, status, stream=True)
+
+    async def export_messages_to(self, file: export.Target, year: str, month: str, status: str = "all",
+                                 chunk_size: int = export.DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Streams the export of a month to a file without holding it in memory
+
+        Args:
+            file: Path or binary file object the CSV is written to
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+            chunk_size: Size of the chunks read from the connection
+
+        Returns:
+            int: Number of bytes written
+        """
+        async with await self._open_export(year, month, status) as response:
+            return await export.write_chunks_async(response.content.iter_chunked(chunk_size), file)
+
+    async def iter_export_rows(self, year: str, month: str, status: str = "all",
+                               chunk_size: int = export.DEFAULT_CHUNK_SIZE) -> AsyncIterator[export.Row]:
+        """
+        Streams the export of a month as parsed CSV rows
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+            chunk_size: Size of the chunks read from the connection
+
+        Yields:
+            dict: Each row, keyed by the CSV header
+        """
+        async with await self._open_export(year, month, status) as response:
+            async for row in export.iter_rows_async(response.content.iter_chunked(chunk_size)):
+                yield row
+
     async def close(self) -> None:
         """
-        Close the aiohttp session
+        Close the aiohttp session and stop the token renewal task
         """
+        if self._renewal_task is not None:
+            self._renewal_task.cancel()
+            self._renewal_task = None
+
         if self._session is not None and not self._session.closed:
             await self._session.close()
             self._session = None
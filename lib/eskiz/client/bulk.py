@@ -0,0 +1,195 @@
+"""
+Bulk send helpers shared by the sync and async clients
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from eskiz.exception import BulkSendFailed
+from eskiz.request import BatchSMSMessage
+
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_MAX_BYTES = 512 * 1024
+DEFAULT_MAX_IN_FLIGHT = 4
+
+Message = Union[BatchSMSMessage, Dict[str, Any]]
+Chunk = List[Dict[str, Any]]
+
+
+def iter_chunks(
+    messages: Iterable[Message],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> Iterator[Chunk]:
+    """
+    Lazily pack messages into send-batch chunks
+
+    A chunk is emitted as soon as adding the next message would exceed
+    `chunk_size` messages or roughly `max_bytes` of JSON, so only one chunk
+    is held in memory at a time.
+
+    Args:
+        messages: Iterable of BatchSMSMessage models or message dictionaries
+        chunk_size: Maximum number of messages per chunk
+        max_bytes: Maximum JSON size of the messages in a chunk
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    chunk: Chunk = []
+    size = 0
+
+    for message in messages:
+        if isinstance(message, BatchSMSMessage):
+            message = message.model_dump()
+
+        # Account for the ", " separator between list items
+        message_size = len(json.dumps(message)) + 2
+
+        if chunk and (len(chunk) >= chunk_size or size + message_size > max_bytes):
+            yield chunk
+            chunk = []
+            size = 0
+
+        chunk.append(message)
+        size += message_size
+
+    if chunk:
+        yield chunk
+
+
+def message_texts(messages: Iterable[Message]) -> Iterator[str]:
+    """
+    Yield the text of each BatchSMSMessage model or message dictionary
+    """
+    for message in messages:
+        yield message.text if isinstance(message, BatchSMSMessage) else message["text"]
+
+
+def message_ids(messages: Iterable[Message]) -> Tuple[str, ...]:
+    """
+    Return the `user_sms_id` of each BatchSMSMessage model or message dictionary
+    """
+    return tuple(
+        message.user_sms_id if isinstance(message, BatchSMSMessage) else message["user_sms_id"]
+        for message in messages
+    )
+
+
+def iter_completed(
+    send: Callable[[Chunk], Any],
+    chunks: Iterable[Chunk],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[Any]:
+    """
+    Run `send` on each chunk in a thread pool and yield results as they complete
+
+    At most `max_in_flight` chunks are pulled from `chunks` at any time.
+    After a chunk fails no further chunks are pulled, but the chunks in
+    flight complete and their results are yielded before BulkSendFailed
+    is raised.
+
+    Args:
+        send: Callable sending one chunk
+        chunks: Iterable of chunks
+        max_in_flight: Maximum number of concurrent requests
+
+    Raises:
+        BulkSendFailed: With every failed chunk and its exception
+    """
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    pending = {}
+    failed = []
+
+    try:
+        for chunk in chunks:
+            pending[executor.submit(send, chunk)] = chunk
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from _completed(done, pending, failed)
+                if failed:
+                    break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from _completed(done, pending, failed)
+    finally:
+        # Only reached with chunks pending when the caller stops iterating;
+        # chunks already being sent are waited for by the shutdown
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+    if failed:
+        raise BulkSendFailed(failed) from failed[0][1]
+
+
+def _completed(
+    done: Iterable[Any],
+    pending: Dict[Any, Chunk],
+    failed: List[Tuple[Chunk, BaseException]],
+) -> Iterator[Any]:
+    """
+    Yield the results of the `done` futures or tasks, removing them from
+    `pending` and adding the failed ones with their chunk to `failed`
+    """
+    for future in done:
+        chunk = pending.pop(future)
+        error = future.exception()
+        if error is None:
+            yield future.result()
+        else:
+            failed.append((chunk, error))
+
+
+async def iter_completed_async(
+    send: Callable[[Chunk], Awaitable[Any]],
+    chunks: Iterable[Chunk],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> AsyncIterator[Any]:
+    """
+    Run `send` on each chunk as asyncio tasks and yield results as they complete
+
+    At most `max_in_flight` chunks are pulled from `chunks` at any time.
+    After a chunk fails no further chunks are pulled, but the chunks in
+    flight complete and their results are yielded before BulkSendFailed
+    is raised. Chunks in flight are not cancelled when the caller stops
+    iterating, as their messages may already be delivered.
+
+    Args:
+        send: Coroutine function sending one chunk
+        chunks: Iterable of chunks
+        max_in_flight: Maximum number of concurrent requests
+
+    Raises:
+        BulkSendFailed: With every failed chunk and its exception
+    """
+    pending = {}
+    failed = []
+
+    try:
+        for chunk in chunks:
+            pending[asyncio.ensure_future(send(chunk))] = chunk
+            if len(pending) >= max_in_flight:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for result in _completed(done, pending, failed):
+                    yield result
+                if failed:
+                    break
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for result in _completed(done, pending, failed):
+                yield result
+    finally:
+        if pending:
+            await asyncio.wait(pending)
+            for task in pending:
+                # Retrieve the outcome, so a failure is not reported as never retrieved
+                if not task.cancelled():
+                    task.exception()
+
+    if failed:
+        raise BulkSendFailed(failed) from failed[0][1]
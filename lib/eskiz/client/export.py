@@ -0,0 +1,130 @@
+"""
+Streaming CSV export helpers shared by the sync and async clients
+"""
+import codecs
+import csv
+import os
+from contextlib import contextmanager
+from typing import IO, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+Target = Union[str, os.PathLike, IO[bytes]]
+Row = Dict[str, str]
+
+
+@contextmanager
+def open_target(file: Target) -> Iterator[IO[bytes]]:
+    """
+    Open `file` for binary writing if it is a path, or use it as is
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "wb") as target:
+            yield target
+    else:
+        yield file
+
+
+def write_chunks(chunks: Iterable[bytes], file: Target) -> int:
+    """
+    Write `chunks` to a path or binary file object
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    with open_target(file) as target:
+        for chunk in chunks:
+            target.write(chunk)
+            written += len(chunk)
+    return written
+
+
+async def write_chunks_async(chunks: AsyncIterable[bytes], file: Target) -> int:
+    """
+    Write `chunks` from an async iterable to a path or binary file object
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    with open_target(file) as target:
+        async for chunk in chunks:
+            target.write(chunk)
+            written += len(chunk)
+    return written
+
+
+class RowReader:
+    """
+    Incrementally parses CSV bytes fed in arbitrary chunks into dict rows
+
+    Chunks may split multi-byte characters and quoted fields spanning
+    several lines; only the incomplete last record is kept between feeds.
+    The first row is used as the header.
+    """
+    def __init__(self, encoding: str = "utf-8-sig"):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._pending = ""
+        self._header: Optional[List[str]] = None
+
+    def feed(self, data: bytes, final: bool = False) -> List[Row]:
+        """
+        Parse `data` and return the rows it completes
+
+        Args:
+            data: Next chunk of the CSV body
+            final: True for the last call, which flushes the last record
+        """
+        text = self._pending + self._decoder.decode(data, final)
+
+        # A record ends at a newline outside quotes, where the quote count is even
+        records = []
+        start = position = quotes = 0
+        while True:
+            newline = text.find("\n", position)
+            if newline == -1:
+                break
+            quotes += text.count('"', position, newline)
+            position = newline + 1
+            if quotes % 2 == 0:
+                records.append(text[start:position])
+                start = position
+                quotes = 0
+
+        self._pending = text[start:]
+        if final and self._pending:
+            records.append(self._pending)
+            self._pending = ""
+
+        rows = []
+        for row in csv.reader(records):
+            if not row:
+                continue
+            if self._header is None:
+                self._header = row
+            else:
+                rows.append(dict(zip(self._header, row)))
+        return rows
+
+
+def iter_rows(chunks: Iterable[bytes]) -> Iterator[Row]:
+    """
+    Yield the CSV rows of a body streamed as `chunks`
+    """
+    reader = RowReader()
+    for chunk in chunks:
+        yield from reader.feed(chunk)
+    yield from reader.feed(b"", final=True)
+
+
+async def iter_rows_async(chunks: AsyncIterable[bytes]) -> AsyncIterator[Row]:
+    """
+    Yield the CSV rows of a body streamed as `chunks` from an async iterable
+    """
+    reader = RowReader()
+    async for chunk in chunks:
+        for row in reader.feed(chunk):
+            yield row
+    for row in reader.feed(b"", final=True):
+        yield row
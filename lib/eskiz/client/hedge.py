@@ -0,0 +1,127 @@
+"""
+Hedged request helpers shared by the sync and async clients
+"""
+import asyncio
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from eskiz.hedge import HedgePolicy
+from eskiz.metrics import Metrics
+
+
+# Header carrying the key shared by a request and its hedge
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+T = TypeVar("T")
+
+
+def new_idempotency_key() -> str:
+    """
+    Return a random key identifying one logical request
+    """
+    return uuid.uuid4().hex
+
+
+def _record(metrics: Optional[Metrics], endpoint: str, event: str) -> None:
+    if metrics is not None:
+        metrics.record_hedge(endpoint, event)
+
+
+def hedged(
+    send: Callable[[bool], T],
+    policy: HedgePolicy,
+    executor: Executor,
+    hedge_executor: Executor,
+    endpoint: str,
+    metrics: Optional[Metrics] = None,
+) -> T:
+    """
+    Run `send` on the executor, and on the hedge executor if it has not returned within the policy delay
+
+    `send` is called with False for the first attempt and True for the
+    hedge. The first attempt to succeed wins; the other one is left to
+    finish and its result is dropped, as a blocking request cannot be
+    interrupted. Hedges have their own executor so that they never wait
+    behind first attempts, nor first attempts behind hedges.
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        The exception of the first attempt, if no attempt succeeded
+    """
+    started = time.perf_counter()
+    primary = executor.submit(send, False)
+    hedge = None
+    if not wait([primary], timeout=policy.start()).done:
+        if policy.try_hedge():
+            _record(metrics, endpoint, "fired")
+            hedge = hedge_executor.submit(send, True)
+        else:
+            _record(metrics, endpoint, "suppressed")
+
+    pending = {primary} if hedge is None else {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                policy.observe(time.perf_counter() - started)
+                if future is hedge:
+                    policy.stats.record_win()
+                    _record(metrics, endpoint, "won")
+                return future.result()
+    return primary.result()
+
+
+async def hedged_async(
+    send: Callable[[bool], Awaitable[T]],
+    policy: HedgePolicy,
+    endpoint: str,
+    metrics: Optional[Metrics] = None,
+) -> T:
+    """
+    Await `send`, and await it again concurrently if it has not returned within the policy delay
+
+    `send` is called with False for the first attempt and True for the
+    hedge. The first attempt to succeed wins and the other one is
+    cancelled.
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        The exception of the first attempt, if no attempt succeeded
+    """
+    started = time.perf_counter()
+    primary = asyncio.ensure_future(send(False))
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=policy.start())
+        if not done:
+            if policy.try_hedge():
+                _record(metrics, endpoint, "fired")
+                tasks.append(asyncio.ensure_future(send(True)))
+            else:
+                _record(metrics, endpoint, "suppressed")
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.observe(time.perf_counter() - started)
+                    if task is not primary:
+                        policy.stats.record_win()
+                        _record(metrics, endpoint, "won")
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in tasks:
+            if task.done():
+                # Mark the exception of a losing attempt as retrieved
+                if not task.cancelled():
+                    task.exception()
+            else:
+                task.cancel()
@@ -2,11 +2,19 @@
 the http client
 """
 import logging
+import time
+
 import requests
 
-from requests.exceptions import HTTPError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ConnectTimeout, HTTPError, Timeout
+from urllib3.exceptions import NewConnectionError
 
+from eskiz.enum import Endpoint, Phase
 from eskiz.exception import TokenExpired
+from eskiz.hooks import RequestContext, run_phase
+from eskiz.retry import parse_retry_after
 
 
 logger = logging.getLogger(__name__)
@@ -15,20 +23,64 @@ logger = logging.getLogger(__name__)
 class HttpClient:
     """
     A simple HTTP client to handle requests.
+
+    Requests go through a pooled ``requests.Session`` so that TCP and TLS
+    connections to Eskiz are kept alive and reused between calls.
     """
-    def __init__(self, token_refresh_callback=None):
+    def __init__(self, token_refresh_callback=None, pool_connections=10, pool_maxsize=10,
+                 session=None, rate_limiter=None, retry_policy=None, metrics=None, hooks=None,
+                 circuit_breaker=None, authorization=None):
         """
         Initialize the HTTP client
 
         Args:
-            token_refresh_callback: Optional callback function to refresh token
+            token_refresh_callback: Optional callback function to refresh token. It is
+                called with the Authorization header of the rejected request.
+            pool_connections: Number of host pools to cache
+            pool_maxsize: Maximum number of kept-alive connections per host
+            session: Optional session to share with another client. A shared
+                session is not closed by this client.
+            rate_limiter: Optional RateLimiter consulted before each request
+            retry_policy: Optional RetryPolicy for transient failures
+            metrics: Optional Metrics receiving the latency and size of each attempt
+            hooks: Optional RequestHooks receiving the serialize, network and decode phases
+            circuit_breaker: Optional CircuitBreaker rejecting requests to failing endpoints
+            authorization: Optional callable returning the current Authorization header,
+                set on a copy of the headers when a request is resent after a token refresh
         """
         self.token_refresh_callback = token_refresh_callback
+        self.authorization = authorization
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.hooks = hooks
+        self.circuit_breaker = circuit_breaker
+        self._owns_session = session is None
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        self.session = session
+
+    def close(self):
+        """
+        Close the pooled connections owned by this client
+        """
+        if self._owns_session:
+            self.session.close()
 
-    def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=60, retry_count=0):
+    def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=60, retry_count=0,
+                stream=False, context=None):
         """
         Use this method to send request with automatic token refresh
 
+        Responses are decoded as JSON whatever their content type, as error
+        pages and proxies may serve JSON as text; bodies that are not JSON,
+        such as the CSV of the export endpoint, are read with `stream`.
+
         Args:
             method: HTTP method (GET, POST, etc.)
             url: Request URL
@@ -38,6 +90,9 @@ class HttpClient:
             files: Request files
             timeout: Request timeout in seconds
             retry_count: Current retry count (used internally)
+            stream: Return the open ``requests.Response`` without reading the
+                body. The caller must close it.
+            context: RequestContext of the call, created here if hooks are set
         """
         # Maximum number of retries for token refresh
         max_retries = 1
@@ -49,32 +104,164 @@ class HttpClient:
             "data": data,
             "files": files,
             "json": json,
-            "timeout": timeout
+            "timeout": timeout,
+            "stream": stream
         }
 
-        try:
-            response = requests.request(**kwargs)
-            response.raise_for_status()
-            response = response.json()
-            return response
+        endpoint = None
+        if (self.rate_limiter is not None or self.metrics is not None or self.hooks is not None
+                or self.circuit_breaker is not None):
+            endpoint = Endpoint.from_url(url)
+        if self.hooks is not None and context is None:
+            context = RequestContext(endpoint, method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if context is not None:
+                context.attempt += 1
+
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.check(endpoint)
 
-        except HTTPError as exc:
-            logger.error("HTTP error: %s", exc)
-
-            # Handle token expiration with auto-refresh
-            if exc.response.status_code == 401 and retry_count < max_retries:
-                if self.token_refresh_callback and self.token_refresh_callback():
-                    # Token refreshed successfully, retry the request
-                    logger.info("Token refreshed, retrying request")
-                    return self.request(
-                        method, url, headers, data, json, files, timeout, retry_count + 1
-                    )
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(endpoint)
+
+            # Remember the token this attempt is sent with, to detect concurrent refreshes
+            authorization = (headers or {}).get("Authorization")
+
+            try:
+                if self.circuit_breaker is None:
+                    response = self._send(endpoint, kwargs, context)
                 else:
-                    # Token refresh failed or no callback provided
-                    raise TokenExpired() from exc
-            else:
+                    with self.circuit_breaker.guard(endpoint) as call:
+                        response = self._send(endpoint, kwargs, context)
+                        call.status = response.status_code
+                response.raise_for_status()
+                if stream:
+                    return response
+                with run_phase(self.hooks, Phase.DECODE, context):
+                    return response.json()
+
+            except HTTPError as exc:
+                logger.error("HTTP error: %s", exc)
+                exc.response.close()
+                status = exc.response.status_code
+
+                # Handle token expiration with auto-refresh
+                if status == 401 and retry_count < max_retries:
+                    if self.token_refresh_callback and self.token_refresh_callback(authorization):
+                        # Token refreshed successfully, retry the request
+                        logger.info("Token refreshed, retrying request")
+                        if self.authorization is not None and authorization is not None:
+                            headers = {**headers, "Authorization": self.authorization()}
+                        return self.request(
+                            method, url, headers, data, json, files, timeout, retry_count + 1, stream, context
+                        )
+                    else:
+                        # Token refresh failed or no callback provided
+                        raise TokenExpired() from exc
+
+                if self.retry_policy is not None and self.retry_policy.should_retry_status(method, status, attempt):
+                    retry_after = parse_retry_after(exc.response.headers.get("Retry-After"))
+                    self._wait_before_retry(attempt, str(status), retry_after, endpoint)
+                    continue
+
+                raise exc
+
+            except (RequestsConnectionError, Timeout) as exc:
+                logger.error("connection error: %s", exc)
+
+                if self.retry_policy is not None and self.retry_policy.should_retry_error(
+                    method, _request_sent(exc), attempt
+                ):
+                    self._wait_before_retry(attempt, type(exc).__name__, endpoint=endpoint)
+                    continue
+
+                raise exc
+
+            except Exception as exc:
+                logger.error("unexpected exception: %s", exc)
                 raise exc
 
+    def _send(self, endpoint, kwargs, context):
+        """
+        Send one attempt, reporting it to the hooks and metrics that are set
+        """
+        if context is not None:
+            return self._send_traced(endpoint, kwargs, context)
+        if self.metrics is None:
+            return self.session.request(**kwargs)
+        return self._send_measured(endpoint, kwargs)
+
+    def _send_traced(self, endpoint, kwargs, context):
+        """
+        Send one attempt, reporting its serialization and round trip to the hooks
+
+        The request is prepared and sent in two steps, as ``Session.request``
+        does, so the time spent encoding the body is reported apart.
+        """
+        with run_phase(self.hooks, Phase.SERIALIZE, context):
+            prepared = self.session.prepare_request(requests.Request(
+                kwargs["method"], kwargs["url"], headers=kwargs["headers"], files=kwargs["files"],
+                data=kwargs["data"], json=kwargs["json"],
+            ))
+
+        def send():
+            # Proxy and TLS settings from the environment belong to opening the connection
+            settings = self.session.merge_environment_settings(prepared.url, {}, kwargs["stream"], None, None)
+            return self.session.send(prepared, timeout=kwargs["timeout"], allow_redirects=True, **settings)
+
+        with run_phase(self.hooks, Phase.NETWORK, context):
+            response = send() if self.metrics is None else self._send_measured(endpoint, kwargs, send)
+            context.status = response.status_code
+        return response
+
+    def _send_measured(self, endpoint, kwargs, send=None):
+        """
+        Send one attempt, reporting its latency, status and sizes to the metrics
+
+        Args:
+            send: Optional callable sending the attempt instead of ``Session.request``
+        """
+        status, sent, received = "error", 0, 0
+        self.metrics.start_request(endpoint)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(**kwargs) if send is None else send()
+            status = str(response.status_code)
+            body = response.request.body
+            sent = len(body) if isinstance(body, (bytes, str)) else 0
+            if kwargs["stream"]:
+                received = int(response.headers.get("Content-Length") or 0)
+            else:
+                received = len(response.content)
+            return response
         except Exception as exc:
-            logger.error("unexpected exception: %s", exc)
-            raise exc
+            status = type(exc).__name__
+            raise
+        finally:
+            self.metrics.finish_request(
+                endpoint, kwargs["method"], status, time.perf_counter() - started, sent, received
+            )
+
+    def _wait_before_retry(self, attempt, reason, retry_after=None, endpoint=None):
+        """
+        Sleep for the backoff delay of the retry policy
+        """
+        delay = self.retry_policy.backoff(attempt, retry_after)
+        self.retry_policy.stats.record_retry(reason)
+        if self.metrics is not None:
+            self.metrics.record_retry(endpoint, reason)
+        logger.warning("Retrying request after %s in %.2fs (attempt %d)", reason, delay, attempt + 1)
+        time.sleep(delay)
+
+
+def _request_sent(exc):
+    """
+    Return False if the connection failed before the request could be sent
+    """
+    if isinstance(exc, ConnectTimeout):
+        return False
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return not isinstance(reason, NewConnectionError)
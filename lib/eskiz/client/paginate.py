@@ -0,0 +1,84 @@
+"""
+Page iteration helpers shared by the sync and async clients
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+from eskiz.response import MessageData
+
+
+DEFAULT_PAGE_SIZE = "200"
+DEFAULT_PREFETCH = 2
+
+
+def iter_pages(fetch: Callable[[int], MessageData], prefetch: int = DEFAULT_PREFETCH) -> Iterator[MessageData]:
+    """
+    Fetch pages in order, `prefetch` pages ahead of the consumer
+
+    The first page is fetched alone to learn `last_page`; the following
+    pages are fetched on a thread pool while earlier ones are consumed. At
+    most `prefetch + 1` pages are held in memory at a time.
+
+    Args:
+        fetch: Function returning the page with the given 1-based number
+        prefetch: Number of pages fetched ahead (0 fetches one page at a time)
+    """
+    page = fetch(1)
+    last_page = page.last_page
+    yield page
+
+    if prefetch < 1:
+        for number in range(2, last_page + 1):
+            yield fetch(number)
+        return
+
+    numbers = iter(range(2, last_page + 1))
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pending = deque(executor.submit(fetch, number) for number in islice(numbers, prefetch))
+        try:
+            while pending:
+                page = pending.popleft().result()
+                number = next(numbers, None)
+                if number is not None:
+                    pending.append(executor.submit(fetch, number))
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def iter_pages_async(
+    fetch: Callable[[int], Awaitable[MessageData]],
+    prefetch: int = DEFAULT_PREFETCH,
+) -> AsyncIterator[MessageData]:
+    """
+    Fetch pages in order as asyncio tasks, `prefetch` pages ahead of the consumer
+
+    Args:
+        fetch: Coroutine function returning the page with the given 1-based number
+        prefetch: Number of pages fetched ahead (0 fetches one page at a time)
+    """
+    page = await fetch(1)
+    last_page = page.last_page
+    yield page
+
+    if prefetch < 1:
+        for number in range(2, last_page + 1):
+            yield await fetch(number)
+        return
+
+    numbers = iter(range(2, last_page + 1))
+    pending = deque(asyncio.ensure_future(fetch(number)) for number in islice(numbers, prefetch))
+    try:
+        while pending:
+            page = await pending.popleft()
+            number = next(numbers, None)
+            if number is not None:
+                pending.append(asyncio.ensure_future(fetch(number)))
+            yield page
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,112 @@
+"""
+Report fan-out helpers shared by the sync and async clients
+"""
+import asyncio
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Mapping, NamedTuple, Tuple, TypeVar
+
+from eskiz.response import TotalsData, TotalsResponse
+
+
+DEFAULT_MAX_WORKERS = 4
+
+Month = Tuple[int, int]
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class TotalsSummary(NamedTuple):
+    """
+    Totals of several reports, added up, and the totals of each report
+    """
+    totals: TotalsData
+    by_key: Dict[Hashable, TotalsData]
+
+
+def month_range(year: int, month: int) -> Tuple[str, str]:
+    """
+    Return the first and last minute of a month, as totals-by-range dates
+    """
+    last_day = calendar.monthrange(year, month)[1]
+    return f"{year:04d}-{month:02d}-01 00:00", f"{year:04d}-{month:02d}-{last_day:02d} 23:59"
+
+
+def months_between(start: str, end: str) -> List[Month]:
+    """
+    Return the (year, month) pairs from `start` to `end` inclusive
+
+    Args:
+        start: First month, as "YYYY-MM"
+        end: Last month, as "YYYY-MM"
+    """
+    start_year, start_month = map(int, start.split("-"))
+    end_year, end_month = map(int, end.split("-"))
+    months = []
+    for index in range(start_year * 12 + start_month - 1, end_year * 12 + end_month):
+        year, month = divmod(index, 12)
+        months.append((year, month + 1))
+    return months
+
+
+def merge_totals(responses: Mapping[K, TotalsResponse]) -> TotalsSummary:
+    """
+    Add up the totals of several reports, keeping the totals of each one
+    """
+    by_key = {key: response.data for key, response in responses.items()}
+    fields = TotalsData.model_fields
+    totals = TotalsData(**{
+        field: sum(getattr(data, field) for data in by_key.values()) for field in fields
+    })
+    return TotalsSummary(totals, by_key)
+
+
+def fan_out(fetch: Callable[[K], T], keys: Iterable[K], max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[K, T]:
+    """
+    Call `fetch` for each distinct key on a thread pool
+
+    At most `max_workers` calls run at a time. The first failure is raised
+    once it is reached, and calls that have not started are cancelled.
+
+    Returns:
+        dict: The result of each key, in the order of `keys`
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        futures = [executor.submit(fetch, key) for key in keys]
+        try:
+            return {key: future.result() for key, future in zip(keys, futures)}
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+async def fan_out_async(
+    fetch: Callable[[K], Awaitable[T]],
+    keys: Iterable[K],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[K, T]:
+    """
+    Await `fetch` for each distinct key on at most `max_workers` tasks
+
+    Returns:
+        dict: The result of each key, in the order of `keys`
+    """
+    keys = list(dict.fromkeys(keys))
+    results = {}
+    pending = iter(keys)
+
+    async def worker():
+        for key in pending:
+            results[key] = await fetch(key)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(min(max_workers, len(keys)))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return {key: results[key] for key in keys}
@@ -0,0 +1,210 @@
+"""
+Date-range sharding helpers shared by the sync and async clients
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Tuple
+
+from eskiz.response import MessageData, MessageResult
+
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+DEFAULT_SHARDS = 8
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BUFFER_PAGES = 2
+
+Shard = Tuple[str, str]
+
+# Marks the end of a shard in the page queues
+_DONE = object()
+
+
+class _Failed:
+    """
+    Carries the exception of a failed shard to the consumer
+    """
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def split_range(start_date: str, end_date: str, shards: int = DEFAULT_SHARDS) -> List[Shard]:
+    """
+    Split a date range into at most `shards` consecutive ranges
+
+    Adjacent ranges share their boundary minute, because the API filters
+    whole minutes; messages created in that minute are returned by both
+    and removed by BoundaryFilter.
+
+    Args:
+        start_date: Start date in format "YYYY-MM-DD HH:MM"
+        end_date: End date in format "YYYY-MM-DD HH:MM"
+        shards: Maximum number of ranges
+    """
+    start = datetime.strptime(start_date, DATE_FORMAT)
+    end = datetime.strptime(end_date, DATE_FORMAT)
+    minutes = int((end - start).total_seconds() // 60)
+    shards = min(shards, minutes)
+    if shards <= 1:
+        return [(start_date, end_date)]
+
+    bounds = [start + timedelta(minutes=minutes * index // shards) for index in range(shards + 1)]
+    return [
+        (lower.strftime(DATE_FORMAT), upper.strftime(DATE_FORMAT))
+        for lower, upper in zip(bounds, bounds[1:])
+    ]
+
+
+class BoundaryFilter:
+    """
+    Drops messages returned by both shards around a boundary minute
+
+    Only the IDs of messages created in a boundary minute are remembered,
+    so memory does not grow with the size of the range.
+    """
+    def __init__(self, shards: List[Shard]):
+        self._seen = {upper: set() for _, upper in shards[:-1]}
+        self._lock = threading.Lock()
+
+    def first_seen(self, message: MessageResult) -> bool:
+        """
+        Return False if `message` was already accepted from another shard
+        """
+        seen = self._seen.get(message.created_at[:16])
+        if seen is None:
+            return True
+        with self._lock:
+            if message.id in seen:
+                return False
+            seen.add(message.id)
+            return True
+
+
+def _put(pages: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Put `item` on `pages`, giving up once `stop` is set
+    """
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def iter_sharded(
+    fetch_shard: Callable[[str, str], Iterable[MessageData]],
+    shards: List[Shard],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    ordered: bool = True,
+    buffer_pages: int = DEFAULT_BUFFER_PAGES,
+) -> Iterator[MessageResult]:
+    """
+    Fetch shards on a thread pool and yield their messages
+
+    Each shard buffers at most `buffer_pages` pages ahead of the consumer,
+    so memory use is bounded by the number of workers, not the range.
+
+    Args:
+        fetch_shard: Function returning the pages of one shard
+        shards: Shards from split_range
+        max_workers: Maximum number of shards fetched concurrently
+        ordered: Yield shards in range order instead of as pages complete
+        buffer_pages: Number of fetched pages buffered per shard
+    """
+    boundaries = BoundaryFilter(shards)
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(buffer_pages) for _ in shards]
+    else:
+        queues = [queue.Queue(buffer_pages * max_workers)] * len(shards)
+
+    def worker(index):
+        pages = queues[index]
+        try:
+            for page in fetch_shard(*shards[index]):
+                if not _put(pages, page, stop):
+                    return
+        except Exception as exc:  # pylint: disable=broad-except
+            _put(pages, _Failed(exc), stop)
+            return
+        _put(pages, _DONE, stop)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(worker, index) for index in range(len(shards))]
+        sources = queues if ordered else queues[:1]
+        remaining = 1 if ordered else len(shards)
+        try:
+            for pages in sources:
+                for _ in range(remaining):
+                    while True:
+                        item = pages.get()
+                        if item is _DONE:
+                            break
+                        if isinstance(item, _Failed):
+                            raise item.exc
+                        for message in item.result:
+                            if boundaries.first_seen(message):
+                                yield message
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+
+
+async def iter_sharded_async(
+    fetch_shard: Callable[[str, str], AsyncIterator[MessageData]],
+    shards: List[Shard],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    ordered: bool = True,
+    buffer_pages: int = DEFAULT_BUFFER_PAGES,
+) -> AsyncIterator[MessageResult]:
+    """
+    Fetch shards as asyncio tasks and yield their messages
+
+    Args:
+        fetch_shard: Function returning an async iterator of the pages of one shard
+        shards: Shards from split_range
+        max_workers: Maximum number of shards fetched concurrently
+        ordered: Yield shards in range order instead of as pages complete
+        buffer_pages: Number of fetched pages buffered per shard
+    """
+    boundaries = BoundaryFilter(shards)
+    if ordered:
+        queues = [asyncio.Queue(buffer_pages) for _ in shards]
+    else:
+        queues = [asyncio.Queue(buffer_pages * max_workers)] * len(shards)
+    indexes = iter(range(len(shards)))
+
+    async def worker():
+        for index in indexes:
+            pages = queues[index]
+            try:
+                async for page in fetch_shard(*shards[index]):
+                    await pages.put(page)
+            except Exception as exc:  # pylint: disable=broad-except
+                await pages.put(_Failed(exc))
+                return
+            await pages.put(_DONE)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(min(max_workers, len(shards)))]
+    sources = queues if ordered else queues[:1]
+    remaining = 1 if ordered else len(shards)
+    try:
+        for pages in sources:
+            for _ in range(remaining):
+                while True:
+                    item = await pages.get()
+                    if item is _DONE:
+                        break
+                    if isinstance(item, _Failed):
+                        raise item.exc
+                    for message in item.result:
+                        if boundaries.first_seen(message):
+                            yield message
+    finally:
+        for task in tasks:
+            task.cancel()
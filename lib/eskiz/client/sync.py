@@ -2,10 +2,28 @@
 The HTTP synchronous client for Eskiz.uz
 """
 import logging
-from typing import List, Optional, Dict, Any
-
-from eskiz.enum import Network
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Optional, Dict, Any, Callable, ContextManager, Hashable, Iterable, Iterator, Tuple
+from urllib.parse import urlencode
+
+from eskiz.enum import Endpoint, Network, Phase
+from eskiz.balance import BalanceAccountant, Reservation
+from eskiz.breaker import CircuitBreaker
+from eskiz.cache import ResponseCache
+from eskiz.client import bulk, export, hedge, paginate, reports, shard
+from eskiz.client.validation import send_sms_files, prepare_batch_messages
 from eskiz.client.http import HttpClient
+from eskiz.hedge import HedgePolicy
+from eskiz.hooks import RequestContext, RequestHooks, run_phase
+from eskiz.metrics import Metrics
+from eskiz.ratelimit import RateLimiter
+from eskiz.phone import iter_normalized_messages, normalize_batch
+from eskiz.segments import count_batch_parts, unicode_flag
+from eskiz.retry import RetryPolicy
+from eskiz.token import TokenStore, decode_expiry, token_key
 from eskiz import request as eskiz_request
 from eskiz import response as eskiz_response
 from eskiz import exception as eskiz_exception
@@ -25,7 +43,44 @@ class ClientSync:
         from_: str = "4546",
         callback: str = "",
         token: Optional[str] = None,
+        pool_size: int = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_refresh_margin: float = 300,
+        token_store: Optional[TokenStore] = None,
+        lazy: bool = False,
+        validate: bool = True,
+        validate_batches: bool = False,
+        cache: Optional[ResponseCache] = None,
+        balance: Optional[BalanceAccountant] = None,
+        metrics: Optional[Metrics] = None,
+        hooks: Optional[RequestHooks] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
     ):
+        """
+        Args:
+            email: Account email
+            password: Account password
+            network: API base URL
+            from_: Default sender ID
+            callback: Delivery report callback URL
+            token: Optional token to use instead of logging in
+            pool_size: Maximum number of kept-alive connections
+            rate_limiter: Optional RateLimiter consulted before each request
+            retry_policy: Optional RetryPolicy for transient failures
+            token_refresh_margin: Seconds before expiry at which the token is renewed
+            token_store: Optional TokenStore shared with other clients
+            lazy: Log in on the first request instead of in the constructor
+            validate: Validate send_sms requests before sending
+            validate_batches: Validate and coerce batch messages before sending
+            cache: Optional ResponseCache for the responses of read-only endpoints
+            balance: Optional BalanceAccountant charged locally for each send
+            metrics: Optional Metrics receiving request latencies, sizes and counters
+            hooks: Optional RequestHooks receiving the phases of each call
+            circuit_breaker: Optional CircuitBreaker rejecting requests to failing endpoints
+            hedge_policy: Optional HedgePolicy sending a second attempt of slow send_sms requests
+        """
         self.from_ = from_
         self.email = email
         self.password = password
@@ -33,37 +88,235 @@ class ClientSync:
         self.callback = callback
         self.headers = {}
         self.token = token
+        self.token_refresh_margin = token_refresh_margin
+        self.token_store = token_store
+        self.validate = validate
+        self.validate_batches = validate_batches
+        self.cache = cache
+        self.balance = balance
+        self.metrics = metrics
+        self.hooks = hooks
+        self.hedge_policy = hedge_policy
+        self._token_expires_at = None
+        self._token_lifetime = None
+        self._refresh_lock = threading.RLock()
 
         # Initialize HTTP client with token refresh callback
-        self.client = HttpClient(token_refresh_callback=self._handle_token_expired)
+        self.client = HttpClient(
+            token_refresh_callback=self._handle_token_expired,
+            authorization=lambda: self.headers.get("Authorization"),
+            pool_maxsize=pool_size,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            metrics=metrics,
+            hooks=hooks,
+            circuit_breaker=circuit_breaker,
+        )
+
+        # Threads running the first attempts of hedged requests, and separately their hedges,
+        # one per pooled connection each
+        self._send_executor = None
+        self._hedge_executor = None
+        if hedge_policy is not None:
+            self._send_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="eskiz-send")
+            self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="eskiz-hedge")
 
         # Login if no token provided
+        if token:
+            self._set_token(token)
+        elif not lazy:
+            self._authenticate()
+
+    @property
+    def token_expires_in(self) -> Optional[float]:
+        """
+        Seconds until the current token expires, or None if its expiry is unknown
+        """
+        if self._token_expires_at is None:
+            return None
+        return self._token_expires_at - time.time()
+
+    def _set_token(self, token: str, persist: bool = True) -> None:
+        """
+        Use `token` for the following requests and read its expiry
+
+        Args:
+            token: The new token
+            persist: Write the token back to the token store
+        """
+        self.token = token
+        self.headers["Authorization"] = f"Bearer {token}"
+        self._token_expires_at = decode_expiry(token)
+        self._token_lifetime = self.token_expires_in
+
+        if persist and self.token_store is not None:
+            self.token_store.set(token_key(self.email, self.network), token)
+
+    def _load_stored_token(self) -> Optional[str]:
+        """
+        Return the unexpired token of this account from the token store, if any
+        """
+        if self.token_store is None:
+            return None
+
+        token = self.token_store.get(token_key(self.email, self.network))
         if not token:
-            response = self.login()
-            self.token = response.data.token
-            self.headers["Authorization"] = f"Bearer {self.token}"
-        else:
-            self.headers["Authorization"] = f"Bearer {self.token}"
+            return None
+
+        expires_at = decode_expiry(token)
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return token
+
+    def _authenticate(self, timeout=60) -> None:
+        """
+        Use the stored token of this account, or log in and store the new one
+
+        The login happens under the store lock, so clients sharing the store
+        log in once and reuse that token.
+        """
+        if self.token_store is None:
+            response = self.login(timeout)
+            self._set_token(response.data.token)
+            return
+
+        with self.token_store.lock(token_key(self.email, self.network)):
+            token = self._load_stored_token()
+            if token is not None:
+                logger.info("Using token from the token store")
+                self._set_token(token, persist=False)
+            else:
+                response = self.login(timeout)
+                self._set_token(response.data.token)
+
+    def _ensure_token_fresh(self) -> None:
+        """
+        Renew the token if it expires within `token_refresh_margin` seconds,
+        or within half its lifetime for tokens shorter than twice the margin
+        """
+        expires_in = self.token_expires_in
+        if expires_in is None:
+            return
+
+        margin = min(self.token_refresh_margin, (self._token_lifetime or 0) / 2)
+        if expires_in <= margin:
+            logger.info("Token expires in %.0fs, renewing it", expires_in)
+            self._handle_token_expired(self.headers.get("Authorization"))
+
+    def initialize(self, timeout=60) -> None:
+        """
+        Initialize the client by logging in and setting the token
+
+        Called on the first request of a lazy client. Concurrent first calls
+        are serialized, so only one of them logs in.
+        """
+        if self.token is not None:
+            return
+
+        with self._refresh_lock:
+            if self.token is None:
+                logger.info("No token provided, logging in")
+                self._authenticate(timeout)
+
+    def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> Any:
+        """
+        Send an authenticated request, logging in first if the client is not
+        authenticated yet and renewing the token if it is about to expire
+        """
+        self.initialize(kwargs.get("timeout", 60))
+        self._ensure_token_fresh()
+
+        if headers is not None and headers is not self.headers and "Authorization" in headers:
+            headers["Authorization"] = self.headers["Authorization"]
+
+        return self.client.request(method, url, headers=headers, **kwargs)
+
+    def _context(self, endpoint: Endpoint, method: str, **fields) -> Optional[RequestContext]:
+        """
+        Return the context of a call to `endpoint`, or None if there are no hooks to trace it
+        """
+        if self.hooks is None:
+            return None
+        return RequestContext(endpoint.value, method, **fields)
+
+    def _cached(self, endpoint: Endpoint, loader: Callable[[], Any], params: Hashable = None) -> Any:
+        """
+        Return the cached response of `endpoint`, calling `loader` on a miss
+        """
+        if self.cache is None:
+            return loader()
+        return self.cache.fetch((token_key(self.email, self.network), endpoint.value, params), loader)
+
+    def _invalidate_after(self, endpoint: Endpoint) -> None:
+        """
+        Drop the cached responses made outdated by a request to `endpoint`
+        """
+        if self.cache is not None:
+            self.cache.invalidate_after(token_key(self.email, self.network), endpoint.value)
+
+    def _charge(self, texts: Iterable[str], reservation: Optional[Reservation] = None) -> ContextManager:
+        """
+        Charge the parts of `texts` to the balance accountant for the duration of a send,
+        fetching the balance first when it is due for a resync
+        """
+        accountant = reservation.accountant if reservation is not None else self.balance
+        if accountant is None:
+            return nullcontext()
+
+        if accountant.claim_sync():
+            self._sync_balance(accountant)
+        return accountant.charge(count_batch_parts(texts), reservation)
+
+    def _sync_balance(self, accountant: BalanceAccountant) -> None:
+        """
+        Fetch the balance for a claimed resync and pass it to `accountant`
+
+        A get-limit response without a balance releases the claim instead
+        of recording a balance of 0, so the send goes ahead against the last
+        known balance and the next send tries again.
+        """
+        try:
+            try:
+                response = self._get_balance()
+            except eskiz_exception.TokenExpired:
+                self.login()
+                response = self._get_balance()
+        except Exception:
+            accountant.release_sync()
+            raise
+
+        balance = response.data.get("balance") if response.status == "success" else None
+        if balance is None:
+            logger.warning("Balance resync failed with status %s", response.status)
+            accountant.release_sync()
+            return
+        accountant.update(balance)
 
     def login(self, timeout=60) -> eskiz_response.LoginResponse:
         """
         Authenticates with the Eskiz server
         """
         method = "POST"
-        data = eskiz_request.LoginRequest(
-            email=self.email,
-            password=self.password,
-        ).model_dump()
+        context = self._context(Endpoint.LOGIN, method)
+        with run_phase(self.hooks, Phase.BUILD, context):
+            data = eskiz_request.LoginRequest(
+                email=self.email,
+                password=self.password,
+            ).model_dump()
 
         url = f"{self.network}/api/auth/login"
 
+        if self.metrics is not None:
+            self.metrics.record_login()
         response = self.client.request(
             url=url,
             data=data,
             method=method,
-            timeout=timeout
+            timeout=timeout,
+            context=context,
         )
-        return eskiz_response.LoginResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.LoginResponse(**response)
 
     def refresh_token(self, timeout=60) -> eskiz_response.RefreshTokenResponse:
         """
@@ -77,56 +330,92 @@ class ClientSync:
         """
         url = f"{self.network}/api/auth/refresh"
 
-        # Use a temporary client without token refresh callback to avoid infinite recursion
-        temp_client = HttpClient()
+        if self.token is None:
+            self.initialize(timeout)
+
+        # Use a temporary client without token refresh callback to avoid infinite recursion,
+        # sharing the connection pool of the main client
+        temp_client = HttpClient(
+            session=self.client.session,
+            rate_limiter=self.client.rate_limiter,
+            retry_policy=self.client.retry_policy,
+            metrics=self.metrics,
+            hooks=self.hooks,
+            circuit_breaker=self.client.circuit_breaker,
+        )
         headers = self.headers
+        context = self._context(Endpoint.REFRESH, "PATCH")
+
+        if self.metrics is not None:
+            self.metrics.record_refresh()
 
         try:
-            response = temp_client.request("PATCH", url, headers=headers, timeout=timeout)
-            refresh_response = eskiz_response.RefreshTokenResponse(**response)
+            response = temp_client.request("PATCH", url, headers=headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                refresh_response = eskiz_response.RefreshTokenResponse(**response)
 
             # Update token and headers
-            self.token = refresh_response.data.token
-            self.headers["Authorization"] = f"Bearer {self.token}"
+            self._set_token(refresh_response.data.token)
 
             return refresh_response
         except Exception as e:
             logger.error(f"Token refresh failed: {e}")
             raise
 
-    def _handle_token_expired(self) -> bool:
+    def _handle_token_expired(self, rejected_authorization: Optional[str] = None) -> bool:
         """
         Handle token expiration by attempting to refresh the token
 
+        Concurrent callers are serialized so that a burst of 401 responses
+        triggers a single refresh; callers whose rejected token has already
+        been replaced reuse the new token.
+
+        Args:
+            rejected_authorization: Authorization header of the request that got the 401
+
         Returns:
             bool: True if token was successfully refreshed, False otherwise
         """
-        try:
-            logger.info("Token expired, attempting to refresh")
-            self.refresh_token()
-            return True
-        except Exception as e:
-            logger.warning(f"Token refresh failed, attempting to login again: {e}")
+        with self._refresh_lock:
+            if rejected_authorization is not None and rejected_authorization != self.headers.get("Authorization"):
+                logger.info("Token already refreshed by a concurrent request")
+                return True
+
+            # Another client sharing the token store may have renewed it already
+            stored = self._load_stored_token()
+            if stored is not None and f"Bearer {stored}" != self.headers.get("Authorization"):
+                logger.info("Using token renewed by another client from the token store")
+                self._set_token(stored, persist=False)
+                return True
+
             try:
-                # Try to login again
-                response = self.login()
-                self.token = response.data.token
-                self.headers["Authorization"] = f"Bearer {self.token}"
+                logger.info("Token expired, attempting to refresh")
+                self.refresh_token()
                 return True
-            except Exception as login_error:
-                logger.error(f"Login failed after token refresh failure: {login_error}")
-                return False
+            except Exception as e:
+                logger.warning(f"Token refresh failed, attempting to login again: {e}")
+                try:
+                    # Try to login again
+                    response = self.login()
+                    self._set_token(response.data.token)
+                    return True
+                except Exception as login_error:
+                    logger.error(f"Login failed after token refresh failure: {login_error}")
+                    return False
 
     def _user(self, timeout=60) -> eskiz_response.UserResponse:
         """
         Retrieves user information
         """
         url = f"{self.network}/api/auth/user"
+        context = self._context(Endpoint.USER, "GET")
 
-        headers = self.headers
-        response = self.client.request("GET", url, headers=headers, timeout=timeout)
+        def load():
+            response = self._request("GET", url, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.UserResponse(**response)
 
-        return eskiz_response.UserResponse(**response)
+        return self._cached(Endpoint.USER, load)
 
     def _send_sms(self, phone_number: int, message: str, timeout=60) -> eskiz_response.SendSMSResponse:
         """
@@ -137,18 +426,39 @@ class ClientSync:
             timeout (int, optional): The request timeout. Defaults to 60.
         """
         url = f"{self.network}/api/message/sms/send"
+        context = self._context(Endpoint.SEND_SMS, "POST")
 
-        files = eskiz_request.SendSMSRequest(
-            phone_number=phone_number,
-            message=message,
-            from_=self.from_,
-            callback_url=self.callback,
-        ).to_file()
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = send_sms_files(phone_number, message, self.from_, self.callback, self.validate)
 
-        headers = self.headers
-        response = self.client.request("POST", url, files=files, timeout=timeout, headers=headers)
+        if self.hedge_policy is None:
+            response = self._request("POST", url, files=files, timeout=timeout, headers=self.headers, context=context)
+        else:
+            response = self._send_hedged(url, files, timeout, context)
+        self._invalidate_after(Endpoint.SEND_SMS)
+
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.SendSMSResponse(**response)
+
+    def _send_hedged(self, url: str, files: Dict[str, Any], timeout, context: Optional[RequestContext]) -> Any:
+        """
+        Send a send_sms request, sending it again if it is slower than the hedge policy allows
+
+        Both attempts carry the same Idempotency-Key header and run on
+        separate thread pools, each on its own pooled connection.
+        """
+        headers = {**self.headers, hedge.IDEMPOTENCY_HEADER: hedge.new_idempotency_key()}
+
+        def send(hedging: bool) -> Any:
+            attempt_context = self._context(Endpoint.SEND_SMS, "POST") if hedging else context
+            return self._request(
+                "POST", url, files=files, timeout=timeout, headers=dict(headers), context=attempt_context
+            )
 
-        return eskiz_response.SendSMSResponse(**response)
+        return hedge.hedged(
+            send, self.hedge_policy, self._send_executor, self._hedge_executor, Endpoint.SEND_SMS.value,
+            self.metrics,
+        )
 
     def user(self, timeout=60) -> eskiz_response.UserResponse:
         """
@@ -168,20 +478,26 @@ class ClientSync:
             message (str): The message text
             timeout (int, optional): The request timeout. Defaults to 60.
         """
-        try:
-            return self._send_sms(phone_number, message, timeout)
-        except eskiz_exception.TokenExpired:
-            self.login(timeout)
-            return self._send_sms(phone_number, message, timeout)
+        with self._charge([message]):
+            try:
+                return self._send_sms(phone_number, message, timeout)
+            except eskiz_exception.TokenExpired:
+                self.login(timeout)
+                return self._send_sms(phone_number, message, timeout)
 
     def _get_balance(self, timeout=60) -> eskiz_response.GetLimitResponse:
         """
         Fetches the SMS balance from Eskiz.uz.
         """
         url = f"{self.network}/api/user/get-limit"
-        headers = self.headers
-        response = self.client.request("GET", url, headers=headers, timeout=timeout)
-        return eskiz_response.GetLimitResponse(**response)
+        context = self._context(Endpoint.GET_LIMIT, "GET")
+
+        def load():
+            response = self._request("GET", url, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.GetLimitResponse(**response)
+
+        return self._cached(Endpoint.GET_LIMIT, load)
 
     def get_balance(self, timeout=60) -> int:
         """
@@ -212,12 +528,16 @@ class ClientSync:
             timeout: Request timeout in seconds
         """
         url = f"{self.network}/api/message/sms/send-batch"
+        context = self._context(Endpoint.SEND_BATCH, "POST", dispatch_id=dispatch_id)
 
         # Convert the messages to JSON format
-        data = {
-            "messages": messages,
-            "from": from_
-        }
+        with run_phase(self.hooks, Phase.BUILD, context):
+            data = {
+                "messages": prepare_batch_messages(messages, self.validate_batches),
+                "from": from_
+            }
+        if context is not None:
+            context.user_sms_ids = bulk.message_ids(data["messages"])
 
         if dispatch_id is not None:
             data["dispatch_id"] = dispatch_id
@@ -225,18 +545,23 @@ class ClientSync:
         headers = self.headers.copy()
         headers["Content-Type"] = "application/json"
 
-        response = self.client.request(
+        response = self._request(
             "POST",
             url,
             json=data,
             headers=headers,
-            timeout=timeout
+            timeout=timeout,
+            context=context,
         )
+        self._invalidate_after(Endpoint.SEND_BATCH)
 
-        return eskiz_response.SendBatchSMSResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.SendBatchSMSResponse(**response)
 
     def send_batch_sms(self, messages: List[Dict[str, Any]], from_: Optional[str] = None,
-                      dispatch_id: Optional[int] = None, timeout=60) -> eskiz_response.SendBatchSMSResponse:
+                      dispatch_id: Optional[int] = None, timeout=60,
+                      reservation: Optional[Reservation] = None,
+                      normalize: bool = False) -> eskiz_response.SendBatchSMSResponse:
         """
         Sends multiple SMS messages in a single request
 
@@ -245,20 +570,74 @@ class ClientSync:
             from_: Sender ID (defaults to the client's from_ if not provided)
             dispatch_id: Optional dispatch ID for tracking
             timeout: Request timeout in seconds
+            reservation: Optional balance Reservation charged instead of the free balance
+            normalize: Normalize the `to` numbers to E.164, dropping messages with invalid numbers
 
         Returns:
             SendBatchSMSResponse: Response from the API
+
+        Raises:
+            InvalidPhoneNumber: If `normalize` is set and every number is invalid
         """
         sender = from_ if from_ is not None else self.from_
+        if normalize:
+            messages = normalize_batch(messages)
 
-        try:
-            return self._send_batch_sms(messages, sender, dispatch_id, timeout)
-        except eskiz_exception.TokenExpired:
-            self.login(timeout)
-            return self._send_batch_sms(messages, sender, dispatch_id, timeout)
+        with self._charge(bulk.message_texts(messages), reservation):
+            try:
+                return self._send_batch_sms(messages, sender, dispatch_id, timeout)
+            except eskiz_exception.TokenExpired:
+                self.login(timeout)
+                return self._send_batch_sms(messages, sender, dispatch_id, timeout)
+
+    def send_bulk(
+        self,
+        messages: Iterable[bulk.Message],
+        from_: Optional[str] = None,
+        dispatch_id: Optional[int] = None,
+        chunk_size: int = bulk.DEFAULT_CHUNK_SIZE,
+        max_bytes: int = bulk.DEFAULT_MAX_BYTES,
+        max_in_flight: int = bulk.DEFAULT_MAX_IN_FLIGHT,
+        timeout=60,
+        reservation: Optional[Reservation] = None,
+        normalize: bool = False,
+    ) -> Iterator[eskiz_response.SendBatchSMSResponse]:
+        """
+        Sends an arbitrarily large stream of messages as concurrent batch requests
+
+        Messages are consumed lazily and packed into chunks of at most
+        `chunk_size` messages or `max_bytes` of JSON, so memory use is bounded
+        by `max_in_flight` chunks regardless of the number of recipients.
+
+        Args:
+            messages: Iterable of BatchSMSMessage models or message dictionaries
+            from_: Sender ID (defaults to the client's from_ if not provided)
+            dispatch_id: Optional dispatch ID applied to every chunk
+            chunk_size: Maximum number of messages per batch request
+            max_bytes: Maximum JSON size of the messages per batch request
+            max_in_flight: Maximum number of concurrent batch requests
+            timeout: Request timeout in seconds
+            reservation: Optional balance Reservation charged instead of the free balance
+            normalize: Normalize the `to` numbers to E.164, dropping messages with invalid numbers
+
+        Yields:
+            SendBatchSMSResponse: Response for each chunk, in completion order
+
+        Raises:
+            BulkSendFailed: After the chunks in flight complete, if any chunk failed;
+                its `failed` list holds each failed chunk with its exception
+        """
+        def send(chunk):
+            return self.send_batch_sms(chunk, from_, dispatch_id, timeout, reservation)
+
+        if normalize:
+            messages = iter_normalized_messages(messages)
+
+        chunks = bulk.iter_chunks(messages, chunk_size, max_bytes)
+        yield from bulk.iter_completed(send, chunks, max_in_flight)
 
     def _send_global_sms(self, mobile_phone: str, message: str, country_code: str,
-                        callback_url: str = "", unicode: str = "0", timeout=60) -> eskiz_response.SendGlobalSMSResponse:
+                        callback_url: str = "", unicode: Optional[str] = None, timeout=60) -> eskiz_response.SendGlobalSMSResponse:
         """
         Sends SMS to international numbers
 
@@ -267,22 +646,28 @@ class ClientSync:
             message: Message text
             country_code: Country code (e.g., "US")
             callback_url: Optional callback URL
-            unicode: Unicode flag (0 or 1)
+            unicode: Unicode flag (0 or 1), chosen from the message text if None
             timeout: Request timeout in seconds
         """
         url = f"{self.network}/api/message/sms/send-global"
+        context = self._context(Endpoint.SEND_GLOBAL, "POST")
 
-        files = eskiz_request.SendGlobalSMSRequest(
-            mobile_phone=mobile_phone,
-            message=message,
-            country_code=country_code,
-            callback_url=callback_url,
-            unicode=unicode
-        ).to_file()
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.SendGlobalSMSRequest(
+                mobile_phone=mobile_phone,
+                message=message,
+                country_code=country_code,
+                callback_url=callback_url,
+                unicode=unicode if unicode is not None else unicode_flag(message)
+            ).to_file()
 
         headers = self.headers
         # Just make the request, we don't need the response
-        self.client.request("POST", url, files=files, headers=headers, timeout=timeout)
+        self._request("POST", url, files=files, headers=headers, timeout=timeout, context=context)
+        self._invalidate_after(Endpoint.SEND_GLOBAL)
+        # International prices differ from the part price, so resync instead
+        if self.balance is not None:
+            self.balance.invalidate()
 
         # Since the API returns 200 OK without a specific response body
         return eskiz_response.SendGlobalSMSResponse(success=True)
@@ -293,7 +678,7 @@ class ClientSync:
         message: str,
         country_code: str,
         callback_url: str = "",
-        unicode: str = "0",
+        unicode: Optional[str] = None,
         timeout=60
     ) -> eskiz_response.SendGlobalSMSResponse:
         """
@@ -304,7 +689,7 @@ class ClientSync:
             message: Message text
             country_code: Country code (e.g., "US")
             callback_url: Optional callback URL
-            unicode: Unicode flag (0 or 1)
+            unicode: Unicode flag (0 or 1), chosen from the message text if None
             timeout: Request timeout in seconds
 
         Returns:
@@ -322,7 +707,7 @@ class ClientSync:
 
     def _get_user_messages(self, start_date: str, end_date: str, page_size: str = "20",
                           count: str = "0", is_ad: str = "", status: Optional[str] = None,
-                          timeout=60) -> eskiz_response.GetUserMessagesResponse:
+                          timeout=60, page: Optional[int] = None) -> eskiz_response.GetUserMessagesResponse:
         """
         Retrieves user messages within a date range
 
@@ -334,28 +719,37 @@ class ClientSync:
             is_ad: Advertisement flag
             status: Optional status filter
             timeout: Request timeout in seconds
+            page: Optional 1-based page number
         """
         url = f"{self.network}/api/message/sms/get-user-messages"
+        context = self._context(Endpoint.USER_MESSAGES, "GET")
+        query = {}
         if status is not None:
-            url += f"?status={status}"
-
-        files = eskiz_request.GetUserMessagesRequest(
-            start_date=start_date,
-            end_date=end_date,
-            page_size=page_size,
-            count=count,
-            is_ad=is_ad,
-            status=status
-        ).to_file()
+            query["status"] = status
+        if page is not None:
+            query["page"] = page
+        if query:
+            url += f"?{urlencode(query)}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetUserMessagesRequest(
+                start_date=start_date,
+                end_date=end_date,
+                page_size=page_size,
+                count=count,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
 
         headers = self.headers
-        response = self.client.request("GET", url, files=files, headers=headers, timeout=timeout)
+        response = self._request("GET", url, files=files, headers=headers, timeout=timeout, context=context)
 
-        return eskiz_response.GetUserMessagesResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetUserMessagesResponse(**response)
 
     def get_user_messages(self, start_date: str, end_date: str, page_size: str = "20",
                          count: str = "0", is_ad: str = "", status: Optional[str] = None,
-                         timeout=60) -> eskiz_response.GetUserMessagesResponse:
+                         timeout=60, page: Optional[int] = None) -> eskiz_response.GetUserMessagesResponse:
         """
         Retrieves user messages within a date range
 
@@ -367,23 +761,105 @@ class ClientSync:
             is_ad: Advertisement flag
             status: Optional status filter
             timeout: Request timeout in seconds
+            page: Optional 1-based page number
 
         Returns:
             GetUserMessagesResponse: Response from the API
         """
         try:
             return self._get_user_messages(
-                start_date, end_date, page_size, count, is_ad, status, timeout
+                start_date, end_date, page_size, count, is_ad, status, timeout, page
             )
         except eskiz_exception.TokenExpired:
             self.login(timeout)
             return self._get_user_messages(
-                start_date, end_date, page_size, count, is_ad, status, timeout
+                start_date, end_date, page_size, count, is_ad, status, timeout, page
             )
 
+    def iter_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        page_size: str = paginate.DEFAULT_PAGE_SIZE,
+        is_ad: str = "",
+        status: Optional[str] = None,
+        prefetch: int = paginate.DEFAULT_PREFETCH,
+        timeout=60,
+    ) -> Iterator[eskiz_response.MessageResult]:
+        """
+        Iterates over every user message within a date range, page by page
+
+        The next `prefetch` pages are fetched concurrently while the current
+        one is consumed, and pages are dropped once consumed, so memory use
+        stays flat however many messages the range holds. Use a closed date
+        range: messages arriving during iteration shift later pages.
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            page_size: Number of results per page
+            is_ad: Advertisement flag
+            status: Optional status filter
+            prefetch: Number of pages fetched ahead
+            timeout: Request timeout in seconds
+
+        Yields:
+            MessageResult: Each message, in page order
+        """
+        def fetch(page):
+            return self.get_user_messages(
+                start_date, end_date, page_size, is_ad=is_ad, status=status, timeout=timeout, page=page
+            ).data
+
+        for page in paginate.iter_pages(fetch, prefetch):
+            yield from page.result
+
+    def download_user_messages(
+        self,
+        start_date: str,
+        end_date: str,
+        shards: int = shard.DEFAULT_SHARDS,
+        max_workers: int = shard.DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+        page_size: str = paginate.DEFAULT_PAGE_SIZE,
+        is_ad: str = "",
+        status: Optional[str] = None,
+        timeout=60,
+    ) -> Iterator[eskiz_response.MessageResult]:
+        """
+        Downloads every user message within a date range over parallel time shards
+
+        The range is split into `shards` consecutive ranges that are paged
+        through concurrently by up to `max_workers` threads. Messages
+        returned by two adjacent shards are yielded once.
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            shards: Number of time shards
+            max_workers: Maximum number of shards fetched concurrently
+            ordered: Yield messages in range order instead of as pages complete
+            page_size: Number of results per page
+            is_ad: Advertisement flag
+            status: Optional status filter
+            timeout: Request timeout in seconds
+
+        Yields:
+            MessageResult: Each message of the range once
+        """
+        def fetch_shard(shard_start, shard_end):
+            def fetch(page):
+                return self.get_user_messages(
+                    shard_start, shard_end, page_size, is_ad=is_ad, status=status, timeout=timeout, page=page
+                ).data
+            return paginate.iter_pages(fetch, prefetch=0)
+
+        shards = shard.split_range(start_date, end_date, shards)
+        yield from shard.iter_sharded(fetch_shard, shards, max_workers, ordered)
+
     def _get_user_messages_by_dispatch(self, dispatch_id: str, count: str = "0",
                                       is_ad: str = "", status: Optional[str] = None,
-                                      timeout=60) -> eskiz_response.GetUserMessagesResponse:
+                                      timeout=60, page: Optional[int] = None) -> eskiz_response.GetUserMessagesResponse:
         """
         Retrieves user messages by dispatch ID
 
@@ -393,26 +869,35 @@ class ClientSync:
             is_ad: Advertisement flag
             status: Optional status filter
             timeout: Request timeout in seconds
+            page: Optional 1-based page number
         """
         url = f"{self.network}/api/message/sms/get-user-messages-by-dispatch"
+        context = self._context(Endpoint.USER_MESSAGES_BY_DISPATCH, "GET", dispatch_id=dispatch_id)
+        query = {}
         if status is not None:
-            url += f"?status={status}"
-
-        files = eskiz_request.GetUserMessagesByDispatchRequest(
-            dispatch_id=dispatch_id,
-            count=count,
-            is_ad=is_ad,
-            status=status
-        ).to_file()
+            query["status"] = status
+        if page is not None:
+            query["page"] = page
+        if query:
+            url += f"?{urlencode(query)}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetUserMessagesByDispatchRequest(
+                dispatch_id=dispatch_id,
+                count=count,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
 
         headers = self.headers
-        response = self.client.request("GET", url, files=files, headers=headers, timeout=timeout)
+        response = self._request("GET", url, files=files, headers=headers, timeout=timeout, context=context)
 
-        return eskiz_response.GetUserMessagesResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetUserMessagesResponse(**response)
 
     def get_user_messages_by_dispatch(self, dispatch_id: str, count: str = "0",
                                      is_ad: str = "", status: Optional[str] = None,
-                                     timeout=60) -> eskiz_response.GetUserMessagesResponse:
+                                     timeout=60, page: Optional[int] = None) -> eskiz_response.GetUserMessagesResponse:
         """
         Retrieves user messages by dispatch ID
 
@@ -422,15 +907,16 @@ class ClientSync:
             is_ad: Advertisement flag
             status: Optional status filter
             timeout: Request timeout in seconds
+            page: Optional 1-based page number
 
         Returns:
             GetUserMessagesResponse: Response from the API
         """
         try:
-            return self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, timeout)
+            return self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, timeout, page)
         except eskiz_exception.TokenExpired:
             self.login(timeout)
-            return self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, timeout)
+            return self._get_user_messages_by_dispatch(dispatch_id, count, is_ad, status, timeout, page)
 
     def _get_dispatch_status(self, user_id: str, dispatch_id: str,
                             timeout=60) -> eskiz_response.GetDispatchStatusResponse:
@@ -443,16 +929,19 @@ class ClientSync:
             timeout: Request timeout in seconds
         """
         url = f"{self.network}/api/message/sms/get-dispatch-status"
+        context = self._context(Endpoint.DISPATCH_STATUS, "GET", dispatch_id=dispatch_id)
 
-        files = eskiz_request.GetDispatchStatusRequest(
-            user_id=user_id,
-            dispatch_id=dispatch_id
-        ).to_file()
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.GetDispatchStatusRequest(
+                user_id=user_id,
+                dispatch_id=dispatch_id
+            ).to_file()
 
         headers = self.headers
-        response = self.client.request("GET", url, files=files, headers=headers, timeout=timeout)
+        response = self._request("GET", url, files=files, headers=headers, timeout=timeout, context=context)
 
-        return eskiz_response.GetDispatchStatusResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.GetDispatchStatusResponse(**response)
 
     def get_dispatch_status(self, user_id: str, dispatch_id: str,
                            timeout=60) -> eskiz_response.GetDispatchStatusResponse:
@@ -486,11 +975,13 @@ class ClientSync:
             timeout: Request timeout in seconds
         """
         url = f"{self.network}/api/message/sms/status_by_id/{message_id}"
+        context = self._context(Endpoint.MESSAGE_STATUS, "GET")
 
         headers = self.headers
-        response = self.client.request("GET", url, headers=headers, timeout=timeout)
+        response = self._request("GET", url, headers=headers, timeout=timeout, context=context)
 
-        return eskiz_response.MessageStatusResponse(**response)
+        with run_phase(self.hooks, Phase.VALIDATE, context):
+            return eskiz_response.MessageStatusResponse(**response)
 
     def get_message_status(
         self,
@@ -521,11 +1012,14 @@ class ClientSync:
             timeout: Request timeout in seconds
         """
         url = f"{self.network}/api/user/templates"
+        context = self._context(Endpoint.TEMPLATES, "GET")
 
-        headers = self.headers
-        response = self.client.request("GET", url, headers=headers, timeout=timeout)
+        def load():
+            response = self._request("GET", url, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TemplatesResponse(**response)
 
-        return eskiz_response.TemplatesResponse(**response)
+        return self._cached(Endpoint.TEMPLATES, load)
 
     def get_templates(self, timeout=60) -> eskiz_response.TemplatesResponse:
         """
@@ -543,8 +1037,201 @@ class ClientSync:
             self.login(timeout)
             return self._get_templates(timeout)
 
+    def _get_totals_by_range(self, start_date: str, end_date: str, is_ad: str = "",
+                             status: Optional[str] = None, timeout=60) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            is_ad: Advertisement flag
+            status: Optional status filter
+            timeout: Request timeout in seconds
+        """
+        url = f"{self.network}/api/report/total-by-range"
+        context = self._context(Endpoint.TOTALS_BY_RANGE, "POST")
+        if status is not None:
+            url += f"?{urlencode({'status': status})}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.TotalsByRangeRequest(
+                start_date=start_date,
+                end_date=end_date,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        def load():
+            response = self._request("POST", url, files=files, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TotalsResponse(**response)
+
+        return self._cached(Endpoint.TOTALS_BY_RANGE, load, (start_date, end_date, is_ad, status))
+
+    def get_totals_by_range(self, start_date: str, end_date: str, is_ad: str = "",
+                            status: Optional[str] = None, timeout=60) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending within a date range
+
+        Args:
+            start_date: Start date in format "YYYY-MM-DD HH:MM"
+            end_date: End date in format "YYYY-MM-DD HH:MM"
+            is_ad: Advertisement flag
+            status: Optional status filter
+            timeout: Request timeout in seconds
+
+        Returns:
+            TotalsResponse: Response from the API
+        """
+        try:
+            return self._get_totals_by_range(start_date, end_date, is_ad, status, timeout)
+        except eskiz_exception.TokenExpired:
+            self.login(timeout)
+            return self._get_totals_by_range(start_date, end_date, is_ad, status, timeout)
+
+    def _get_totals_by_dispatch(self, dispatch_id: str, is_ad: str = "",
+                                status: Optional[str] = None, timeout=60) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending of a dispatch
+
+        Args:
+            dispatch_id: Dispatch ID
+            is_ad: Advertisement flag
+            status: Optional status filter
+            timeout: Request timeout in seconds
+        """
+        url = f"{self.network}/api/report/total-by-dispatch"
+        context = self._context(Endpoint.TOTALS_BY_DISPATCH, "POST", dispatch_id=dispatch_id)
+        if status is not None:
+            url += f"?{urlencode({'status': status})}"
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.TotalsByDispatchRequest(
+                dispatch_id=dispatch_id,
+                is_ad=is_ad,
+                status=status
+            ).to_file()
+
+        def load():
+            response = self._request("POST", url, files=files, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.TotalsResponse(**response)
+
+        return self._cached(Endpoint.TOTALS_BY_DISPATCH, load, (dispatch_id, is_ad, status))
+
+    def get_totals_by_dispatch(self, dispatch_id: str, is_ad: str = "",
+                               status: Optional[str] = None, timeout=60) -> eskiz_response.TotalsResponse:
+        """
+        Retrieves the sent parts and spending of a dispatch
+
+        Args:
+            dispatch_id: Dispatch ID
+            is_ad: Advertisement flag
+            status: Optional status filter
+            timeout: Request timeout in seconds
+
+        Returns:
+            TotalsResponse: Response from the API
+        """
+        try:
+            return self._get_totals_by_dispatch(dispatch_id, is_ad, status, timeout)
+        except eskiz_exception.TokenExpired:
+            self.login(timeout)
+            return self._get_totals_by_dispatch(dispatch_id, is_ad, status, timeout)
+
+    def _get_user_totals(self, year: str, month: str, is_global: str = "0",
+                         timeout=60) -> eskiz_response.UserTotalsResponse:
+        """
+        Retrieves the packets bought and sent in a month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            is_global: "1" for international messages
+            timeout: Request timeout in seconds
+        """
+        url = f"{self.network}/api/user/totals"
+        context = self._context(Endpoint.USER_TOTALS, "POST")
+
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.UserTotalsRequest(
+                year=year,
+                month=month,
+                is_global=is_global
+            ).to_file()
+
+        def load():
+            response = self._request("POST", url, files=files, headers=self.headers, timeout=timeout, context=context)
+            with run_phase(self.hooks, Phase.VALIDATE, context):
+                return eskiz_response.UserTotalsResponse(**response)
+
+        return self._cached(Endpoint.USER_TOTALS, load, (year, month, is_global))
+
+    def get_user_totals(self, year: str, month: str, is_global: str = "0",
+                        timeout=60) -> eskiz_response.UserTotalsResponse:
+        """
+        Retrieves the packets bought and sent in a month
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            is_global: "1" for international messages
+            timeout: Request timeout in seconds
+
+        Returns:
+            UserTotalsResponse: Response from the API
+        """
+        try:
+            return self._get_user_totals(year, month, is_global, timeout)
+        except eskiz_exception.TokenExpired:
+            self.login(timeout)
+            return self._get_user_totals(year, month, is_global, timeout)
+
+    def get_monthly_totals(self, months: Iterable[Tuple[int, int]], is_ad: str = "",
+                           status: Optional[str] = None, max_workers: int = reports.DEFAULT_MAX_WORKERS,
+                           timeout=60) -> reports.TotalsSummary:
+        """
+        Retrieves the totals of several months concurrently and adds them up
+
+        Args:
+            months: (year, month) pairs, see `reports.months_between`
+            is_ad: Advertisement flag
+            status: Optional status filter
+            max_workers: Maximum number of concurrent requests
+            timeout: Request timeout in seconds
+
+        Returns:
+            TotalsSummary: The summed totals, and the totals keyed by (year, month)
+        """
+        def fetch(month):
+            return self.get_totals_by_range(*reports.month_range(*month), is_ad, status, timeout)
+
+        return reports.merge_totals(reports.fan_out(fetch, months, max_workers))
+
+    def get_dispatch_totals(self, dispatch_ids: Iterable[str], is_ad: str = "",
+                            status: Optional[str] = None, max_workers: int = reports.DEFAULT_MAX_WORKERS,
+                            timeout=60) -> reports.TotalsSummary:
+        """
+        Retrieves the totals of several dispatches concurrently and adds them up
+
+        Args:
+            dispatch_ids: Dispatch IDs
+            is_ad: Advertisement flag
+            status: Optional status filter
+            max_workers: Maximum number of concurrent requests
+            timeout: Request timeout in seconds
+
+        Returns:
+            TotalsSummary: The summed totals, and the totals keyed by dispatch ID
+        """
+        def fetch(dispatch_id):
+            return self.get_totals_by_dispatch(dispatch_id, is_ad, status, timeout)
+
+        return reports.merge_totals(reports.fan_out(fetch, dispatch_ids, max_workers))
+
     def _export_messages(self, year: str, month: str, status: str = "all",
-                        timeout=60) -> str:
+                        timeout=60, stream=False) -> Any:
         """
         Exports messages for a specific month
 
@@ -553,20 +1240,30 @@ class ClientSync:
             month: Month (e.g., "1" for January)
             status: Status filter (default "all")
             timeout: Request timeout in seconds
+            stream: Return the open response instead of the CSV text
         """
         url = f"{self.network}/api/message/export?status={status}"
+        context = self._context(Endpoint.EXPORT, "GET")
 
-        files = eskiz_request.ExportMessagesRequest(
-            year=year,
-            month=month,
-            status=status
-        ).to_file()
+        with run_phase(self.hooks, Phase.BUILD, context):
+            files = eskiz_request.ExportMessagesRequest(
+                year=year,
+                month=month,
+                status=status
+            ).to_file()
 
         headers = self.headers
-        response = self.client.request("GET", url, files=files, headers=headers, timeout=timeout)
+        response = self._request(
+            "GET", url, files=files, headers=headers, timeout=timeout, stream=True, context=context
+        )
+        if stream:
+            return response
 
-        # This endpoint returns CSV data as a string
-        return response
+        # This endpoint returns CSV data, not JSON
+        try:
+            return response.text
+        finally:
+            response.close()
 
     def export_messages(self, year: str, month: str, status: str = "all",
                        timeout=60) -> str:
@@ -587,3 +1284,71 @@ class ClientSync:
         except eskiz_exception.TokenExpired:
             self.login(timeout)
             return self._export_messages(year, month, status, timeout)
+
+    def _open_export(self, year: str, month: str, status: str, timeout):
+        """
+        Sends the export request and returns the response with its body unread
+        """
+        try:
+            return self._export_messages(year, month, status, timeout, stream=True)
+        except eskiz_exception.TokenExpired:
+            self.login(timeout)
+            return self._export_messages(year, month, status, timeout, stream=True)
+
+    def export_messages_to(self, file: export.Target, year: str, month: str, status: str = "all",
+                           chunk_size: int = export.DEFAULT_CHUNK_SIZE, timeout=60) -> int:
+        """
+        Streams the export of a month to a file without holding it in memory
+
+        Args:
+            file: Path or binary file object the CSV is written to
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+            chunk_size: Size of the chunks read from the connection
+            timeout: Request timeout in seconds
+
+        Returns:
+            int: Number of bytes written
+        """
+        with self._open_export(year, month, status, timeout) as response:
+            return export.write_chunks(response.iter_content(chunk_size), file)
+
+    def iter_export_rows(self, year: str, month: str, status: str = "all",
+                         chunk_size: int = export.DEFAULT_CHUNK_SIZE, timeout=60) -> Iterator[export.Row]:
+        """
+        Streams the export of a month as parsed CSV rows
+
+        Args:
+            year: Year (e.g., "2025")
+            month: Month (e.g., "1" for January)
+            status: Status filter (default "all")
+            chunk_size: Size of the chunks read from the connection
+            timeout: Request timeout in seconds
+
+        Yields:
+            dict: Each row, keyed by the CSV header
+        """
+        with self._open_export(year, month, status, timeout) as response:
+            yield from export.iter_rows(response.iter_content(chunk_size))
+
+    def close(self) -> None:
+        """
+        Close the pooled HTTP connections and the hedge threads
+        """
+        if self._hedge_executor is not None:
+            self._send_executor.shutdown(wait=False)
+            self._hedge_executor.shutdown(wait=False)
+        self.client.close()
+
+    def __enter__(self):
+        """
+        Context manager entry
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Context manager exit
+        """
+        self.close()
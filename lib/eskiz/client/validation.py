@@ -0,0 +1,40 @@
+"""
+Model validation helpers for the hot send paths of both clients
+"""
+from typing import Any, Dict, List
+
+from eskiz.request import SendSMSRequest, batch_messages_adapter
+
+
+def send_sms_files(phone_number: int, message: str, from_: str, callback_url: str,
+                   validate: bool = True) -> Dict[str, Any]:
+    """
+    Build the multipart fields of a send request
+
+    When `validate` is False the fields are built directly from the
+    arguments, without constructing a SendSMSRequest model. This is only
+    safe for values the caller already trusts.
+    """
+    if validate:
+        return SendSMSRequest(
+            phone_number=phone_number,
+            message=message,
+            from_=from_,
+            callback_url=callback_url,
+        ).to_file()
+    return SendSMSRequest.build_file(phone_number, message, from_, callback_url)
+
+
+def prepare_batch_messages(messages: List[Dict[str, Any]], validate: bool = False) -> List[Dict[str, Any]]:
+    """
+    Validate batch message dicts in a single pass if `validate` is True
+
+    Batch messages are sent as given by default, as they always were;
+    validation is opt-in since it costs CPU on large batches.
+
+    Returns:
+        list: The messages, as plain dicts with `user_sms_id` coerced to str and `to` to int when validated
+    """
+    if validate:
+        return batch_messages_adapter.validate_python(messages)
+    return messages
@@ -0,0 +1,6 @@
+"""
+delivery status tracking for eskiz
+"""
+from .tracker import ( # noqa
+    AsyncDeliveryTracker, DeliveryTracker, PollSchedule, StatusTransition, DEFAULT_TERMINAL_STATUSES
+)
@@ -0,0 +1,388 @@
+"""
+the delivery tracker polling the status of sent messages
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel
+
+from eskiz.client import bulk, paginate
+from eskiz.request import BatchSMSMessage
+from eskiz.response import MessageResult, SendSMSResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a message no longer changes, compared case-insensitively
+DEFAULT_TERMINAL_STATUSES = frozenset({
+    "delivered", "delivrd", "undelivered", "undeliv", "expired", "rejected", "rejectd",
+    "deleted", "failed", "nacceptd",
+})
+DEFAULT_DISPATCH_THRESHOLD = 5
+DEFAULT_MAX_IN_FLIGHT = 4
+
+# A poll request: ("message", message ID) or ("dispatch", dispatch ID)
+Request = Tuple[str, str]
+
+
+class PollSchedule:
+    """
+    Decides how long to wait before polling a message again
+
+    The interval grows with the age of the message: fresh messages, which
+    usually change state within seconds, are polled every `min_interval`
+    seconds and older ones up to every `max_interval` seconds. Messages
+    without a terminal status after `max_age` seconds are no longer polled.
+    """
+    def __init__(self, min_interval: float = 2.0, max_interval: float = 300.0,
+                 growth: float = 0.5, max_age: float = 86400.0):
+        """
+        Args:
+            min_interval: Shortest interval between polls, in seconds
+            max_interval: Longest interval between polls, in seconds
+            growth: Interval as a fraction of the message age
+            max_age: Seconds after which a message is given up on
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.max_age = max_age
+
+    def interval(self, age: float) -> float:
+        """
+        Return the delay before the next poll of a message tracked for `age` seconds
+        """
+        return min(self.max_interval, max(self.min_interval, age * self.growth))
+
+
+class StatusTransition(BaseModel):
+    """
+    A change of the status of a tracked message
+    """
+    message_id: Optional[str] = None
+    dispatch_id: Optional[str] = None
+    user_sms_id: Optional[str] = None
+    previous_status: Optional[str] = None
+    status: Optional[str] = None
+    terminal: bool = False
+    timed_out: bool = False
+    at: float
+
+
+class _Tracked:
+    """
+    The tracking state of one message
+    """
+    __slots__ = ("message_id", "dispatch_id", "user_sms_id", "status", "tracked_at", "next_poll")
+
+    def __init__(self, message_id=None, dispatch_id=None, user_sms_id=None):
+        self.message_id = message_id
+        self.dispatch_id = dispatch_id
+        self.user_sms_id = user_sms_id
+        self.status = None
+        self.tracked_at = 0.0
+        self.next_poll = 0.0
+
+
+class BaseDeliveryTracker:
+    """
+    Scheduling and bookkeeping shared by the sync and async trackers
+
+    Messages sent with `send_sms` are polled with `status_by_id`. Messages of
+    a batch are tracked by dispatch ID and `user_sms_id`: while fewer than
+    `dispatch_threshold` of them are due and their IDs are known they are
+    polled one by one, otherwise one `get_user_messages_by_dispatch` call
+    refreshes the whole dispatch.
+    """
+    def __init__(
+        self,
+        client,
+        schedule: Optional[PollSchedule] = None,
+        terminal_statuses: Iterable[str] = DEFAULT_TERMINAL_STATUSES,
+        dispatch_threshold: int = DEFAULT_DISPATCH_THRESHOLD,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        on_transition: Optional[Callable[[StatusTransition], None]] = None,
+    ):
+        """
+        Args:
+            client: Client used to poll the statuses
+            schedule: Optional PollSchedule
+            terminal_statuses: Statuses after which a message is no longer polled
+            dispatch_threshold: Due messages of a dispatch from which it is polled in one call
+            max_in_flight: Maximum number of concurrent status requests
+            on_transition: Optional callback called with every StatusTransition
+        """
+        self.client = client
+        self.schedule = schedule or PollSchedule()
+        self.terminal_statuses = frozenset(status.lower() for status in terminal_statuses)
+        self.dispatch_threshold = dispatch_threshold
+        self.max_in_flight = max_in_flight
+        self.on_transition = on_transition
+        self._lock = threading.Lock()
+        self._messages: Dict[str, _Tracked] = {}
+        self._keys_by_id: Dict[str, str] = {}
+        self._dispatches: Dict[str, Dict[str, str]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def track(self, message: Union[SendSMSResponse, str]) -> None:
+        """
+        Track a message sent with `send_sms`, by its response or ID
+        """
+        message_id = message.id if isinstance(message, SendSMSResponse) else str(message)
+        with self._lock:
+            self._keys_by_id[message_id] = message_id
+            self._add(message_id, _Tracked(message_id=message_id))
+
+    def track_batch(self, dispatch_id: Union[int, str],
+                    messages: Iterable[Union[BatchSMSMessage, Dict[str, object], str]]) -> None:
+        """
+        Track the messages of a batch sent with `dispatch_id`
+
+        Args:
+            dispatch_id: Dispatch ID the batch was sent with
+            messages: The sent messages, or their `user_sms_id` values
+        """
+        dispatch_id = str(dispatch_id)
+        with self._lock:
+            keys = self._dispatches.setdefault(dispatch_id, {})
+            for message in messages:
+                if isinstance(message, BatchSMSMessage):
+                    user_sms_id = message.user_sms_id
+                elif isinstance(message, dict):
+                    user_sms_id = str(message["user_sms_id"])
+                else:
+                    user_sms_id = str(message)
+                key = f"{dispatch_id}#{user_sms_id}"
+                keys[user_sms_id] = key
+                self._add(key, _Tracked(dispatch_id=dispatch_id, user_sms_id=user_sms_id))
+
+    def _add(self, key: str, tracked: _Tracked) -> None:
+        now = time.monotonic()
+        tracked.tracked_at = now
+        self._messages[key] = tracked
+        self._schedule(key, tracked, now + self.schedule.min_interval)
+
+    def _schedule(self, key: str, tracked: _Tracked, at: float) -> None:
+        # Earlier heap entries of the key become stale and are skipped
+        tracked.next_poll = at
+        heapq.heappush(self._heap, (at, next(self._counter), key))
+
+    def _remove(self, key: str) -> None:
+        tracked = self._messages.pop(key)
+        if tracked.message_id is not None:
+            self._keys_by_id.pop(tracked.message_id, None)
+        if tracked.dispatch_id is not None:
+            keys = self._dispatches.get(tracked.dispatch_id, {})
+            keys.pop(tracked.user_sms_id, None)
+            if not keys:
+                self._dispatches.pop(tracked.dispatch_id, None)
+
+    def _next_poll_at(self) -> Optional[float]:
+        """
+        Return the monotonic time of the next due poll, or None if nothing is tracked
+        """
+        with self._lock:
+            while self._heap:
+                at, _, key = self._heap[0]
+                tracked = self._messages.get(key)
+                if tracked is not None and tracked.next_poll == at:
+                    return at
+                heapq.heappop(self._heap)
+            return None
+
+    def _plan(self, now: float) -> Tuple[List[str], List[Request]]:
+        """
+        Pop the due messages and group them into poll requests
+        """
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                at, _, key = heapq.heappop(self._heap)
+                tracked = self._messages.get(key)
+                if tracked is not None and tracked.next_poll == at:
+                    due.append(key)
+
+            requests: List[Request] = []
+            by_dispatch: Dict[str, List[_Tracked]] = {}
+            for key in due:
+                tracked = self._messages[key]
+                if tracked.dispatch_id is None:
+                    requests.append(("message", tracked.message_id))
+                else:
+                    by_dispatch.setdefault(tracked.dispatch_id, []).append(tracked)
+
+            for dispatch_id, group in by_dispatch.items():
+                if len(group) >= self.dispatch_threshold or any(t.message_id is None for t in group):
+                    requests.append(("dispatch", dispatch_id))
+                else:
+                    requests.extend(("message", tracked.message_id) for tracked in group)
+            return due, requests
+
+    def _apply(self, results: List[MessageResult], due: List[str], now: float) -> List[StatusTransition]:
+        """
+        Record polled results, reschedule the due messages and return the transitions
+        """
+        transitions = []
+        updated: Set[str] = set()
+        with self._lock:
+            for result in results:
+                key = self._keys_by_id.get(str(result.id))
+                if key is None and result.dispatch_id is not None:
+                    key = self._dispatches.get(str(result.dispatch_id), {}).get(result.user_sms_id)
+                tracked = self._messages.get(key) if key is not None else None
+                if tracked is None or key in updated:
+                    continue
+
+                updated.add(key)
+                if tracked.message_id is None:
+                    tracked.message_id = str(result.id)
+                    self._keys_by_id[tracked.message_id] = key
+
+                previous, tracked.status = tracked.status, result.status
+                terminal = result.status.lower() in self.terminal_statuses
+                if terminal:
+                    self._remove(key)
+                else:
+                    self._reschedule(key, tracked, now, transitions)
+                if terminal or result.status != previous:
+                    transitions.append(self._transition(tracked, previous, terminal=terminal))
+
+            for key in due:
+                tracked = self._messages.get(key)
+                if key not in updated and tracked is not None:
+                    self._reschedule(key, tracked, now, transitions)
+
+        if self.on_transition is not None:
+            for transition in transitions:
+                self.on_transition(transition)
+        return transitions
+
+    def _reschedule(self, key: str, tracked: _Tracked, now: float, transitions: List[StatusTransition]) -> None:
+        age = now - tracked.tracked_at
+        if age >= self.schedule.max_age:
+            logger.warning("Giving up on message %s after %.0fs", tracked.message_id or key, age)
+            self._remove(key)
+            transitions.append(self._transition(tracked, tracked.status, timed_out=True))
+        else:
+            self._schedule(key, tracked, now + self.schedule.interval(age))
+
+    @staticmethod
+    def _transition(tracked: _Tracked, previous: Optional[str], terminal=False, timed_out=False) -> StatusTransition:
+        return StatusTransition(
+            message_id=tracked.message_id,
+            dispatch_id=tracked.dispatch_id,
+            user_sms_id=tracked.user_sms_id,
+            previous_status=previous,
+            status=tracked.status,
+            terminal=terminal,
+            timed_out=timed_out,
+            at=time.time(),
+        )
+
+
+class DeliveryTracker(BaseDeliveryTracker):
+    """
+    Polls the delivery status of messages sent with ClientSync
+    """
+    def _fetch(self, request: Request) -> List[MessageResult]:
+        kind, value = request
+        try:
+            if kind == "message":
+                return [self.client.get_message_status(value).data]
+
+            def fetch(page):
+                return self.client.get_user_messages_by_dispatch(value, page=page).data
+
+            return [message for page in paginate.iter_pages(fetch, prefetch=0) for message in page.result]
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Polling %s %s failed: %s", kind, value, exc)
+            return []
+
+    def poll_once(self) -> List[StatusTransition]:
+        """
+        Poll the messages that are due now
+
+        Returns:
+            list: The status transitions observed
+        """
+        now = time.monotonic()
+        due, requests = self._plan(now)
+        results = [
+            message
+            for messages in bulk.iter_completed(self._fetch, requests, self.max_in_flight)
+            for message in messages
+        ]
+        return self._apply(results, due, time.monotonic())
+
+    def transitions(self) -> Iterator[StatusTransition]:
+        """
+        Poll until no message is tracked any more, yielding each transition
+        """
+        while True:
+            next_poll = self._next_poll_at()
+            if next_poll is None:
+                return
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+            yield from self.poll_once()
+
+
+class AsyncDeliveryTracker(BaseDeliveryTracker):
+    """
+    Polls the delivery status of messages sent with AsyncClient
+    """
+    async def _fetch(self, request: Request) -> List[MessageResult]:
+        kind, value = request
+        try:
+            if kind == "message":
+                response = await self.client.get_message_status(value)
+                return [response.data]
+
+            async def fetch(page):
+                response = await self.client.get_user_messages_by_dispatch(value, page=page)
+                return response.data
+
+            return [
+                message
+                async for page in paginate.iter_pages_async(fetch, prefetch=0)
+                for message in page.result
+            ]
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Polling %s %s failed: %s", kind, value, exc)
+            return []
+
+    async def poll_once(self) -> List[StatusTransition]:
+        """
+        Poll the messages that are due now
+
+        Returns:
+            list: The status transitions observed
+        """
+        now = time.monotonic()
+        due, requests = self._plan(now)
+        results = [
+            message
+            async for messages in bulk.iter_completed_async(self._fetch, requests, self.max_in_flight)
+            for message in messages
+        ]
+        return self._apply(results, due, time.monotonic())
+
+    async def transitions(self) -> AsyncIterator[StatusTransition]:
+        """
+        Poll until no message is tracked any more, yielding each transition
+        """
+        while True:
+            next_poll = self._next_poll_at()
+            if next_poll is None:
+                return
+            await asyncio.sleep(max(0.0, next_poll - time.monotonic()))
+            for transition in await self.poll_once():
+                yield transition
@@ -2,3 +2,7 @@
 init enumerators
 """
 from .network import Network # NOQA
+from .endpoint import Endpoint # NOQA
+from .encoding import Encoding # NOQA
+from .phase import Phase # NOQA
+from .circuit import CircuitState # NOQA
@@ -0,0 +1,16 @@
+"""
+the circuit breaker state enumerations
+"""
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    """
+    The states of a circuit breaker
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __str__(self):
+        return self.value
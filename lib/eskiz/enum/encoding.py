@@ -0,0 +1,22 @@
+"""
+the message encoding enumerations
+"""
+from enum import Enum
+
+
+class Encoding(str, Enum):
+    """
+    The SMS data codings, with the `unicode` flag of the send requests
+    """
+    GSM7 = "gsm7"
+    UCS2 = "ucs2"
+
+    def __str__(self):
+        return self.value
+
+    @property
+    def unicode_flag(self) -> str:
+        """
+        The `unicode` form value of a message sent in this encoding
+        """
+        return "1" if self is Encoding.UCS2 else "0"
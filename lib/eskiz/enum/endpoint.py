@@ -0,0 +1,43 @@
+"""
+the endpoint enumerations
+"""
+from enum import Enum
+from urllib.parse import urlsplit
+
+
+class Endpoint(str, Enum):
+    """
+    The API endpoint paths, used to key per-endpoint policies
+    """
+    LOGIN = "/api/auth/login"
+    REFRESH = "/api/auth/refresh"
+    USER = "/api/auth/user"
+    GET_LIMIT = "/api/user/get-limit"
+    TEMPLATES = "/api/user/templates"
+    SEND_SMS = "/api/message/sms/send"
+    SEND_BATCH = "/api/message/sms/send-batch"
+    SEND_GLOBAL = "/api/message/sms/send-global"
+    USER_MESSAGES = "/api/message/sms/get-user-messages"
+    USER_MESSAGES_BY_DISPATCH = "/api/message/sms/get-user-messages-by-dispatch"
+    DISPATCH_STATUS = "/api/message/sms/get-dispatch-status"
+    MESSAGE_STATUS = "/api/message/sms/status_by_id"
+    EXPORT = "/api/message/export"
+    TOTALS_BY_RANGE = "/api/report/total-by-range"
+    TOTALS_BY_DISPATCH = "/api/report/total-by-dispatch"
+    USER_TOTALS = "/api/user/totals"
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def from_url(cls, url: str) -> str:
+        """
+        Return the endpoint path of a request URL
+
+        Query strings and the message ID of `status_by_id` are dropped, so
+        every request to the same endpoint maps to the same key.
+        """
+        path = urlsplit(url).path.rstrip("/")
+        if path.startswith(cls.MESSAGE_STATUS.value + "/"):
+            return cls.MESSAGE_STATUS.value
+        return path
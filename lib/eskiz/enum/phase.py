@@ -0,0 +1,18 @@
+"""
+the request phase enumerations
+"""
+from enum import Enum
+
+
+class Phase(str, Enum):
+    """
+    The phases of a client call, in the order they run
+    """
+    BUILD = "build"
+    SERIALIZE = "serialize"
+    NETWORK = "network"
+    DECODE = "decode"
+    VALIDATE = "validate"
+
+    def __str__(self):
+        return self.value
@@ -2,3 +2,9 @@
 the exceptions of eskizuz
 """
 from .token import TokenExpired # noqa
+from .ratelimit import RateLimitExceeded # noqa
+from .balance import InsufficientBalance # noqa
+from .template import TemplateMismatch # noqa
+from .phone import InvalidPhoneNumber # noqa
+from .breaker import CircuitOpen # noqa
+from .bulk import BulkSendFailed # noqa
@@ -0,0 +1,13 @@
+"""
+the balance exceptions
+"""
+
+
+class InsufficientBalance(Exception):
+    """
+    raised when the locally tracked balance does not cover a send
+    """
+    def __init__(self, required: float, available: float):
+        super().__init__(f"insufficient balance: {required:g} required, {available:g} available")
+        self.required = required
+        self.available = available
@@ -0,0 +1,13 @@
+"""
+the circuit breaker exceptions
+"""
+
+
+class CircuitOpen(Exception):
+    """
+    raised instead of sending a request while the circuit of its endpoint is open
+    """
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"circuit open for {endpoint}, retry after {retry_after:.3f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
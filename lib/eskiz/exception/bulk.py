@@ -0,0 +1,16 @@
+"""
+the bulk send exceptions
+"""
+from typing import Any, List, Tuple
+
+
+class BulkSendFailed(Exception):
+    """
+    raised by a bulk send once its chunks in flight have completed, if any of them failed
+
+    `failed` holds each failed chunk with its exception; the responses of
+    the other chunks were yielded before this was raised.
+    """
+    def __init__(self, failed: List[Tuple[Any, BaseException]]):
+        super().__init__(f"{len(failed)} chunk(s) failed, first error: {failed[0][1]!r}")
+        self.failed = failed
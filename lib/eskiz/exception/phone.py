@@ -0,0 +1,14 @@
+"""
+the phone number exceptions
+"""
+from typing import Any, Sequence
+
+
+class InvalidPhoneNumber(ValueError):
+    """
+    raised when phone numbers cannot be normalized to E.164
+    """
+    def __init__(self, numbers: Sequence[Any]):
+        shown = ", ".join(map(repr, numbers[:5])) + (", ..." if len(numbers) > 5 else "")
+        super().__init__(f"invalid phone number: {shown}")
+        self.numbers = list(numbers)
@@ -0,0 +1,13 @@
+"""
+the rate limit exceptions
+"""
+
+
+class RateLimitExceeded(Exception):
+    """
+    raised when the client-side rate limit does not allow a request
+    """
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"rate limit exceeded for {endpoint}, retry after {retry_after:.3f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
@@ -0,0 +1,13 @@
+"""
+the template exceptions
+"""
+
+
+class TemplateMismatch(ValueError):
+    """
+    raised when a text does not match its approved template
+    """
+    def __init__(self, template_id: int, reason: str):
+        super().__init__(f"text does not match template {template_id}: {reason}")
+        self.template_id = template_id
+        self.reason = reason
@@ -0,0 +1,4 @@
+"""
+hedged requests for eskiz
+"""
+from .policy import HedgePolicy, HedgeStats # noqa
@@ -0,0 +1,170 @@
+"""
+the hedging policy with a percentile-based delay and a hedge budget
+"""
+import threading
+from typing import Dict, Iterable, Optional
+
+from eskiz.metrics import DEFAULT_BUCKETS, Histogram
+
+
+class HedgeStats:
+    """
+    Thread-safe counters of the hedges made under a policy
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.suppressed = 0
+
+    def record_request(self) -> None:
+        """
+        Count a request sent under the policy
+        """
+        with self._lock:
+            self.requests += 1
+
+    def record_hedge(self, fired: bool) -> None:
+        """
+        Count a slow request that was hedged, or not hedged because the budget was spent
+        """
+        with self._lock:
+            if fired:
+                self.hedged += 1
+            else:
+                self.suppressed += 1
+
+    def record_win(self) -> None:
+        """
+        Count a hedge that answered before the request it hedged
+        """
+        with self._lock:
+            self.wins += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Return a copy of the counters
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "wins": self.wins,
+                "suppressed": self.suppressed,
+            }
+
+
+class HedgePolicy:
+    """
+    Decides when a slow request gets a second, hedged attempt
+
+    A request still unanswered after the `quantile` latency of the latest
+    requests, clamped between `min_delay` and `max_delay`, is sent again and
+    the first response wins. Until `min_samples` latencies are known the
+    delay is `initial_delay`. Latencies are kept for `window_size` requests
+    at a time, so the delay follows changes in the latency of Eskiz.
+
+    Hedges are paid from a budget: each request adds `max_hedge_rate` to it,
+    up to `burst`, and each hedge takes 1. This caps hedges at
+    `max_hedge_rate` of the requests, so an overloaded server is not sent
+    twice the traffic.
+    """
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        initial_delay: float = 0.5,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        min_samples: int = 20,
+        window_size: int = 1000,
+        max_hedge_rate: float = 0.05,
+        burst: float = 5.0,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Args:
+            quantile: Latency quantile after which a request is hedged
+            initial_delay: Delay in seconds until `min_samples` latencies are known
+            min_delay: Minimum delay in seconds
+            max_delay: Maximum delay in seconds
+            min_samples: Number of latencies needed to use the quantile
+            window_size: Number of requests after which latencies start over
+            max_hedge_rate: Maximum share of requests that are hedged
+            burst: Maximum number of hedges the budget holds
+            buckets: Upper bounds in seconds of the latency histogram buckets
+        """
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be in (0, 1)")
+        if not 0 <= max_hedge_rate <= 1:
+            raise ValueError("max_hedge_rate must be in [0, 1]")
+        if min_samples < 1 or window_size < min_samples:
+            raise ValueError("window_size must be at least min_samples, which must be positive")
+
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_hedge_rate = max_hedge_rate
+        self.burst = burst
+        self.buckets = tuple(sorted(buckets))
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+        self._latencies = Histogram(self.buckets)
+        self._previous: Optional[Histogram] = None
+        self._budget = burst
+
+    def start(self) -> float:
+        """
+        Count a new request, adding to the hedge budget
+
+        Returns:
+            float: Seconds to wait for a response before hedging
+        """
+        self.stats.record_request()
+        with self._lock:
+            self._budget = min(self.burst, self._budget + self.max_hedge_rate)
+            return self._delay()
+
+    def delay(self) -> float:
+        """
+        Return the seconds to wait for a response before hedging
+        """
+        with self._lock:
+            return self._delay()
+
+    def _delay(self) -> float:
+        histogram = self._latencies
+        if histogram.count < self.min_samples:
+            histogram = self._previous
+        if histogram is None:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, histogram.quantile(self.quantile)))
+
+    def try_hedge(self) -> bool:
+        """
+        Take one hedge from the budget
+
+        Returns:
+            bool: False if the budget is spent and the request must not be hedged
+        """
+        with self._lock:
+            if self._budget < 1:
+                allowed = False
+            else:
+                self._budget -= 1
+                allowed = True
+        self.stats.record_hedge(allowed)
+        return allowed
+
+    def observe(self, seconds: float) -> None:
+        """
+        Add the latency of a request, as seen by its caller
+        """
+        with self._lock:
+            if self._latencies.count >= self.window_size:
+                self._previous = self._latencies
+                self._latencies = Histogram(self.buckets)
+            self._latencies.observe(seconds)
@@ -0,0 +1,5 @@
+"""
+request lifecycle hooks for eskiz
+"""
+from .base import HookChain, RequestContext, RequestHooks, run_phase # noqa
+from .timing import PhaseTimings # noqa
@@ -0,0 +1,122 @@
+"""
+the request lifecycle hooks interface
+"""
+import time
+from contextlib import nullcontext
+from typing import Any, ContextManager, Dict, Optional, Sequence
+
+from eskiz.enum import Phase
+
+
+class RequestContext:
+    """
+    What is known about one client call, shared by the hooks of all its phases
+
+    A context is created per call, so hooks can keep per-call data, such as
+    open spans, in `state`. The network phases run once per attempt and
+    read the attempt number from `attempt`.
+    """
+    __slots__ = ("endpoint", "method", "attempt", "status", "user_sms_ids", "dispatch_id", "state")
+
+    def __init__(self, endpoint: str, method: str, user_sms_ids: Sequence[str] = (),
+                 dispatch_id: Optional[Any] = None):
+        """
+        Args:
+            endpoint: Endpoint path (see `Endpoint`)
+            method: HTTP method
+            user_sms_ids: The `user_sms_id` of each message a batch send carries
+            dispatch_id: Dispatch ID the call sends to or reads from
+        """
+        self.endpoint = endpoint
+        self.method = method
+        self.attempt = 0
+        self.status: Optional[int] = None
+        self.user_sms_ids = tuple(user_sms_ids)
+        self.dispatch_id = dispatch_id
+        self.state: Dict[str, Any] = {}
+
+    def __repr__(self):
+        return (
+            f"RequestContext(endpoint={self.endpoint!r}, method={self.method!r}, "
+            f"attempt={self.attempt}, status={self.status})"
+        )
+
+
+class RequestHooks:
+    """
+    Receives the start and end of each phase of the client calls
+
+    Every method is a no-op, so a subclass only overrides the events it
+    needs. Clients without hooks skip them entirely instead of calling a
+    no-op. The phases of a call run in the order of `Phase`; SERIALIZE,
+    NETWORK and DECODE run again for each retried attempt, and cached
+    responses skip every phase after BUILD. Hooks run on the calling
+    thread or event loop and should return quickly.
+    """
+    def start_phase(self, phase: Phase, context: RequestContext) -> None:
+        """
+        Called before `phase` of the call described by `context` runs
+        """
+
+    def finish_phase(self, phase: Phase, context: RequestContext, seconds: float,
+                     error: Optional[BaseException]) -> None:
+        """
+        Called once the phase started by `start_phase` completed or failed
+
+        Args:
+            phase: The phase
+            context: The call context
+            seconds: Duration of the phase
+            error: The exception the phase raised, or None
+        """
+
+
+class HookChain(RequestHooks):
+    """
+    Runs several hooks, finishing phases in the reverse order they were started
+    """
+    def __init__(self, *hooks: RequestHooks):
+        self.hooks = hooks
+        self._reversed = hooks[::-1]
+
+    def start_phase(self, phase: Phase, context: RequestContext) -> None:
+        for hook in self.hooks:
+            hook.start_phase(phase, context)
+
+    def finish_phase(self, phase: Phase, context: RequestContext, seconds: float,
+                     error: Optional[BaseException]) -> None:
+        for hook in self._reversed:
+            hook.finish_phase(phase, context, seconds, error)
+
+
+class _TimedPhase:
+    """
+    Context manager reporting one phase to the hooks
+    """
+    __slots__ = ("hooks", "phase", "context", "started")
+
+    def __init__(self, hooks: RequestHooks, phase: Phase, context: RequestContext):
+        self.hooks = hooks
+        self.phase = phase
+        self.context = context
+
+    def __enter__(self):
+        self.hooks.start_phase(self.phase, self.context)
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.hooks.finish_phase(self.phase, self.context, time.perf_counter() - self.started, exc_val)
+
+
+_UNTRACED = nullcontext()
+
+
+def run_phase(hooks: Optional[RequestHooks], phase: Phase, context: Optional[RequestContext]) -> ContextManager:
+    """
+    Return a context manager reporting the code it wraps as `phase` of a call
+
+    Without a context, the call is not traced and nothing is reported.
+    """
+    if context is None:
+        return _UNTRACED
+    return _TimedPhase(hooks, phase, context)
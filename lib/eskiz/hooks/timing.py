@@ -0,0 +1,50 @@
+"""
+per-phase latency histograms
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from eskiz.enum import Phase
+from eskiz.metrics import DEFAULT_BUCKETS, Histogram
+
+from .base import RequestContext, RequestHooks
+
+
+class PhaseTimings(RequestHooks):
+    """
+    Thread-safe latency histograms per endpoint and phase
+
+    Comparing the NETWORK histogram of an endpoint with the others tells
+    whether slow calls wait on Eskiz or on client-side work.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Upper bounds in seconds of the histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Phase], Histogram] = {}
+
+    def finish_phase(self, phase: Phase, context: RequestContext, seconds: float,
+                     error: Optional[BaseException]) -> None:
+        key = (context.endpoint, phase)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def snapshot(self) -> Dict[Tuple[str, Phase], Histogram]:
+        """
+        Return a copy of the histogram of each (endpoint, phase) pair
+        """
+        with self._lock:
+            return {key: histogram.copy() for key, histogram in self.histograms.items()}
+
+    def reset(self) -> None:
+        """
+        Drop every observation
+        """
+        with self._lock:
+            self.histograms.clear()
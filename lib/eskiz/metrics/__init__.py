@@ -0,0 +1,6 @@
+"""
+request metrics for eskiz
+"""
+from .base import Metrics, MetricsExporter # noqa
+from .registry import DEFAULT_BUCKETS, Histogram, MetricsRegistry # noqa
+from .prometheus import PrometheusExporter # noqa
@@ -0,0 +1,75 @@
+"""
+the metrics interface
+"""
+
+
+class Metrics:
+    """
+    Receives the instrumentation events of the clients
+
+    Every method is a no-op, so a subclass forwarding to another metrics
+    library only overrides the events it needs. Clients without metrics
+    skip instrumentation entirely instead of calling a no-op.
+    """
+    def start_request(self, endpoint: str) -> None:
+        """
+        Called before an HTTP request attempt is sent to `endpoint`
+        """
+
+    def finish_request(self, endpoint: str, method: str, status: str, seconds: float,
+                       sent_bytes: int, received_bytes: int) -> None:
+        """
+        Called once the attempt started by `start_request` completed or failed
+
+        Args:
+            endpoint: Endpoint path (see `Endpoint`)
+            method: HTTP method
+            status: HTTP status code, or the exception name if no response was received
+            seconds: Duration of the attempt, including reading a non-streamed body
+            sent_bytes: Size of the request body
+            received_bytes: Size of the response body
+        """
+
+    def record_retry(self, endpoint: str, reason: str) -> None:
+        """
+        Called before a failed request is retried, with the status or error name
+        """
+
+    def record_refresh(self) -> None:
+        """
+        Called for each token refresh request
+        """
+
+    def record_login(self) -> None:
+        """
+        Called for each login request
+        """
+
+    def record_circuit_state(self, endpoint: str, state: str) -> None:
+        """
+        Called when the circuit of `endpoint` changes to `state` (see `CircuitState`)
+        """
+
+    def record_rejected(self, endpoint: str) -> None:
+        """
+        Called for each request rejected because the circuit of `endpoint` is open
+        """
+
+    def record_hedge(self, endpoint: str, event: str) -> None:
+        """
+        Called when a slow request to `endpoint` is hedged ("fired"), is not hedged
+        because the hedge budget is spent ("suppressed"), or when its hedge answers first ("won")
+        """
+
+
+class MetricsExporter:
+    """
+    Base class of the exporters rendering collected metrics for a monitoring system
+    """
+    content_type = "text/plain"
+
+    def render(self) -> str:
+        """
+        Return the current metrics in the format of the exporter
+        """
+        raise NotImplementedError
@@ -0,0 +1,104 @@
+"""
+the Prometheus text format exporter
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from eskiz.enum import CircuitState
+
+from .base import MetricsExporter
+from .registry import MetricsRegistry
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value of the text format
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+    return f"{{{text}}}" if text else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusExporter(MetricsExporter):
+    """
+    Renders a MetricsRegistry in the Prometheus text exposition format
+
+    Serve `render()` with `content_type` from a `/metrics` endpoint of the
+    application to let Prometheus scrape it.
+    """
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, registry: MetricsRegistry, namespace: str = "eskiz"):
+        """
+        Args:
+            registry: Registry passed to the clients as `metrics`
+            namespace: Prefix of the metric names
+        """
+        self.registry = registry
+        self.namespace = namespace
+
+    def _family(self, lines: List[str], name: str, kind: str, help_text: str,
+                samples: Dict[Tuple[Tuple[str, str], ...], float]) -> None:
+        """
+        Append a metric family with one sample per label set
+        """
+        name = f"{self.namespace}_{name}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def render(self) -> str:
+        snapshot = self.registry.snapshot()
+        lines: List[str] = []
+
+        self._family(lines, "requests_total", "counter", "HTTP requests sent to Eskiz", {
+            (("endpoint", endpoint), ("method", method), ("status", status)): count
+            for (endpoint, method, status), count in snapshot["requests"].items()
+        })
+
+        name = f"{self.namespace}_request_duration_seconds"
+        lines.append(f"# HELP {name} Duration of HTTP requests to Eskiz")
+        lines.append(f"# TYPE {name} histogram")
+        for endpoint, histogram in sorted(snapshot["latency"].items()):
+            bounds = [_number(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, histogram.cumulative()):
+                lines.append(f"{name}_bucket{_labels([('endpoint', endpoint), ('le', bound)])} {count}")
+            lines.append(f"{name}_sum{_labels([('endpoint', endpoint)])} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{_labels([('endpoint', endpoint)])} {histogram.count}")
+
+        self._family(lines, "request_bytes_total", "counter", "Bytes of request bodies sent to Eskiz", {
+            (("endpoint", endpoint),): count for endpoint, count in snapshot["sent_bytes"].items()
+        })
+        self._family(lines, "response_bytes_total", "counter", "Bytes of response bodies received from Eskiz", {
+            (("endpoint", endpoint),): count for endpoint, count in snapshot["received_bytes"].items()
+        })
+        self._family(lines, "retries_total", "counter", "Requests retried after a transient failure", {
+            (("endpoint", endpoint), ("reason", reason)): count
+            for (endpoint, reason), count in snapshot["retries"].items()
+        })
+        self._family(lines, "requests_in_flight", "gauge", "HTTP requests to Eskiz awaiting a response", {
+            (("endpoint", endpoint),): count for endpoint, count in snapshot["in_flight"].items()
+        })
+        self._family(lines, "token_refreshes_total", "counter", "Token refresh requests", {(): snapshot["refreshes"]})
+        self._family(lines, "logins_total", "counter", "Login requests", {(): snapshot["logins"]})
+        self._family(lines, "circuit_state", "gauge", "1 for the current state of each circuit breaker", {
+            (("endpoint", endpoint), ("state", state.value)): int(state.value == current)
+            for endpoint, current in snapshot["circuit_states"].items()
+            for state in CircuitState
+        })
+        self._family(lines, "circuit_rejected_total", "counter", "Requests rejected by an open circuit", {
+            (("endpoint", endpoint),): count for endpoint, count in snapshot["rejected"].items()
+        })
+        self._family(lines, "hedges_total", "counter", "Slow requests hedged, hedges suppressed and hedges that won", {
+            (("endpoint", endpoint), ("event", event)): count
+            for (endpoint, event), count in snapshot["hedges"].items()
+        })
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,183 @@
+"""
+the in-memory metrics registry
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from .base import Metrics
+
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Counts of observations per bucket, with their sum
+
+    `counts[i]` counts the observations at most `buckets[i]` and above the
+    previous bound; the last count holds the observations above every bound.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Add one observation
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """
+        Return the number of observations at most each bound, then the total
+        """
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the `q` quantile by interpolating within its bucket
+
+        Observations above the last bound are estimated at the last bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def copy(self) -> "Histogram":
+        """
+        Return an independent copy
+        """
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+class MetricsRegistry(Metrics):
+    """
+    Thread-safe in-memory aggregation of the client metrics
+
+    Keeps, per endpoint: a latency histogram, request counts by method and
+    status, request and response byte counts, retry counts by reason and
+    the number of requests in flight; the token refresh and login counts;
+    the circuit breaker states and rejected requests per circuit; and the
+    hedge events per endpoint. One registry can be shared by several sync
+    and async clients.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Upper bounds in seconds of the latency histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.latency: Dict[str, Histogram] = {}
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.sent_bytes: Dict[str, int] = {}
+        self.received_bytes: Dict[str, int] = {}
+        self.retries: Dict[Tuple[str, str], int] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.refreshes = 0
+        self.logins = 0
+        self.circuit_states: Dict[str, str] = {}
+        self.rejected: Dict[str, int] = {}
+        self.hedges: Dict[Tuple[str, str], int] = {}
+
+    def start_request(self, endpoint: str) -> None:
+        with self._lock:
+            self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+
+    def finish_request(self, endpoint: str, method: str, status: str, seconds: float,
+                       sent_bytes: int, received_bytes: int) -> None:
+        key = (endpoint, method, status)
+        with self._lock:
+            self.in_flight[endpoint] -= 1
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.sent_bytes[endpoint] = self.sent_bytes.get(endpoint, 0) + sent_bytes
+            self.received_bytes[endpoint] = self.received_bytes.get(endpoint, 0) + received_bytes
+
+    def record_retry(self, endpoint: str, reason: str) -> None:
+        key = (endpoint, reason)
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def record_refresh(self) -> None:
+        with self._lock:
+            self.refreshes += 1
+
+    def record_login(self) -> None:
+        with self._lock:
+            self.logins += 1
+
+    def record_circuit_state(self, endpoint: str, state: str) -> None:
+        with self._lock:
+            self.circuit_states[endpoint] = state
+
+    def record_rejected(self, endpoint: str) -> None:
+        with self._lock:
+            self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+
+    def record_hedge(self, endpoint: str, event: str) -> None:
+        key = (endpoint, event)
+        with self._lock:
+            self.hedges[key] = self.hedges.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return a consistent copy of every metric
+        """
+        with self._lock:
+            return {
+                "latency": {endpoint: histogram.copy() for endpoint, histogram in self.latency.items()},
+                "requests": dict(self.requests),
+                "sent_bytes": dict(self.sent_bytes),
+                "received_bytes": dict(self.received_bytes),
+                "retries": dict(self.retries),
+                "in_flight": dict(self.in_flight),
+                "refreshes": self.refreshes,
+                "logins": self.logins,
+                "circuit_states": dict(self.circuit_states),
+                "rejected": dict(self.rejected),
+                "hedges": dict(self.hedges),
+            }
+
+    def reset(self) -> None:
+        """
+        Drop every metric except the requests in flight and the circuit states
+        """
+        with self._lock:
+            self.latency.clear()
+            self.requests.clear()
+            self.sent_bytes.clear()
+            self.received_bytes.clear()
+            self.retries.clear()
+            self.refreshes = 0
+            self.logins = 0
+            self.rejected.clear()
+            self.hedges.clear()
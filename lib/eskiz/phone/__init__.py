@@ -0,0 +1,7 @@
+"""
+phone number normalization for eskiz
+"""
+from .normalize import (
+    DEFAULT_COUNTRY_CODE, NormalizedNumbers, iter_normalized_messages, log_rejected,
+    normalize_batch, normalize_messages, normalize_number, normalize_numbers
+) # noqa
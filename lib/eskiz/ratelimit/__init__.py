@@ -0,0 +1,6 @@
+"""
+client-side rate limiting for eskiz
+"""
+from .base import TokenBucket, RateLimiter # noqa
+from .memory import InMemoryRateLimiter # noqa
+from .file import FileRateLimiter # noqa
@@ -0,0 +1,148 @@
+"""
+the token bucket rate limiter interface
+"""
+import asyncio
+import time
+from typing import Dict, List, MutableMapping, Optional, Tuple
+
+from eskiz.exception import RateLimitExceeded
+
+
+# Key of the account-wide bucket
+GLOBAL_KEY = "*"
+
+
+class TokenBucket:
+    """
+    Token bucket settings: `rate` tokens per second, holding up to `burst` tokens
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+
+    def __repr__(self):
+        return f"TokenBucket(rate={self.rate}, burst={self.burst})"
+
+
+class RateLimiter:
+    """
+    Base class of the rate limiters consulted by the clients before each request
+
+    A request takes one token from the account-wide bucket and one from the
+    bucket of its endpoint, if one is configured. Subclasses provide the
+    storage of the bucket state by implementing `try_acquire`, usually by
+    calling `_take` on their state under a lock. Subclasses whose
+    `try_acquire` may block, waiting for a file lock for example, override
+    `try_acquire_async` so that it does not block the event loop.
+    """
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        endpoint_limits: Optional[Dict[str, TokenBucket]] = None,
+        blocking: bool = True,
+        max_wait: Optional[float] = None,
+    ):
+        """
+        Args:
+            rate: Account-wide requests per second, or None for no global limit
+            burst: Account-wide burst size (defaults to `rate`)
+            endpoint_limits: Per-endpoint buckets keyed by endpoint path (see `Endpoint`)
+            blocking: Wait for a token instead of raising RateLimitExceeded
+            max_wait: Maximum seconds to wait before raising RateLimitExceeded
+        """
+        self.global_limit = TokenBucket(rate, burst) if rate is not None else None
+        self.endpoint_limits = {str(key): value for key, value in (endpoint_limits or {}).items()}
+        self.blocking = blocking
+        self.max_wait = max_wait
+
+    def _buckets(self, endpoint: str) -> List[Tuple[str, TokenBucket]]:
+        """
+        Return the buckets a request to `endpoint` draws from
+        """
+        buckets = []
+        if self.global_limit is not None:
+            buckets.append((GLOBAL_KEY, self.global_limit))
+        if endpoint in self.endpoint_limits:
+            buckets.append((endpoint, self.endpoint_limits[endpoint]))
+        return buckets
+
+    def _take(self, state: MutableMapping[str, List[float]], endpoint: str, now: float) -> float:
+        """
+        Take a token for `endpoint` from the buckets stored in `state`
+
+        Tokens are taken from all buckets or none of them.
+
+        Returns:
+            float: 0 if the request may proceed, otherwise seconds until it may
+        """
+        levels = []
+        delay = 0.0
+
+        for key, bucket in self._buckets(endpoint):
+            tokens, updated = state.get(key, (bucket.burst, now))
+            tokens = min(bucket.burst, tokens + max(0.0, now - updated) * bucket.rate)
+            levels.append((key, tokens))
+            if tokens < 1:
+                delay = max(delay, (1 - tokens) / bucket.rate)
+
+        for key, tokens in levels:
+            state[key] = [tokens - 1 if delay == 0 else tokens, now]
+
+        return delay
+
+    def try_acquire(self, endpoint: str) -> float:
+        """
+        Try to take a token for a request to `endpoint` without waiting
+
+        Returns:
+            float: 0 if the request may proceed, otherwise seconds until it may
+        """
+        raise NotImplementedError
+
+    async def try_acquire_async(self, endpoint: str) -> float:
+        """
+        Try to take a token for a request to `endpoint` from an event loop
+
+        Returns:
+            float: 0 if the request may proceed, otherwise seconds until it may
+        """
+        return self.try_acquire(endpoint)
+
+    def _check_wait(self, endpoint: str, delay: float, waited: float) -> None:
+        if not self.blocking or (self.max_wait is not None and waited + delay > self.max_wait):
+            raise RateLimitExceeded(endpoint, delay)
+
+    def acquire(self, endpoint: str) -> None:
+        """
+        Block until a request to `endpoint` is allowed
+
+        Raises:
+            RateLimitExceeded: if the limiter is non-blocking or `max_wait` would be exceeded
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(endpoint)
+            if delay <= 0:
+                return
+            self._check_wait(endpoint, delay, waited)
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """
+        Wait without blocking the event loop until a request to `endpoint` is allowed
+
+        Raises:
+            RateLimitExceeded: if the limiter is non-blocking or `max_wait` would be exceeded
+        """
+        waited = 0.0
+        while True:
+            delay = await self.try_acquire_async(endpoint)
+            if delay <= 0:
+                return
+            self._check_wait(endpoint, delay, waited)
+            await asyncio.sleep(delay)
+            waited += delay
@@ -0,0 +1,56 @@
+"""
+the file-backed rate limiter shared by processes on one host
+"""
+import asyncio
+import json
+import os
+import time
+
+from .base import RateLimiter
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows
+    fcntl = None
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Rate limiter keeping its buckets in a JSON file guarded by an exclusive lock
+
+    Every process pointing at the same `path` draws from the same buckets, so
+    several workers on one host respect one account quota.
+    """
+    def __init__(self, path: str, *args, **kwargs):
+        """
+        Args:
+            path: Path of the state file, created if missing
+            *args, **kwargs: See `RateLimiter`
+        """
+        if fcntl is None:
+            raise RuntimeError("FileRateLimiter requires fcntl, which is not available on this platform")
+        super().__init__(*args, **kwargs)
+        self.path = path
+
+    def try_acquire(self, endpoint: str) -> float:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as file:
+                content = file.read()
+                state = json.loads(content) if content else {}
+
+                delay = self._take(state, endpoint, time.time())
+
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(state))
+            return delay
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    async def try_acquire_async(self, endpoint: str) -> float:
+        # The lock may be held by another process, so wait for it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.try_acquire, endpoint)
@@ -0,0 +1,23 @@
+"""
+the in-process rate limiter
+"""
+import threading
+import time
+
+from .base import RateLimiter
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Rate limiter keeping its buckets in process memory
+
+    Safe to share between threads and between sync and async clients of one process.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def try_acquire(self, endpoint: str) -> float:
+        with self._lock:
+            return self._take(self._state, endpoint, time.monotonic())
@@ -3,7 +3,10 @@ init requests of eskiz
 """
 from .login import LoginRequest # noqa
 from .send import SendSMSRequest # noqa
-from .batch import SendBatchSMSRequest, SendGlobalSMSRequest # noqa
+from .batch import (
+    BatchSMSMessage, BatchSMSMessageDict, SendBatchSMSRequest, SendGlobalSMSRequest,
+    batch_messages_adapter
+) # noqa
 from .messages import (
     GetUserMessagesRequest, GetUserMessagesByDispatchRequest,
     GetDispatchStatusRequest, ExportMessagesRequest
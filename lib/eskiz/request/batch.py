@@ -2,7 +2,10 @@
 Request models for batch SMS operations
 """
 from typing import List, Optional
-from pydantic import BaseModel, Field
+
+# pydantic only accepts typing.TypedDict from Python 3.12
+from typing_extensions import TypedDict
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class BatchSMSMessage(BaseModel):
@@ -14,6 +17,20 @@ class BatchSMSMessage(BaseModel):
     text: str
 
 
+class BatchSMSMessageDict(TypedDict):
+    """
+    Individual message in a batch SMS request, as a plain dict
+    """
+    user_sms_id: str
+    to: int
+    text: str
+
+
+# Validates a whole list of message dicts in one pass inside pydantic-core
+# and returns plain dicts, without building a model per message
+batch_messages_adapter = TypeAdapter(List[BatchSMSMessageDict], config=ConfigDict(extra="allow", coerce_numbers_to_str=True))
+
+
 class SendBatchSMSRequest(BaseModel):
     """
     Request model for sending batch SMS messages
@@ -23,3 +23,15 @@ class SendSMSRequest(BaseModel):
             'from': (None, self.from_),
             'callback_url': (None, self.callback_url),
         }
+
+    @staticmethod
+    def build_file(phone_number, message, from_, callback_url):
+        """
+        returning file format from trusted values, without building the model
+        """
+        return {
+            'mobile_phone': (None, phone_number),
+            'message': (None, message),
+            'from': (None, from_),
+            'callback_url': (None, callback_url),
+        }
@@ -8,7 +8,8 @@ from .send import SendSMSResponse # noqa
 from .limit import GetLimitResponse # noqa
 from .batch import SendBatchSMSResponse, SendGlobalSMSResponse # noqa
 from .messages import (
-    GetUserMessagesResponse, GetDispatchStatusResponse, MessageStatusResponse
+    GetUserMessagesResponse, GetDispatchStatusResponse, MessageStatusResponse,
+    MessageData, MessageResult
 ) # noqa
-from .reports import TotalsResponse, UserTotalsResponse # noqa
+from .reports import TotalsData, TotalsResponse, UserTotalsItem, UserTotalsResponse # noqa
 from .templates import TemplatesResponse # noqa
\ No newline at end of file
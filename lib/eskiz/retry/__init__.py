@@ -0,0 +1,4 @@
+"""
+retry policies for eskiz
+"""
+from .policy import RetryPolicy, RetryStats, parse_retry_after # noqa
@@ -0,0 +1,167 @@
+"""
+the retry policy with exponential backoff and jitter
+"""
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a `Retry-After` header given either as seconds or as an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryStats:
+    """
+    Thread-safe counters of the retries made under a policy
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+        self.by_reason: Dict[str, int] = {}
+
+    def record_retry(self, reason: str) -> None:
+        """
+        Count a retry, keyed by status code or error name
+        """
+        with self._lock:
+            self.retries += 1
+            self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def record_exhausted(self) -> None:
+        """
+        Count a request that failed after using all its attempts
+        """
+        with self._lock:
+            self.exhausted += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return a copy of the counters
+        """
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "by_reason": dict(self.by_reason),
+            }
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait in between
+
+    Responses with a status in `retry_statuses` and network errors are retried
+    for idempotent methods. Non-idempotent methods such as the POST of
+    `send_sms` are only retried when the server cannot have processed the
+    request: connection failures before the request was sent and the
+    statuses in `unprocessed_statuses` (429 by default). This keeps retries
+    from sending an SMS twice.
+
+    Delays grow exponentially from `backoff_base` up to `backoff_cap`, with
+    full jitter so clients recovering from the same outage spread out. A
+    `Retry-After` header takes precedence, up to `max_retry_after`.
+    """
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+        unprocessed_statuses: Iterable[int] = (429,),
+        idempotent_methods: Iterable[str] = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"),
+        respect_retry_after: bool = True,
+        max_retry_after: float = 60.0,
+    ):
+        """
+        Args:
+            max_attempts: Total attempts per request, including the first one
+            backoff_base: Delay before the first retry in seconds
+            backoff_cap: Maximum backoff delay in seconds
+            jitter: Pick a random delay between 0 and the backoff delay
+            retry_statuses: HTTP statuses that are retried for idempotent methods
+            unprocessed_statuses: HTTP statuses that are retried for any method
+            idempotent_methods: HTTP methods that are safe to repeat
+            respect_retry_after: Use the `Retry-After` header when present
+            max_retry_after: Maximum delay accepted from `Retry-After`
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.unprocessed_statuses = frozenset(unprocessed_statuses)
+        self.idempotent_methods = frozenset(method.upper() for method in idempotent_methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.stats = RetryStats()
+
+    def is_idempotent(self, method: str) -> bool:
+        """
+        Return whether `method` may be repeated safely
+        """
+        return method.upper() in self.idempotent_methods
+
+    def should_retry_status(self, method: str, status: int, attempt: int) -> bool:
+        """
+        Return whether a response with `status` to attempt number `attempt` is retried
+        """
+        retryable = status in self.unprocessed_statuses or (
+            status in self.retry_statuses and self.is_idempotent(method)
+        )
+        return self._within_attempts(retryable, attempt)
+
+    def should_retry_error(self, method: str, request_sent: bool, attempt: int) -> bool:
+        """
+        Return whether a network error on attempt number `attempt` is retried
+
+        Args:
+            method: HTTP method
+            request_sent: False if the connection failed before the request was sent
+            attempt: Number of the failed attempt, starting at 1
+        """
+        retryable = not request_sent or self.is_idempotent(method)
+        return self._within_attempts(retryable, attempt)
+
+    def _within_attempts(self, retryable: bool, attempt: int) -> bool:
+        if retryable and attempt >= self.max_attempts:
+            self.stats.record_exhausted()
+            return False
+        return retryable
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Return the delay before the attempt following attempt number `attempt`
+        """
+        if self.respect_retry_after and retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
@@ -0,0 +1,7 @@
+"""
+SMS segment and cost calculation for eskiz
+"""
+from .calculator import (
+    GSM7_BASIC, GSM7_EXTENDED, CostEstimate, Segments,
+    analyze, analyze_batch, count_parts, count_batch_parts, estimate_cost, unicode_flag
+) # noqa
@@ -0,0 +1,173 @@
+"""
+the GSM-7 / UCS-2 segment calculator
+"""
+import re
+from typing import Iterable, List, NamedTuple, Tuple
+
+from eskiz.enum import Encoding
+
+# Characters of the GSM 03.38 default alphabet, one septet each
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+
+# Characters of the extension table, sent as an escape plus one septet
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+GSM7_SINGLE, GSM7_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+# Byte tables for ASCII text: deleting the GSM-7 bytes leaves the bytes
+# that force UCS-2, and deleting all others leaves the extension bytes
+_ASCII_GSM7 = bytes(code for code in range(128) if chr(code) in GSM7_BASIC | GSM7_EXTENDED)
+_ASCII_NOT_EXTENDED = bytes(code for code in range(256) if chr(code) not in GSM7_EXTENDED)
+
+# For other text: both GSM-7 tables, and the first character outside them.
+# Text in another script usually starts with a character outside them,
+# which a set lookup finds before the scan.
+_GSM7 = GSM7_BASIC | GSM7_EXTENDED
+_NOT_GSM7 = re.compile("[^" + re.escape("".join(sorted(_GSM7))) + "]")
+_EXTENDED = tuple(sorted(GSM7_EXTENDED))
+
+# Characters outside the BMP, sent as two UTF-16 code units
+_ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+
+class Segments(NamedTuple):
+    """
+    How one message is sent: its encoding, length in septets or UTF-16
+    code units, and number of parts
+    """
+    encoding: Encoding
+    units: int
+    parts: int
+
+    @property
+    def unicode_flag(self) -> str:
+        """
+        The `unicode` form value for the message
+        """
+        return self.encoding.unicode_flag
+
+
+class CostEstimate(NamedTuple):
+    """
+    Totals of a batch of messages
+    """
+    messages: int
+    parts: int
+    gsm7: int
+    ucs2: int
+    cost: float
+
+
+def _parts(units: int, single: int, multi: int) -> int:
+    return 1 if units <= single else -(-units // multi)
+
+
+def _split(text: str, multi: int, double: Iterable[str]) -> int:
+    """
+    Count the parts of multi-part text whose two-unit characters in
+    `double` cannot be split between parts
+    """
+    parts, used = 1, 0
+    for char in text:
+        width = 2 if char in double else 1
+        if used + width > multi:
+            parts, used = parts + 1, 0
+        used += width
+    return parts
+
+
+def _measure(text: str) -> Tuple[bool, int, int]:
+    """
+    Return whether `text` needs UCS-2, its length in septets or UTF-16
+    code units, and its number of parts
+    """
+    if text.isascii():
+        data = text.encode("ascii")
+        if data.translate(None, _ASCII_GSM7):
+            return True, len(data), _parts(len(data), UCS2_SINGLE, UCS2_MULTI)
+        extended = len(data.translate(None, _ASCII_NOT_EXTENDED))
+    elif text[0] in _GSM7 and _NOT_GSM7.search(text) is None:
+        extended = sum(map(text.count, _EXTENDED))
+    else:
+        # One C-level pass; characters outside the BMP take two code units.
+        # "utf-16" has a fast path "utf-16-le" lacks; its BOM is one unit.
+        units = (len(text.encode("utf-16")) >> 1) - 1
+        if units <= UCS2_SINGLE:
+            return True, units, 1
+        parts = -(-units // UCS2_MULTI)
+        # Unsplittable pairs waste at most one unit per part, so only
+        # count exactly when that could add a part
+        if units != len(text) and parts * UCS2_MULTI - units < parts - 1:
+            parts = _split(text, UCS2_MULTI, frozenset(_ASTRAL.findall(text)))
+        return True, units, parts
+
+    septets = len(text) + extended
+    parts = _parts(septets, GSM7_SINGLE, GSM7_MULTI)
+    if extended and parts > 1 and parts * GSM7_MULTI - septets < parts - 1:
+        parts = _split(text, GSM7_MULTI, GSM7_EXTENDED)
+    return False, septets, parts
+
+
+def analyze(text: str) -> Segments:
+    """
+    Return the encoding, length and number of parts of `text`
+
+    Text made only of GSM-7 characters is sent in 160-septet parts (153
+    when split), extension characters taking two septets; anything else is
+    sent as UCS-2 in 70-unit parts (67 when split). ASCII text is checked
+    with byte translation tables and other text with a compiled character
+    class, and UCS-2 text is measured by encoding it to UTF-16, so the cost
+    is a few C-level passes over the text.
+    """
+    ucs2, units, parts = _measure(text)
+    return Segments(Encoding.UCS2 if ucs2 else Encoding.GSM7, units, parts)
+
+
+def count_parts(text: str) -> int:
+    """
+    Return the number of SMS parts `text` is sent as
+    """
+    return _measure(text)[2]
+
+
+def unicode_flag(text: str) -> str:
+    """
+    Return the `unicode` form value needed to send `text`: "1" for UCS-2, "0" for GSM-7
+    """
+    if text.isascii():
+        return "1" if text.encode("ascii").translate(None, _ASCII_GSM7) else "0"
+    return "0" if text[0] in _GSM7 and _NOT_GSM7.search(text) is None else "1"
+
+
+def analyze_batch(texts: Iterable[str]) -> List[Segments]:
+    """
+    Return the Segments of each of `texts`
+    """
+    return list(map(analyze, texts))
+
+
+def count_batch_parts(texts: Iterable[str]) -> int:
+    """
+    Return the total number of SMS parts of `texts`
+    """
+    return sum(map(count_parts, texts))
+
+
+def estimate_cost(texts: Iterable[str], part_price: float = 1) -> CostEstimate:
+    """
+    Return the number of messages, messages per encoding, parts and cost of `texts`
+
+    Args:
+        texts: Message texts, consumed once
+        part_price: Price of one SMS part
+    """
+    messages = parts = ucs2 = 0
+    for is_ucs2, _, message_parts in map(_measure, texts):
+        messages += 1
+        parts += message_parts
+        ucs2 += is_ucs2
+    return CostEstimate(messages, parts, messages - ucs2, ucs2, parts * part_price)
@@ -0,0 +1,5 @@
+"""
+message templates for eskiz
+"""
+from .compiled import CompiledTemplate, PLACEHOLDER # noqa
+from .registry import TemplateRegistry, AsyncTemplateRegistry # noqa
@@ -0,0 +1,260 @@
+"""
+the compiled message template
+"""
+import re
+from functools import partial
+from itertools import count, repeat
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from eskiz.exception import TemplateMismatch
+
+
+# A placeholder such as {name}
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+# Marks an exhausted iterable in _zip_equal
+_MISSING = object()
+
+
+def _zip_equal(*iterables: Iterable[Any], names: Sequence[str]) -> Iterator[Tuple[Any, ...]]:
+    """
+    Zip iterables that must have the same length
+
+    The rows are zipped in C; only the end of the first iterable is
+    observed, and the others are then checked for leftovers, except those
+    whose name is None, which never run out.
+
+    Raises:
+        ValueError: Once the iterables turn out to differ in length
+    """
+    exhausted = []
+
+    def first():
+        yield from iterables[0]
+        exhausted.append(True)
+
+    others = [iter(iterable) for iterable in iterables[1:]]
+    yield from zip(first(), *others)
+    if not exhausted:
+        raise ValueError(f"the lengths of {', '.join(name for name in names if name)} differ")
+    for name, iterator in zip(names[1:], others):
+        if name is not None and next(iterator, _MISSING) is not _MISSING:
+            raise ValueError(f"the lengths of {names[0]} and {name} differ")
+
+
+class CompiledTemplate:
+    """
+    A message template compiled once into a renderer and a matcher
+
+    Placeholders are written as `{name}` and may repeat. Rendering uses a
+    single %-format string, so a batch is rendered with one C-level
+    format call per message; `format` renders one message with an
+    equivalent str.format string, without validation. A value is valid if
+    it is neither empty nor None and has no line break; a text rendered
+    from valid values always matches the template, so `validate` checks
+    the values instead of running the matcher on every text.
+    """
+    def __init__(self, text: str, template_id: int = 0):
+        """
+        Args:
+            text: Template text, as TemplateItem.template
+            template_id: ID of the approved template
+        """
+        self.id = template_id
+        self.text = text
+        parts = PLACEHOLDER.split(text)
+        self.literals: Tuple[str, ...] = tuple(parts[0::2])
+        # Field of each placeholder, in order, with repeats
+        self.fields: Tuple[str, ...] = tuple(parts[1::2])
+        # Distinct fields, in order of first use
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(self.fields))
+        self._format = "%s".join(literal.replace("%", "%%") for literal in self.literals)
+        self._newlines = sum(literal.count("\n") for literal in self.literals)
+        if any(field.isdigit() for field in self.fields):
+            # str.format would read {0} as a positional argument
+            self.format: Callable[..., str] = lambda **values: self._format % self._row(values)
+        else:
+            self.format = "".join(
+                literal.replace("{", "{{").replace("}", "}}") + (f"{{{field}}}" if field else "")
+                for literal, field in zip(self.literals, self.fields + ("",))
+            ).format
+        # Row of values of a mapping, with one C-level call
+        if len(self.fields) > 1:
+            self._row = itemgetter(*self.fields)
+        elif self.fields:
+            self._row = lambda values, field=self.fields[0]: (values[field],)
+        else:
+            self._row = lambda values: ()
+        self._pattern = re.compile("([^\n]+)".join(re.escape(literal) for literal in self.literals))
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.text!r}, template_id={self.id})"
+
+    def _invalid(self, row: Tuple[Any, ...], text: str) -> Optional[str]:
+        """
+        Return why the values of `row` are not valid, or None
+        """
+        if "" in row or None in row or text.count("\n") != self._newlines:
+            for field, value in zip(self.fields, row):
+                if value is None or value == "" or "\n" in str(value):
+                    return f"invalid value {value!r} for {{{field}}}"
+        return None
+
+    def render(self, validate: bool = True, **values: Any) -> str:
+        """
+        Render the template with the given placeholder values
+
+        `format(**values)` renders a message as fast as str.format, without
+        validation; `render_batch` renders many messages faster still.
+
+        Raises:
+            TemplateMismatch: If a value is missing or invalid
+        """
+        try:
+            row = self._row(values)
+        except KeyError as exc:
+            raise TemplateMismatch(self.id, f"missing value for {{{exc.args[0]}}}") from None
+        text = self._format % row
+        if validate:
+            reason = self._invalid(row, text)
+            if reason is not None:
+                raise TemplateMismatch(self.id, reason)
+        return text
+
+    def _rows(self, columns: Mapping[str, Iterable[Any]],
+              zip_columns: Optional[Callable[..., Iterator[Tuple[Any, ...]]]] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Zip the columns of the placeholders into one tuple per message
+
+        Args:
+            columns: One iterable of values per placeholder name
+            zip_columns: Function zipping the columns, which checks their
+                lengths by default
+        """
+        missing = [name for name in self.names if name not in columns]
+        if missing:
+            raise TemplateMismatch(self.id, f"missing column for {{{missing[0]}}}")
+        if not self.fields:
+            return repeat(())
+        if zip_columns is None:
+            zip_columns = partial(_zip_equal, names=[f"column {{{name}}}" for name in self.names])
+        if len(self.names) == len(self.fields):
+            return zip_columns(*(columns[field] for field in self.fields))
+
+        # Repeated placeholders: zip each column once, then spread the values
+        positions = [self.names.index(field) for field in self.fields]
+        return (
+            tuple(values[position] for position in positions)
+            for values in zip_columns(*(columns[name] for name in self.names))
+        )
+
+    def iter_render(self, columns: Mapping[str, Iterable[Any]], validate: bool = True) -> Iterator[str]:
+        """
+        Lazily render one text per row of columnar values
+
+        Args:
+            columns: One iterable of values per placeholder name, all of the same length
+            validate: Raise TemplateMismatch on the first invalid value
+
+        A template without placeholders yields its text indefinitely.
+
+        Raises:
+            ValueError: Once the columns turn out to differ in length
+        """
+        rows = self._rows(columns)
+        if not validate:
+            yield from map(self._format.__mod__, rows)
+            return
+
+        for row in rows:
+            text = self._format % row
+            reason = self._invalid(row, text)
+            if reason is not None:
+                raise TemplateMismatch(self.id, reason)
+            yield text
+
+    def _check_column(self, name: str, values: Sequence[Any]) -> None:
+        """
+        Validate a whole column with a few C-level scans
+
+        Raises:
+            TemplateMismatch: If a value is invalid
+        """
+        try:
+            joined = "".join(values)
+        except TypeError:
+            joined = "".join(map(str, values))
+        if "" in values or None in values or "\n" in joined:
+            for value in values:
+                if value is None or value == "" or "\n" in str(value):
+                    raise TemplateMismatch(self.id, f"invalid value {value!r} for {{{name}}}")
+
+    def render_batch(self, columns: Mapping[str, Iterable[Any]], validate: bool = True) -> List[str]:
+        """
+        Render one text per row of columnar values
+
+        Each column is validated as a whole before rendering, instead of
+        each message as it is rendered.
+
+        Raises:
+            TemplateMismatch: If a column is missing or a value invalid
+            ValueError: If the columns differ in length
+        """
+        if not self.fields:
+            raise ValueError("a template without placeholders has no rows to render")
+
+        columns = {
+            name: values if isinstance(values, (list, tuple)) else list(values)
+            for name, values in columns.items() if name in self.names
+        }
+        rows = self._rows(columns, zip)
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("the columns have different lengths")
+        if validate:
+            for name in self.names:
+                self._check_column(name, columns[name])
+        return list(map(self._format.__mod__, rows))
+
+    def iter_messages(
+        self,
+        to: Iterable[int],
+        columns: Optional[Mapping[str, Iterable[Any]]] = None,
+        user_sms_ids: Optional[Iterable[str]] = None,
+        validate: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily build batch message dicts for `send_bulk`
+
+        Args:
+            to: Recipient phone numbers
+            columns: One iterable of values per placeholder name, aligned with `to`
+            user_sms_ids: Optional message IDs aligned with `to` (defaults to "1", "2", ...)
+            validate: Raise TemplateMismatch on the first invalid value
+
+        Raises:
+            ValueError: Once `to`, `user_sms_ids` and the columns turn out to differ in length
+        """
+        ids = user_sms_ids if user_sms_ids is not None else map(str, count(1))
+        texts = self.iter_render(columns or {}, validate)
+        # The default IDs, and the texts of a template without placeholders, never run out
+        names = ("to", "user_sms_ids" if user_sms_ids is not None else None, "columns" if self.fields else None)
+        for phone, user_sms_id, text in _zip_equal(to, ids, texts, names=names):
+            yield {"user_sms_id": user_sms_id, "to": phone, "text": text}
+
+    def matches(self, text: str) -> bool:
+        """
+        Return whether `text` could have been rendered from the template
+        """
+        return self._pattern.fullmatch(text) is not None
+
+    def check(self, text: str) -> str:
+        """
+        Return `text` if it matches the template
+
+        Raises:
+            TemplateMismatch: If it does not
+        """
+        if self._pattern.fullmatch(text) is None:
+            raise TemplateMismatch(self.id, "text differs from the approved template")
+        return text
@@ -0,0 +1,173 @@
+"""
+the registries of approved templates
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eskiz.exception import TemplateMismatch
+from eskiz.response import TemplatesResponse
+
+from .compiled import CompiledTemplate
+
+
+DEFAULT_MAX_AGE = 300
+
+
+class BaseTemplateRegistry:
+    """
+    Holds the compiled approved templates of an account
+
+    Templates are fetched with the client's `get_templates` at most every
+    `max_age` seconds, and each template text is compiled only once for
+    the lifetime of the registry.
+    """
+    def __init__(self, client, max_age: float = DEFAULT_MAX_AGE, statuses: Optional[Iterable[str]] = None):
+        """
+        Args:
+            client: ClientSync or AsyncClient used to fetch the templates
+            max_age: Seconds after which the templates are fetched again
+            statuses: Template statuses treated as approved, or None for all
+        """
+        self.client = client
+        self.max_age = max_age
+        self.statuses = frozenset(statuses) if statuses is not None else None
+        self._templates: Dict[int, CompiledTemplate] = {}
+        self._compiled: Dict[Tuple[int, str], CompiledTemplate] = {}
+        self._fetched_at: Optional[float] = None
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the templates should be fetched before the next lookup
+        """
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.max_age
+
+    def _load(self, response: TemplatesResponse) -> None:
+        """
+        Compile the approved templates of `response` that are not compiled yet
+        """
+        templates = {}
+        for item in response.result:
+            if self.statuses is not None and item.status not in self.statuses:
+                continue
+            key = (item.id, item.template)
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                compiled = self._compiled[key] = CompiledTemplate(item.template, item.id)
+            templates[item.id] = compiled
+        self._templates = templates
+        self._fetched_at = time.monotonic()
+
+    def _get(self, template_id: int) -> CompiledTemplate:
+        try:
+            return self._templates[template_id]
+        except KeyError:
+            raise TemplateMismatch(template_id, "no approved template with this ID") from None
+
+    def _match(self, text: str) -> CompiledTemplate:
+        for template in self._templates.values():
+            if template.matches(text):
+                return template
+        raise TemplateMismatch(0, "no approved template matches the text")
+
+
+class TemplateRegistry(BaseTemplateRegistry):
+    """
+    Template registry of the sync client
+    """
+    def __init__(self, client, max_age: float = DEFAULT_MAX_AGE, statuses: Optional[Iterable[str]] = None):
+        super().__init__(client, max_age, statuses)
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Fetch and compile the approved templates
+        """
+        with self._lock:
+            self._load(self.client.get_templates())
+
+    def _ensure_fresh(self) -> None:
+        if self.stale:
+            with self._lock:
+                if self.stale:
+                    self._load(self.client.get_templates())
+
+    def templates(self) -> List[CompiledTemplate]:
+        """
+        Return the approved templates
+        """
+        self._ensure_fresh()
+        return list(self._templates.values())
+
+    def get(self, template_id: int) -> CompiledTemplate:
+        """
+        Return the approved template with ID `template_id`
+
+        Raises:
+            TemplateMismatch: If there is no such approved template
+        """
+        self._ensure_fresh()
+        return self._get(template_id)
+
+    def match(self, text: str) -> CompiledTemplate:
+        """
+        Return the approved template `text` was rendered from
+
+        Raises:
+            TemplateMismatch: If the text matches no approved template
+        """
+        self._ensure_fresh()
+        return self._match(text)
+
+
+class AsyncTemplateRegistry(BaseTemplateRegistry):
+    """
+    Template registry of the async client
+    """
+    def __init__(self, client, max_age: float = DEFAULT_MAX_AGE, statuses: Optional[Iterable[str]] = None):
+        super().__init__(client, max_age, statuses)
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def refresh(self) -> None:
+        """
+        Fetch and compile the approved templates
+        """
+        self._load(await self.client.get_templates())
+
+    async def _ensure_fresh(self) -> None:
+        if not self.stale:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.stale:
+                await self.refresh()
+
+    async def templates(self) -> List[CompiledTemplate]:
+        """
+        Return the approved templates
+        """
+        await self._ensure_fresh()
+        return list(self._templates.values())
+
+    async def get(self, template_id: int) -> CompiledTemplate:
+        """
+        Return the approved template with ID `template_id`
+
+        Raises:
+            TemplateMismatch: If there is no such approved template
+        """
+        await self._ensure_fresh()
+        return self._get(template_id)
+
+    async def match(self, text: str) -> CompiledTemplate:
+        """
+        Return the approved template `text` was rendered from
+
+        Raises:
+            TemplateMismatch: If the text matches no approved template
+        """
+        await self._ensure_fresh()
+        return self._match(text)
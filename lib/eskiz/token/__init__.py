@@ -0,0 +1,5 @@
+"""
+token helpers of eskiz
+"""
+from .jwt import decode_claims, decode_expiry # noqa
+from .store import TokenStore, InMemoryTokenStore, FileTokenStore, token_key # noqa
@@ -0,0 +1,51 @@
+"""
+reading claims from the Eskiz JWT
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional
+
+
+def _decode_segment(segment: str) -> Optional[Dict[str, Any]]:
+    try:
+        padded = segment + "=" * (-len(segment) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def decode_claims(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode the payload of a JWT without verifying its signature
+
+    The signature cannot be verified client-side; the claims are only used
+    to schedule token renewal. A bare base64 payload is accepted as well.
+
+    Returns:
+        dict: The claims, or None if the token is not a decodable JWT
+    """
+    if not token:
+        return None
+
+    segments = token.split(".")
+    if len(segments) == 3:
+        return _decode_segment(segments[1])
+    if len(segments) == 1:
+        return _decode_segment(segments[0])
+    return None
+
+
+def decode_expiry(token: str) -> Optional[float]:
+    """
+    Return the `exp` claim of a JWT as a UNIX timestamp, or None if unknown
+    """
+    claims = decode_claims(token)
+    if not claims:
+        return None
+
+    try:
+        return float(claims["exp"])
+    except (KeyError, TypeError, ValueError):
+        return None
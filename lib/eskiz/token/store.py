@@ -0,0 +1,261 @@
+"""
+token stores shared by clients, processes and restarts
+"""
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows
+    fcntl = None
+
+# Seconds between attempts to take the lock file of a FileTokenStore from an event loop
+LOCK_POLL_INTERVAL = 0.05
+
+# Holder of the async_lock of a FileTokenStore taken by the current task,
+# carried to executor threads that the task runs store calls in
+_async_holder = contextvars.ContextVar("eskiz_token_store_holder", default=None)
+
+
+def token_key(email: str, network: str) -> str:
+    """
+    Return the store key of the token of `email` on `network`
+    """
+    return f"{network}#{email}"
+
+
+class TokenStore:
+    """
+    Base class of the token stores
+
+    Subclasses implement `get`, `set` and `delete`. `lock` must return a
+    context manager that serializes logins for a key, so that clients sharing
+    the store log in once; the default lock only covers the current process.
+    `async_lock` is its counterpart for async clients and must not block the
+    event loop. External stores (Redis, a database, ...) can override both
+    with a distributed lock.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loop_locks_guard = threading.Lock()
+        self._loop_locks = weakref.WeakKeyDictionary()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the stored token for `key`, or None
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, token: str) -> None:
+        """
+        Store `token` for `key`
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the token stored for `key`, if any
+        """
+        raise NotImplementedError
+
+    def lock(self, key: str):
+        """
+        Return a context manager held while logging in for `key`
+        """
+        return self._lock
+
+    @asynccontextmanager
+    async def async_lock(self, key: str) -> AsyncIterator[None]:
+        """
+        Async context manager held by async clients while logging in for `key`
+
+        The default lock serializes the async clients of the running event
+        loop; it does not hold `lock`, whose threads would all get in at once.
+        """
+        async with self._loop_lock(key):
+            yield
+
+    def _loop_lock(self, key: str) -> asyncio.Lock:
+        """
+        Return the asyncio lock of `key` on the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._loop_locks_guard:
+            locks = self._loop_locks.get(loop)
+            if locks is None:
+                locks = self._loop_locks[loop] = {}
+            lock = locks.get(key)
+            if lock is None:
+                lock = locks[key] = asyncio.Lock()
+            return lock
+
+
+class InMemoryTokenStore(TokenStore):
+    """
+    Token store shared by the clients of one process
+    """
+    def __init__(self):
+        super().__init__()
+        self._tokens: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._tokens.get(key)
+
+    def set(self, key: str, token: str) -> None:
+        with self._lock:
+            self._tokens[key] = token
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._tokens.pop(key, None)
+
+
+class FileTokenStore(TokenStore):
+    """
+    Token store persisted to a JSON file, shared by processes on one host
+
+    Writes replace the file atomically, and every access holds an exclusive
+    `flock` on `<path>.lock`, which is also the lock held while logging in.
+    Within the process the lock is owned by one thread, or by the task
+    holding `async_lock` and the executor calls made in its context.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the JSON file, created on first write
+        """
+        if fcntl is None:
+            raise RuntimeError("FileTokenStore requires fcntl, which is not available on this platform")
+        super().__init__()
+        self.path = path
+        self._lock_fd = None
+        self._guard = threading.Condition()
+        self._owner = None
+        self._depth = 0
+
+    @staticmethod
+    def _current_owner():
+        """
+        Return the owner of the lock taken now: the async_lock holder or the current thread
+        """
+        holder = _async_holder.get()
+        return holder if holder is not None else threading.get_ident()
+
+    @contextmanager
+    def lock(self, key: Optional[str] = None) -> Iterator[None]:
+        # Re-entrant: the lock file is locked once per owner and released
+        # when the outermost holder exits
+        owner = self._current_owner()
+        with self._guard:
+            self._guard.wait_for(lambda: self._owner is None or self._owner == owner)
+            self._owner = owner
+            self._depth += 1
+            first = self._depth == 1
+        try:
+            if first:
+                fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._lock_fd = fd
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def async_lock(self, key: Optional[str] = None) -> AsyncIterator[None]:
+        # The lock is polled without blocking, so the event loop keeps running
+        # while another process, thread or task holds it
+        async with self._loop_lock(key):
+            holder = object()
+            while not self._try_lock(holder):
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+            reset = _async_holder.set(holder)
+            try:
+                yield
+            finally:
+                _async_holder.reset(reset)
+                self._release()
+
+    def _try_lock(self, owner: object) -> bool:
+        """
+        Take the lock for `owner` if no other process, thread or task holds it
+        """
+        with self._guard:
+            if self._owner is not None:
+                return False
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            self._owner = owner
+            self._depth = 1
+            return True
+
+    def _release(self) -> None:
+        """
+        Release one level of the lock, and the lock file with the last one
+        """
+        with self._guard:
+            self._depth -= 1
+            if self._depth == 0:
+                if self._lock_fd is not None:
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+                self._owner = None
+                self._guard.notify_all()
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # A corrupt file is treated as empty and replaced on the next write
+            return {}
+
+    def _write(self, tokens: Dict[str, str]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".eskiz-token-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(tokens, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock():
+            return self._read().get(key)
+
+    def set(self, key: str, token: str) -> None:
+        with self.lock():
+            tokens = self._read()
+            if tokens.get(key) != token:
+                tokens[key] = token
+                self._write(tokens)
+
+    def delete(self, key: str) -> None:
+        with self.lock():
+            tokens = self._read()
+            if tokens.pop(key, None) is not None:
+                self._write(tokens)
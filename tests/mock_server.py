@@ -1,41 +1,300 @@
 """
 Mock server for testing the Eskiz.uz API client
 """
+import csv
+import io
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+
+
+# Generated messages are created 20 seconds apart from this time
+MESSAGES_START = datetime(2023, 1, 1)
+
+
+def message_created_at(message_id):
+    """
+    Return the creation time of the generated message `message_id`
+    """
+    return (MESSAGES_START + timedelta(seconds=20 * (message_id - 1))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_export_csv(rows):
+    """
+    Build the export CSV with `rows` messages, as sent by the export endpoint
+
+    Messages contain Cyrillic text, commas, quotes and newlines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "to", "message", "status"])
+    for message_id in range(1, rows + 1):
+        writer.writerow([
+            message_id, 998900000000 + message_id, f'Привет, "клиент" {message_id}\nline two', "delivered"
+        ])
+    return ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+
+def make_message_result(message_id):
+    """
+    Build a get-user-messages result for `message_id`
+    """
+    created_at = message_created_at(message_id)
+    return {
+        "id": message_id,
+        "user_id": 1,
+        "country_id": None,
+        "connection_id": 1,
+        "smsc_id": 1,
+        "dispatch_id": None,
+        "user_sms_id": f"msg{message_id}",
+        "request_id": f"request{message_id}",
+        "price": 10,
+        "total_price": 10,
+        "is_ad": False,
+        "nick": "4546",
+        "to": str(998900000000 + message_id),
+        "message": f"Test message {message_id}",
+        "encoding": 0,
+        "parts_count": 1,
+        "parts": {},
+        "status": "delivered",
+        "smsc_data": {},
+        "template_tag": None,
+        "sent_at": created_at,
+        "submit_sm_resp_at": created_at,
+        "delivery_sm_at": created_at,
+        "created_at": created_at,
+        "updated_at": created_at
+    }
 
 
 class MockHandler(BaseHTTPRequestHandler):
     """
     Mock HTTP handler for Eskiz.uz API
     """
-    def _set_headers(self, content_type="application/json", status_code=200):
+    protocol_version = "HTTP/1.1"
+
+    # Buffer writes so headers and body leave in a single segment
+    wbufsize = -1
+
+    # Close connection after each request unless keep-alive is enabled
+    keep_alive = False
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence per-request logging"""
+
+    def _set_headers(self, content_type="application/json", status_code=200, content_length=None):
         self.send_response(status_code)
         self.send_header("Content-type", content_type)
-        self.send_header("Connection", "close")  # Close connection after each request
+        if content_length is not None:
+            self.send_header("Content-Length", str(content_length))
+        if not self.keep_alive:
+            self.send_header("Connection", "close")
         self.end_headers()
 
+    def _record_hit(self):
+        """
+        Count the request on the server
+        """
+        hits = getattr(self.server, "hits", None)
+        if hits is not None:
+            with self.server.hits_lock:
+                hits[f"{self.command} {self.path.split('?')[0]}"] += 1
+
+    def _send_fault(self):
+        """
+        Send the next fault queued on the server, if any
+
+        Faults are `(status_code, headers)` tuples; a status code of None
+        drops the connection without a response.
+        """
+        faults = getattr(self.server, "faults", None)
+        if not faults:
+            return False
+
+        status_code, headers = faults.pop(0)
+        if status_code is None:
+            self.close_connection = True
+            return True
+
+        body = json.dumps({"error": "Injected fault", "status": status_code}).encode()
+        self.send_response(status_code)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if not self.keep_alive:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    @staticmethod
+    def _form_fields(body):
+        """
+        Parse a JSON, multipart or urlencoded request body into a dict
+        """
+        text = body.decode("utf-8", "replace")
+        if text.startswith("{"):
+            return json.loads(text)
+        fields = dict(re.findall(r'name="([^"]+)"\r\n\r\n(.*?)\r\n', text))
+        return fields or dict(parse_qsl(text))
+
+    def _report(self, body):
+        """
+        Build a report response derived from the request, so merged
+        reports can be checked, counting concurrent report requests
+        """
+        server = self.server
+        with server.hits_lock:
+            server.reports_in_flight += 1
+            server.peak_reports_in_flight = max(server.peak_reports_in_flight, server.reports_in_flight)
+        try:
+            time.sleep(server.report_delay)
+            fields = self._form_fields(body)
+            if self.path.startswith("/api/user/totals"):
+                month = int(fields["month"])
+                return {
+                    "status": "success",
+                    "data": [
+                        {"month": fields["month"], "status": "success", "packets": 1000, "sent_packets": month * 100}
+                    ],
+                }
+            # Scale the totals by the month of a range, or the ID of a dispatch
+            scale = int(fields["start_date"][5:7]) if "start_date" in fields else int(fields["dispatch_id"])
+            return {"data": {
+                "ad_parts": scale, "ad_spent": scale * 50, "parts": scale * 10, "spent": scale * 500,
+                "total_parts": scale * 11, "total_spent": scale * 550,
+            }}
+        finally:
+            with server.hits_lock:
+                server.reports_in_flight -= 1
+
+    def _user_messages_page(self, body):
+        """
+        Build one page of the `server.user_messages` generated messages
+        created within the requested minutes
+        """
+        fields = self._form_fields(body)
+        start = fields.get("start_date", "")
+        end = fields.get("end_date", "9999")
+        matching = [
+            message_id for message_id in range(1, self.server.user_messages + 1)
+            if start <= message_created_at(message_id)[:16] <= end
+        ]
+        total = len(matching)
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        page = int(query.get("page", 1))
+        per_page = int(fields.get("page_size", 20))
+        last_page = max(1, -(-total // per_page))
+        first = (page - 1) * per_page + 1
+        ids = matching[first - 1:first - 1 + per_page]
+        path = "/api/message/sms/get-user-messages"
+        return {
+            "data": {
+                "current_page": page,
+                "path": path,
+                "prev_page_url": f"{path}?page={page - 1}" if page > 1 else None,
+                "first_page_url": f"{path}?page=1",
+                "last_page_url": f"{path}?page={last_page}",
+                "next_page_url": f"{path}?page={page + 1}" if page < last_page else None,
+                "per_page": per_page,
+                "last_page": last_page,
+                "from": first,
+                "to": first + len(ids) - 1,
+                "total": total,
+                "result": [make_message_result(message_id) for message_id in ids],
+                "links": []
+            },
+            "status": "success"
+        }
+
+    def _next_status(self, message_id):
+        """
+        Return the next status of `message_id` from `server.statuses`
+
+        Each call moves one step along the message's status list and then
+        stays on the last status; unknown messages are delivered.
+        """
+        with self.server.hits_lock:
+            statuses = self.server.statuses.get(str(message_id))
+            if not statuses:
+                return "delivered"
+            return statuses.pop(0) if len(statuses) > 1 else statuses[0]
+
+    def _dispatch_page(self, body):
+        """
+        Build the get-user-messages-by-dispatch page of a dispatch in `server.dispatches`
+        """
+        dispatch_id = self._form_fields(body).get("dispatch_id")
+        results = []
+        for message_id in self.server.dispatches[dispatch_id]:
+            result = make_message_result(message_id)
+            result.update(dispatch_id=dispatch_id, status=self._next_status(message_id))
+            results.append(result)
+        path = "/api/message/sms/get-user-messages-by-dispatch"
+        return {
+            "data": {
+                "current_page": 1,
+                "path": path,
+                "prev_page_url": None,
+                "first_page_url": f"{path}?page=1",
+                "last_page_url": f"{path}?page=1",
+                "next_page_url": None,
+                "per_page": max(1, len(results)),
+                "last_page": 1,
+                "from": 1,
+                "to": len(results),
+                "total": len(results),
+                "result": results,
+                "links": []
+            },
+            "status": "success"
+        }
+
+    def _send_json(self, response, status_code=200):
+        body = json.dumps(response).encode()
+        self._set_headers(content_type=self.server.json_content_type, status_code=status_code,
+                          content_length=len(body))
+        self.wfile.write(body)
+
     def do_GET(self):
         """Handle GET requests"""
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(content_length)
+
+        self._record_hit()
+        if self._send_fault():
+            return
+
         # Check for expired token
         auth_header = self.headers.get("Authorization", "")
         if auth_header.startswith("Bearer expired_token"):
-            self._set_headers(status_code=401)
             response = {"error": "Token expired", "status": 401}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response, status_code=401)
             return
 
         if self.path.startswith("/api/user/get-limit"):
-            self._set_headers()
+            with self.server.hits_lock:
+                failed = self.server.limit_errors > 0
+                self.server.limit_errors -= failed
+            if failed:
+                self._send_json({"status": "error", "data": {}})
+                return
             response = {
                 "status": "success",
                 "data": {
                     "balance": 1000
                 }
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         elif self.path.startswith("/api/message/sms/status_by_id/"):
-            self._set_headers()
             message_id = self.path.split("/")[-1]
             response = {
                 "status": "success",
@@ -57,7 +316,7 @@ class MockHandler(BaseHTTPRequestHandler):
                     "encoding": 0,
                     "parts_count": 1,
                     "parts": {},
-                    "status": "delivered",
+                    "status": self._next_status(message_id),
                     "smsc_data": {},
                     "template_tag": None,
                     "sent_at": "2023-01-01 12:00:00",
@@ -67,9 +326,8 @@ class MockHandler(BaseHTTPRequestHandler):
                     "updated_at": "2023-01-01 12:00:02"
                 }
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         elif self.path.startswith("/api/user/templates"):
-            self._set_headers()
             response = {
                 "success": True,
                 "result": [
@@ -87,9 +345,28 @@ class MockHandler(BaseHTTPRequestHandler):
                     }
                 ]
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
+        elif self.path.startswith("/api/message/sms/get-dispatch-status"):
+            response = {
+                "status": "success",
+                "data": [
+                    {"status": "delivered", "total": 2},
+                    {"status": "waiting", "total": 1}
+                ],
+                "id": None
+            }
+            self._send_json(response)
+        elif self.path.startswith("/api/message/export"):
+            body = make_export_csv(self.server.export_rows)
+            self._set_headers(content_type="text/csv; charset=utf-8", content_length=len(body))
+            self.wfile.write(body)
+        elif (urlsplit(self.path).path == "/api/message/sms/get-user-messages-by-dispatch"
+              and self._form_fields(body).get("dispatch_id") in self.server.dispatches):
+            self._send_json(self._dispatch_page(body))
+        elif (urlsplit(self.path).path == "/api/message/sms/get-user-messages"
+              and getattr(self.server, "user_messages", None) is not None):
+            self._send_json(self._user_messages_page(body))
         elif self.path.startswith("/api/message/sms/get-user-messages"):
-            self._set_headers()
             response = {
                 "data": {
                     "current_page": 1,
@@ -163,28 +440,29 @@ class MockHandler(BaseHTTPRequestHandler):
                 },
                 "status": "success"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         else:
-            self._set_headers()
             response = {"error": "Not implemented"}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
 
     def do_POST(self):
         """Handle POST requests"""
         content_length = int(self.headers.get("Content-Length", 0))
-        # Read but don't use post_data - just to clear the buffer
-        self.rfile.read(content_length)
+        body = self.rfile.read(content_length)
+
+        self._record_hit()
+        if self._send_fault():
+            return
+        self.server.last_form = self._form_fields(body)
 
         # Check for expired token
         auth_header = self.headers.get("Authorization", "")
         if auth_header.startswith("Bearer expired_token"):
-            self._set_headers(status_code=401)
             response = {"error": "Token expired", "status": 401}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response, status_code=401)
             return
 
         if self.path.startswith("/api/auth/login"):
-            self._set_headers()
             response = {
                 "message": "token created",
                 "data": {
@@ -192,42 +470,50 @@ class MockHandler(BaseHTTPRequestHandler):
                 },
                 "token_type": "bearer"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         elif self.path.startswith("/api/message/sms/send"):
-            self._set_headers()
+            with self.server.hits_lock:
+                delay = self.server.send_delays.pop(0) if self.server.send_delays else 0
+                self.server.idempotency_keys.append(self.headers.get("Idempotency-Key"))
+            time.sleep(delay)
             response = {
                 "id": "mock-message-id-12345",
                 "status": "waiting",
                 "message": "SMS sent"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         elif self.path.startswith("/api/message/sms/send-batch"):
-            self._set_headers()
             response = {
                 "id": "mock-batch-id-12345",
                 "status": ["waiting", "waiting"],
                 "message": "Waiting for SMS provider"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         elif self.path.startswith("/api/message/sms/send-global"):
-            self._set_headers()
             # Just return 200 OK
             response = {}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
+        elif self.path.startswith(("/api/report/total-by-range", "/api/report/total-by-dispatch", "/api/user/totals")):
+            self._send_json(self._report(body))
         else:
-            self._set_headers()
             response = {"error": "Not implemented"}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
 
     def do_PATCH(self):
         """Handle PATCH requests"""
+        content_length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(content_length)
+
+        self._record_hit()
+        if self._send_fault():
+            return
+
         # Check for expired token
         auth_header = self.headers.get("Authorization", "")
         # Special case: allow token refresh even with expired token
         is_expired = auth_header.startswith("Bearer expired_token")
         is_refresh = self.path.startswith("/api/auth/refresh")
         if is_expired and is_refresh:
-            self._set_headers()
             response = {
                 "message": "token refreshed",
                 "data": {
@@ -235,18 +521,16 @@ class MockHandler(BaseHTTPRequestHandler):
                 },
                 "token_type": "bearer"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
             return
 
         # Handle expired token for other requests
         if auth_header.startswith("Bearer expired_token"):
-            self._set_headers(status_code=401)
             response = {"error": "Token expired", "status": 401}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response, status_code=401)
             return
 
         if self.path.startswith("/api/auth/refresh"):
-            self._set_headers()
             response = {
                 "message": "token refreshed",
                 "data": {
@@ -254,19 +538,85 @@ class MockHandler(BaseHTTPRequestHandler):
                 },
                 "token_type": "bearer"
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
         else:
-            self._set_headers()
             response = {"error": "Not implemented"}
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(response)
+
+
+def make_mock_server(port=8000, keep_alive=False, handler=MockHandler):
+    """
+    Create the mock server without starting it
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        keep_alive: Keep connections open between requests
+        handler: Request handler class
+    """
+    if keep_alive != handler.keep_alive:
+        handler = type(handler.__name__, (handler,), {"keep_alive": keep_alive})
+    httpd = ThreadingHTTPServer(("", port), handler)
+    httpd.daemon_threads = True
+    # Faults injected by tests, see MockHandler._send_fault
+    httpd.faults = []
+    # Number of next get-limit requests answered with an error status
+    httpd.limit_errors = 0
+    # Content type of the JSON responses
+    httpd.json_content_type = "application/json"
+    # Request counts keyed by "METHOD /path"
+    httpd.hits = Counter()
+    httpd.hits_lock = threading.Lock()
+    # Number of generated get-user-messages results; None serves the fixed two
+    httpd.user_messages = None
+    # Number of rows of the export CSV
+    httpd.export_rows = 3
+    # Status lists by message ID, see MockHandler._next_status
+    httpd.statuses = {}
+    # Generated message IDs by dispatch ID for get-user-messages-by-dispatch
+    httpd.dispatches = {}
+    # Form fields of the last POST request
+    httpd.last_form = None
+    # Seconds each report request takes, and its concurrency
+    httpd.report_delay = 0
+    httpd.reports_in_flight = 0
+    httpd.peak_reports_in_flight = 0
+    # Seconds the next send requests take, and the Idempotency-Key header of each send
+    httpd.send_delays = []
+    httpd.idempotency_keys = []
+    return httpd
+
+
+class MockServerMixin:
+    """
+    Test case mixin starting one mock server per test class
+    """
+    keep_alive = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Start the mock server on a free port
+        """
+        super().setUpClass()
+        cls.httpd = make_mock_server(0, keep_alive=cls.keep_alive)
+        cls.network = f"http://localhost:{cls.httpd.server_address[1]}"
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stop the mock server
+        """
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        super().tearDownClass()
 
 
-def run_mock_server(port=8000):
+def run_mock_server(port=8000, keep_alive=False):
     """
     Run the mock server
     """
-    server_address = ("", port)
-    httpd = HTTPServer(server_address, MockHandler)
+    httpd = make_mock_server(port, keep_alive=keep_alive)
     print(f"Starting mock server on port {port}...")
     httpd.serve_forever()
 
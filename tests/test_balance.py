@@ -0,0 +1,272 @@
+"""
+Tests for the balance accountant
+"""
+import os
+import sys
+import threading
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.balance import BalanceAccountant  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.exception import InsufficientBalance  # noqa: E402
+
+
+class TestBalanceAccountant(unittest.TestCase):
+    """
+    Test cases for the local balance bookkeeping
+    """
+    def setUp(self):
+        """
+        Start from a synced balance of 100
+        """
+        self.accountant = BalanceAccountant(part_price=2)
+        self.accountant.update(100)
+
+    def test_charge_settles(self):
+        """
+        Test a completed send is deducted from the available balance
+        """
+        with self.accountant.charge(3):
+            self.assertEqual(self.accountant.snapshot()["in_flight"], 6)
+        self.assertEqual(self.accountant.available, 94)
+        self.assertEqual(self.accountant.snapshot()["spent"], 6)
+
+    def test_charge_refunds_on_error(self):
+        """
+        Test a failed send gives its charge back
+        """
+        with self.assertRaises(RuntimeError):
+            with self.accountant.charge(3):
+                raise RuntimeError("send failed")
+        self.assertEqual(self.accountant.available, 100)
+
+    def test_insufficient_balance(self):
+        """
+        Test a send larger than the available balance is rejected
+        """
+        self.assertFalse(self.accountant.check(51))
+        with self.assertRaises(InsufficientBalance) as context:
+            with self.accountant.charge(51):
+                self.fail("charge should not be granted")
+        self.assertEqual(context.exception.required, 102)
+        self.assertEqual(self.accountant.available, 100)
+
+    def test_reservation(self):
+        """
+        Test a reservation is drawn from first and returns its rest on release
+        """
+        with self.accountant.reserve(10) as reservation:
+            self.assertEqual(self.accountant.available, 80)
+            with self.assertRaises(InsufficientBalance):
+                self.accountant.reserve(41)
+
+            with reservation.charge(4):
+                pass
+            self.assertEqual(reservation.remaining, 12)
+            self.assertEqual(self.accountant.available, 80)
+
+            # Parts beyond the reservation come from the free balance
+            with reservation.charge(8):
+                pass
+            self.assertEqual(reservation.remaining, 0)
+            self.assertEqual(self.accountant.available, 76)
+
+        self.assertEqual(self.accountant.available, 76)
+
+    def test_reservation_refund(self):
+        """
+        Test a failed send returns its charge to the reservation
+        """
+        reservation = self.accountant.reserve(10)
+        with self.assertRaises(RuntimeError):
+            with reservation.charge(4):
+                raise RuntimeError("send failed")
+        self.assertEqual(reservation.remaining, 20)
+        self.assertEqual(reservation.release(), 20)
+        self.assertEqual(self.accountant.available, 100)
+
+    def test_update_keeps_in_flight_charges(self):
+        """
+        Test a send is held until it completes but not counted twice once a resync includes it
+        """
+        with self.accountant.charge(5):
+            self.accountant.update(90)
+            self.assertEqual(self.accountant.available, 80)
+            with self.accountant.charge(1):
+                pass
+        self.assertEqual(self.accountant.available, 88)
+        self.assertEqual(self.accountant.snapshot()["spent"], 2)
+
+        with self.assertRaises(RuntimeError):
+            with self.accountant.charge(5):
+                self.accountant.update(88)
+                raise RuntimeError("send failed")
+        self.assertEqual(self.accountant.available, 88)
+
+    def test_resync_after_parts(self):
+        """
+        Test the balance is due for a resync after `resync_parts` parts
+        """
+        accountant = BalanceAccountant(resync_parts=10)
+        self.assertTrue(accountant.claim_sync())
+        accountant.update(100)
+        self.assertFalse(accountant.needs_sync)
+
+        with accountant.charge(10):
+            pass
+        self.assertTrue(accountant.claim_sync())
+        self.assertFalse(accountant.claim_sync())
+        accountant.update(90)
+        self.assertEqual(accountant.last_drift, 0)
+
+    def test_thread_safety(self):
+        """
+        Test concurrent charges never overdraw the balance
+        """
+        accountant = BalanceAccountant()
+        accountant.update(1000)
+        granted = []
+
+        def send():
+            for _ in range(200):
+                try:
+                    with accountant.charge(1):
+                        granted.append(1)
+                except InsufficientBalance:
+                    pass
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(granted), 1000)
+        self.assertEqual(accountant.available, 0)
+
+
+class TestClientBalance(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients charge sends to the accountant against the mock server
+    """
+    def setUp(self):
+        """
+        Reset the request counts and faults
+        """
+        self.httpd.hits.clear()
+        self.httpd.faults.clear()
+        self.httpd.limit_errors = 0
+
+    def test_sync(self):
+        """
+        Test the sync client fetches the balance once and charges each send
+        """
+        accountant = BalanceAccountant()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            client.send_sms(998901234567, "a" * 200)
+            client.send_batch_sms([
+                {"user_sms_id": str(index), "to": 998901234567, "text": "Салом"} for index in range(3)
+            ])
+            self.httpd.faults.append((500, None))
+            with self.assertRaises(Exception):
+                client.send_sms(998901234567, "Test message")
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 1)
+        self.assertEqual(accountant.available, 995)
+
+    def test_sync_failed_resync(self):
+        """
+        Test a get-limit error status is not recorded as a balance of 0 and is retried on the next send
+        """
+        accountant = BalanceAccountant()
+        self.httpd.limit_errors = 1
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            client.send_sms(998901234567, "Test message")
+            self.assertIsNone(accountant.available)
+            self.assertTrue(accountant.needs_sync)
+            client.send_sms(998901234567, "Test message")
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 2)
+        self.assertEqual(self.httpd.hits["POST /api/message/sms/send"], 2)
+        self.assertEqual(accountant.available, 999)
+
+    def test_sync_insufficient_balance(self):
+        """
+        Test a send beyond the balance is rejected without a request
+        """
+        accountant = BalanceAccountant(part_price=600)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            with self.assertRaises(InsufficientBalance):
+                client.send_sms(998901234567, "a" * 200)
+
+        self.assertEqual(self.httpd.hits["POST /api/message/sms/send"], 0)
+
+    def test_sync_bulk_reservation(self):
+        """
+        Test a bulk send draws from its reservation
+        """
+        accountant = BalanceAccountant()
+        messages = [{"user_sms_id": str(index), "to": 998901234567, "text": "Hi"} for index in range(50)]
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            accountant.update(client.get_balance())
+            with accountant.reserve(50) as reservation:
+                list(client.send_bulk(messages, chunk_size=10, reservation=reservation))
+                self.assertEqual(reservation.remaining, 0)
+
+        self.assertEqual(accountant.snapshot()["spent"], 50)
+        self.assertEqual(accountant.available, 950)
+
+    async def test_async(self):
+        """
+        Test the async client fetches the balance once and charges each send
+        """
+        accountant = BalanceAccountant()
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            await client.send_sms(998901234567, "Test message")
+            await client.send_batch_sms([{"user_sms_id": "1", "to": 998901234567, "text": "a" * 161}])
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 1)
+        self.assertEqual(accountant.available, 997)
+
+    async def test_async_failed_resync(self):
+        """
+        Test the async client keeps sending after a get-limit error status
+        """
+        accountant = BalanceAccountant()
+        accountant.update(10)
+        accountant.invalidate()
+        self.httpd.limit_errors = 1
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", balance=accountant,
+        ) as client:
+            await client.send_sms(998901234567, "Test message")
+            self.assertEqual(accountant.available, 9)
+            await client.send_sms(998901234567, "Test message")
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 2)
+        self.assertEqual(accountant.available, 999)
+
+
+if __name__ == "__main__":
+    unittest.main()
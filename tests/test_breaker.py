@@ -0,0 +1,208 @@
+"""
+Tests for the circuit breaker
+"""
+import os
+import sys
+import time
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.breaker import CircuitBreaker  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import CircuitState, Endpoint  # noqa: E402
+from eskiz.exception import CircuitOpen  # noqa: E402
+from eskiz.metrics import MetricsRegistry, PrometheusExporter  # noqa: E402
+
+CLOSED, OPEN, HALF_OPEN = CircuitState.CLOSED, CircuitState.OPEN, CircuitState.HALF_OPEN
+
+
+class StatusError(Exception):
+    """
+    Error carrying an HTTP status, like aiohttp's ClientResponseError
+    """
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+def call(breaker, endpoint="/api/a", error=None, status=None):
+    """
+    Run one guarded attempt that raises `error` or ends with `status`
+    """
+    try:
+        with breaker.guard(endpoint) as attempt:
+            attempt.status = status
+            if error is not None:
+                raise error
+    except type(error) if error is not None else ():
+        pass
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test cases for the circuit states
+    """
+    def test_opens_on_failure_rate(self):
+        """
+        Test the circuit opens once the failure rate of the window reaches the threshold
+        """
+        changes = []
+        breaker = CircuitBreaker(window_size=4, min_calls=4, open_duration=60,
+                                 on_state_change=lambda *change: changes.append(change))
+        call(breaker, status=200)
+        call(breaker, error=ConnectionError())
+        call(breaker, status=200)
+        self.assertEqual(breaker.state("/api/a"), CLOSED)
+        call(breaker, status=503)
+
+        self.assertEqual(breaker.state("/api/a"), OPEN)
+        self.assertEqual(changes, [("/api/a", CLOSED, OPEN)])
+        with self.assertRaises(CircuitOpen) as context:
+            breaker.check("/api/a")
+        self.assertGreater(context.exception.retry_after, 59)
+        with self.assertRaises(CircuitOpen):
+            call(breaker)
+        self.assertEqual(breaker.state("/api/b"), CLOSED)
+
+    def test_statuses_outside_failures(self):
+        """
+        Test client errors show the server is up and count as successes
+        """
+        breaker = CircuitBreaker(window_size=2, min_calls=2)
+        call(breaker, error=StatusError(401))
+        call(breaker, status=400)
+        call(breaker, error=StatusError(429))
+        self.assertEqual(breaker.state("/api/a"), CLOSED)
+
+    def test_half_open(self):
+        """
+        Test trial requests close the circuit on success and reopen it on failure
+        """
+        changes = []
+        breaker = CircuitBreaker(window_size=1, min_calls=1, open_duration=0.02,
+                                 on_state_change=lambda *change: changes.append(change[1:]))
+        call(breaker, status=500)
+        time.sleep(0.03)
+        self.assertEqual(breaker.state("/api/a"), HALF_OPEN)
+
+        with breaker.guard("/api/a") as trial:
+            with self.assertRaises(CircuitOpen) as context:
+                call(breaker)
+            self.assertEqual(context.exception.retry_after, 0.0)
+            trial.status = 503
+        self.assertEqual(breaker.state("/api/a"), OPEN)
+
+        time.sleep(0.03)
+        call(breaker, status=200)
+        self.assertEqual(breaker.state("/api/a"), CLOSED)
+        self.assertEqual(changes, [
+            (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED),
+        ])
+
+    def test_cancelled_trial(self):
+        """
+        Test a cancelled trial frees its slot without an outcome
+        """
+        breaker = CircuitBreaker(window_size=1, min_calls=1, open_duration=0.01)
+        call(breaker, status=500)
+        time.sleep(0.02)
+        with self.assertRaises(KeyboardInterrupt):
+            with breaker.guard("/api/a"):
+                raise KeyboardInterrupt
+        self.assertEqual(breaker.state("/api/a"), HALF_OPEN)
+        call(breaker, status=200)
+        self.assertEqual(breaker.state("/api/a"), CLOSED)
+
+    def test_slow_calls(self):
+        """
+        Test the circuit opens when too many calls exceed the slow call duration
+        """
+        breaker = CircuitBreaker(window_size=2, min_calls=2, slow_call_duration=0.01, slow_call_rate_threshold=1.0)
+        with breaker.guard("/api/a"):
+            time.sleep(0.02)
+        call(breaker, status=200)
+        self.assertEqual(breaker.state("/api/a"), CLOSED)
+        with breaker.guard("/api/a"):
+            time.sleep(0.02)
+        with breaker.guard("/api/a"):
+            time.sleep(0.02)
+        self.assertEqual(breaker.state("/api/a"), OPEN)
+
+    def test_shared_circuit_and_metrics(self):
+        """
+        Test one circuit for every endpoint, reported to the metrics
+        """
+        metrics = MetricsRegistry()
+        breaker = CircuitBreaker(window_size=2, min_calls=2, per_endpoint=False, metrics=metrics)
+        call(breaker, "/api/a", status=502)
+        call(breaker, "/api/b", status=502)
+        with self.assertRaises(CircuitOpen) as context:
+            breaker.check("/api/c")
+        self.assertEqual(context.exception.endpoint, "*")
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["circuit_states"], {"*": "open"})
+        self.assertEqual(snapshot["rejected"], {"*": 1})
+        text = PrometheusExporter(metrics).render()
+        self.assertIn('eskiz_circuit_state{endpoint="*",state="open"} 1\n', text)
+        self.assertIn('eskiz_circuit_state{endpoint="*",state="closed"} 0\n', text)
+        self.assertIn('eskiz_circuit_rejected_total{endpoint="*"} 1\n', text)
+
+        breaker.reset()
+        self.assertEqual(metrics.snapshot()["circuit_states"], {"*": "closed"})
+
+
+class TestClientCircuitBreaker(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients stop sending to a failing endpoint
+    """
+    def setUp(self):
+        """
+        Clear injected faults and hit counts
+        """
+        self.httpd.faults.clear()
+        self.httpd.hits.clear()
+
+    def test_sync(self):
+        """
+        Test the sync client fails fast once the circuit of an endpoint opens
+        """
+        breaker = CircuitBreaker(window_size=2, min_calls=2, open_duration=60)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            circuit_breaker=breaker,
+        ) as client:
+            self.httpd.faults.extend([(503, None), (None, None)])
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    client.get_templates()
+            with self.assertRaises(CircuitOpen):
+                client.get_templates()
+            self.assertEqual(self.httpd.hits[f"GET {Endpoint.TEMPLATES.value}"], 2)
+            self.assertEqual(client.get_balance(), 1000)
+
+    async def test_async(self):
+        """
+        Test the async client fails fast once the circuit of an endpoint opens
+        """
+        breaker = CircuitBreaker(window_size=2, min_calls=2, open_duration=60)
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            circuit_breaker=breaker,
+        ) as client:
+            self.httpd.faults.extend([(503, None), (500, None)])
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    await client.send_sms(998901234567, "Hello")
+            with self.assertRaises(CircuitOpen):
+                await client.send_sms(998901234567, "Hello")
+            self.assertEqual(self.httpd.hits[f"POST {Endpoint.SEND_SMS.value}"], 2)
+            self.assertEqual(breaker.state(Endpoint.SEND_SMS.value), OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
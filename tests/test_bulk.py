@@ -0,0 +1,174 @@
+"""
+Tests for the bulk send engine
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client import bulk  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.exception import BulkSendFailed  # noqa: E402
+from eskiz.request import BatchSMSMessage  # noqa: E402
+
+
+def generate_messages(count):
+    """
+    Lazily generate batch messages
+    """
+    for i in range(count):
+        yield BatchSMSMessage(user_sms_id=f"msg{i}", to=998901234567 + i, text=f"Message {i}")
+
+
+class TestIterChunks(unittest.TestCase):
+    """
+    Test cases for chunk packing
+    """
+    def test_chunk_size(self):
+        """
+        Test messages are split by count
+        """
+        chunks = list(bulk.iter_chunks(generate_messages(25), chunk_size=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(chunks[0][0], {"user_sms_id": "msg0", "to": 998901234567, "text": "Message 0"})
+
+    def test_max_bytes(self):
+        """
+        Test messages are split by JSON size
+        """
+        messages = [{"user_sms_id": str(i), "to": 998901234567, "text": "x" * 100} for i in range(10)]
+        chunks = list(bulk.iter_chunks(messages, chunk_size=100, max_bytes=500))
+        self.assertTrue(all(len(chunk) == 3 for chunk in chunks[:-1]))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 10)
+
+    def test_oversized_message(self):
+        """
+        Test a message larger than max_bytes still gets its own chunk
+        """
+        messages = [{"user_sms_id": "1", "to": 998901234567, "text": "x" * 1000}]
+        self.assertEqual(len(list(bulk.iter_chunks(messages, max_bytes=10))), 1)
+
+    def test_lazy_consumption(self):
+        """
+        Test the input is not consumed ahead of the in-flight window
+        """
+        consumed = []
+
+        def messages():
+            for i in range(1000):
+                consumed.append(i)
+                yield {"user_sms_id": str(i), "to": 998901234567, "text": "hi"}
+
+        chunks = bulk.iter_chunks(messages(), chunk_size=10)
+        next(chunks)
+        self.assertEqual(len(consumed), 11)
+
+
+class TestIterCompleted(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for the concurrent chunk runners when a chunk fails
+    """
+    def test_failure_drains_in_flight(self):
+        """
+        Test chunks in flight when another fails complete and are yielded before the error
+        """
+        pulled = []
+
+        def chunks():
+            for index in range(10):
+                pulled.append(index)
+                yield index
+
+        def send(chunk):
+            if chunk == 0:
+                raise ValueError("rejected")
+            time.sleep(0.05)
+            return chunk
+
+        results = []
+        with self.assertRaises(BulkSendFailed) as caught:
+            for result in bulk.iter_completed(send, chunks(), max_in_flight=3):
+                results.append(result)
+
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertEqual(pulled, [0, 1, 2])
+        self.assertEqual([chunk for chunk, _ in caught.exception.failed], [0])
+        self.assertIsInstance(caught.exception.__cause__, ValueError)
+
+    async def test_async_failure_drains_in_flight(self):
+        """
+        Test the async runner lets chunks in flight complete instead of cancelling them
+        """
+        sent = []
+
+        async def send(chunk):
+            if chunk == 0:
+                raise ValueError("rejected")
+            await asyncio.sleep(0.05)
+            sent.append(chunk)
+            return chunk
+
+        results = []
+        with self.assertRaises(BulkSendFailed) as caught:
+            async for result in bulk.iter_completed_async(send, iter(range(10)), max_in_flight=3):
+                results.append(result)
+
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertEqual(sorted(sent), [1, 2])
+        self.assertEqual(len(caught.exception.failed), 1)
+
+    async def test_async_stop_waits_for_in_flight(self):
+        """
+        Test chunks in flight are sent when the caller stops iterating
+        """
+        sent = []
+
+        async def send(chunk):
+            await asyncio.sleep(0.01 * chunk)
+            sent.append(chunk)
+            return chunk
+
+        results = bulk.iter_completed_async(send, iter(range(10)), max_in_flight=3)
+        async for _ in results:
+            break
+        await results.aclose()
+        self.assertEqual(sorted(sent), [0, 1, 2])
+
+
+class TestSendBulkWithMockServer(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test send_bulk on both clients against the mock server
+    """
+    def test_sync_send_bulk(self):
+        """
+        Test the sync client yields one response per chunk
+        """
+        with ClientSync(email="test@example.com", password="password", network=self.network) as client:
+            responses = list(client.send_bulk(generate_messages(45), chunk_size=10, max_in_flight=3))
+
+        self.assertEqual(len(responses), 5)
+        self.assertTrue(all(response.id for response in responses))
+
+    async def test_async_send_bulk(self):
+        """
+        Test the async client yields one response per chunk
+        """
+        async with AsyncClient(email="test@example.com", password="password", network=self.network) as client:
+            responses = [
+                response async for response in client.send_bulk(
+                    generate_messages(45), chunk_size=10, max_in_flight=3
+                )
+            ]
+
+        self.assertEqual(len(responses), 5)
+        self.assertTrue(all(response.id for response in responses))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+Tests for the response cache
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.cache import InMemoryCache  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import Endpoint  # noqa: E402
+
+SCOPE = "scope"
+LIMIT = Endpoint.GET_LIMIT.value
+
+
+class TestInMemoryCache(unittest.TestCase):
+    """
+    Test cases for the cache itself
+    """
+    def test_hit_and_expiry(self):
+        """
+        Test a response is reused until its TTL expires
+        """
+        cache = InMemoryCache(ttls={LIMIT: 0.05})
+        calls = []
+
+        def load():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), 1)
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), 1)
+        time.sleep(0.06)
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), 2)
+        self.assertEqual(cache.stats.snapshot(), {"hits": 1, "stale_hits": 0, "misses": 2, "invalidations": 0})
+
+    def test_uncached_endpoint(self):
+        """
+        Test endpoints without a TTL always call the loader
+        """
+        cache = InMemoryCache(ttls={})
+        calls = []
+        for _ in range(3):
+            cache.fetch((SCOPE, LIMIT, None), lambda: calls.append(1))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        """
+        Test the least recently used entry is dropped when the cache is full
+        """
+        cache = InMemoryCache(ttls={LIMIT: 60}, max_entries=2)
+        for params in ("a", "b"):
+            cache.fetch((SCOPE, LIMIT, params), lambda: params)
+        cache.fetch((SCOPE, LIMIT, "a"), lambda: "reloaded")
+        cache.fetch((SCOPE, LIMIT, "c"), lambda: "c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, "a"), lambda: "reloaded"), "a")
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, "b"), lambda: "reloaded"), "reloaded")
+
+    def test_stale_while_revalidate(self):
+        """
+        Test an expired response is served while a single refresh replaces it
+        """
+        cache = InMemoryCache(ttls={LIMIT: 0.2}, stale_while_revalidate=60)
+        cache.fetch((SCOPE, LIMIT, None), lambda: "old")
+        time.sleep(0.21)
+
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return "new"
+
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), "old")
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), "old")
+        time.sleep(0.08)
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), "new")
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidation_discards_inflight_response(self):
+        """
+        Test a response requested before an invalidation is not stored
+        """
+        cache = InMemoryCache(ttls={LIMIT: 60})
+
+        def load():
+            cache.invalidate(SCOPE, LIMIT)
+            return "outdated"
+
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), load), "outdated")
+        self.assertEqual(len(cache), 0)
+
+    def test_sends_keep_other_inflight_responses(self):
+        """
+        Test sends during a templates request drop the balance without discarding the templates
+        """
+        cache = InMemoryCache()
+        templates = (SCOPE, Endpoint.TEMPLATES.value, None)
+
+        def load():
+            cache.invalidate_after(SCOPE, Endpoint.SEND_SMS)
+            cache.invalidate_after("other", Endpoint.SEND_BATCH)
+            return "templates"
+
+        cache.fetch((SCOPE, LIMIT, None), lambda: 1000)
+        for _ in range(3):
+            self.assertEqual(cache.fetch(templates, load), "templates")
+        self.assertEqual(cache.stats.snapshot()["misses"], 2)
+        self.assertEqual(cache.fetch((SCOPE, LIMIT, None), lambda: 999), 999)
+
+        # Dropping the whole scope still discards the response in flight
+        cache.clear()
+        cache.fetch(templates, lambda: cache.invalidate(SCOPE) or "outdated")
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate_after_is_scoped(self):
+        """
+        Test a send only invalidates the balance of its own account
+        """
+        cache = InMemoryCache()
+        cache.fetch(("a", LIMIT, None), lambda: 1)
+        cache.fetch(("b", LIMIT, None), lambda: 2)
+        cache.invalidate_after("a", Endpoint.SEND_SMS)
+
+        self.assertEqual(cache.fetch(("a", LIMIT, None), lambda: 3), 3)
+        self.assertEqual(cache.fetch(("b", LIMIT, None), lambda: 4), 2)
+
+
+class TestClientCache(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients use the cache against the mock server
+    """
+    def setUp(self):
+        """
+        Reset the request counts
+        """
+        self.httpd.hits.clear()
+
+    def test_sync(self):
+        """
+        Test the sync client caches the balance and templates until a send
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", cache=InMemoryCache(),
+        ) as client:
+            self.assertEqual(client.get_balance(), 1000)
+            self.assertEqual(client.get_balance(), 1000)
+            client.get_templates()
+            client.get_templates()
+            self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 1)
+            self.assertEqual(self.httpd.hits["GET /api/user/templates"], 1)
+
+            client.send_sms(998901234567, "Test message")
+            client.get_balance()
+            client.get_templates()
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 2)
+        self.assertEqual(self.httpd.hits["GET /api/user/templates"], 1)
+
+    async def test_async(self):
+        """
+        Test the async client caches the balance until a batch send
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", cache=InMemoryCache(),
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+            self.assertEqual(await client.get_balance(), 1000)
+            self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 1)
+
+            await client.send_batch_sms([{"user_sms_id": "1", "to": 998901234567, "text": "Test message"}])
+            await client.get_balance()
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 2)
+
+    async def test_async_stale_while_revalidate(self):
+        """
+        Test the async client refreshes a stale balance in the background
+        """
+        cache = InMemoryCache(ttls={LIMIT: 0.01}, stale_while_revalidate=60)
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network,
+            token="mock_token_12345", cache=cache,
+        ) as client:
+            await client.get_balance()
+            time.sleep(0.02)
+            await client.get_balance()
+            # Wait for the background refresh
+            await asyncio.gather(*cache._refreshes)  # pylint: disable=protected-access
+
+        self.assertEqual(self.httpd.hits["GET /api/user/get-limit"], 2)
+        self.assertEqual(cache.stats.stale_hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Tests for the delivery report callback receiver
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from eskiz.callback import DeliveryReport, DLRReceiver, JsonLinesSink, ReportSink  # noqa: E402
+
+REPORT = {
+    "request_id": "req1",
+    "message_id": 4385062,
+    "user_sms_id": "msg1",
+    "country": "UZ",
+    "phone_number": "998901234567",
+    "sms_count": "1",
+    "status": "DELIVRD",
+    "status_date": "2023-01-01 12:00:02",
+}
+
+
+class ListSink(ReportSink):
+    """
+    Sink keeping the batches it receives
+    """
+    def __init__(self):
+        self.batches = []
+
+    async def write(self, reports):
+        self.batches.append(list(reports))
+
+
+class TestDLRReceiver(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for parsing, dispatching and batching reports
+    """
+    async def make_client(self, receiver):
+        """
+        Mount `receiver` on a test server and return a client for it
+        """
+        app = web.Application()
+        receiver.add_routes(app)
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_form_and_json(self):
+        """
+        Test form and JSON callbacks are parsed into typed reports
+        """
+        received = []
+        async with DLRReceiver(handlers=[received.append]) as receiver:
+            client = await self.make_client(receiver)
+            self.assertEqual((await client.post("/eskiz/dlr", data=REPORT)).status, 200)
+            self.assertEqual((await client.post("/eskiz/dlr", json=REPORT)).status, 200)
+
+        self.assertEqual(len(received), 2)
+        for report in received:
+            self.assertIsInstance(report, DeliveryReport)
+            self.assertEqual(report.message_id, "4385062")
+            self.assertEqual(report.sms_count, 1)
+            self.assertEqual(report.status, "DELIVRD")
+
+    async def test_invalid_report(self):
+        """
+        Test a callback without the required fields is rejected
+        """
+        async with DLRReceiver() as receiver:
+            client = await self.make_client(receiver)
+            self.assertEqual((await client.post("/eskiz/dlr", data={"status": "DELIVRD"})).status, 400)
+            self.assertEqual((await client.post("/eskiz/dlr", json=[1, 2])).status, 400)
+
+    async def test_bounded_concurrency(self):
+        """
+        Test no more than max_concurrency handlers run at once
+        """
+        running = [0, 0]
+
+        async def handler(report):
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+        async with DLRReceiver(handlers=[handler], max_concurrency=3) as receiver:
+            client = await self.make_client(receiver)
+            await asyncio.gather(*(client.post("/eskiz/dlr", json=REPORT) for _ in range(20)))
+
+        self.assertEqual(running[1], 3)
+
+    async def test_queue_full(self):
+        """
+        Test callbacks are answered with 503 when the queue is full
+        """
+        release = asyncio.Event()
+
+        async def handler(report):
+            await release.wait()
+
+        async with DLRReceiver(handlers=[handler], max_concurrency=1, queue_size=1) as receiver:
+            client = await self.make_client(receiver)
+            statuses = [(await client.post("/eskiz/dlr", json=REPORT)).status for _ in range(3)]
+            release.set()
+
+        self.assertEqual(statuses, [200, 200, 503])
+
+    async def test_sink_batches(self):
+        """
+        Test reports reach the sink in batches and the rest is flushed on stop
+        """
+        sink = ListSink()
+        async with DLRReceiver(sink=sink, batch_size=10, flush_interval=60) as receiver:
+            client = await self.make_client(receiver)
+            for _ in range(25):
+                await client.post("/eskiz/dlr", json=REPORT)
+
+        self.assertEqual(sorted(len(batch) for batch in sink.batches), [5, 10, 10])
+
+    async def test_sink_failure_retried(self):
+        """
+        Test a batch the sink fails to write is written again after a backoff, in order
+        """
+        class FlakySink(ListSink):
+            async def write(self, reports):
+                if not self.batches and self.failures < 2:
+                    self.failures += 1
+                    raise OSError("database unavailable")
+                await super().write(reports)
+
+        sink = FlakySink()
+        sink.failures = 0
+        async with DLRReceiver(sink=sink, batch_size=2, flush_interval=0.01) as receiver:
+            client = await self.make_client(receiver)
+            for user_sms_id in ("msg1", "msg2", "msg3"):
+                await client.post("/eskiz/dlr", json={**REPORT, "user_sms_id": user_sms_id})
+            for _ in range(100):
+                if sink.batches:
+                    break
+                await asyncio.sleep(0.01)
+
+        self.assertEqual(sink.failures, 2)
+        self.assertEqual([report.user_sms_id for batch in sink.batches for report in batch], ["msg1", "msg2", "msg3"])
+
+    async def test_sink_failure_given_up(self):
+        """
+        Test reports beyond max_retained, and those the sink refuses on stop, go to on_sink_error
+        """
+        class FailingSink(ReportSink):
+            async def write(self, reports):
+                raise OSError("database unavailable")
+
+        given_up = []
+
+        async def on_sink_error(reports, error):
+            given_up.append(([report.user_sms_id for report in reports], str(error)))
+
+        async with DLRReceiver(sink=FailingSink(), batch_size=2, flush_interval=0.01, max_retained=2,
+                               on_sink_error=on_sink_error) as receiver:
+            client = await self.make_client(receiver)
+            for user_sms_id in ("msg1", "msg2", "msg3"):
+                await client.post("/eskiz/dlr", json={**REPORT, "user_sms_id": user_sms_id})
+            for _ in range(100):
+                if given_up:
+                    break
+                await asyncio.sleep(0.01)
+
+        self.assertEqual(given_up, [(["msg1"], "database unavailable"), (["msg2", "msg3"], "database unavailable")])
+
+    async def test_json_lines_sink(self):
+        """
+        Test the JSON lines sink appends one report per line
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dlr.jsonl")
+            sink = JsonLinesSink(path)
+            await sink.write([DeliveryReport(**REPORT), DeliveryReport(**REPORT)])
+
+            with open(path, encoding="utf-8") as file:
+                lines = [json.loads(line) for line in file]
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["message_id"], "4385062")
+
+    async def test_serve(self):
+        """
+        Test the receiver serves callbacks on its own server
+        """
+        received = []
+        receiver = DLRReceiver(handlers=[received.append])
+        runner = await receiver.serve("127.0.0.1", 0)
+        port = runner.addresses[0][1]
+
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"http://127.0.0.1:{port}/eskiz/dlr", json=REPORT) as response:
+                self.assertEqual(response.status, 200)
+
+        await receiver.close()
+        self.assertEqual(len(received), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Run the same mock server cases against the sync and async clients
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+
+
+class ClientParityCases(MockServerMixin):
+    """
+    Cases shared by both clients; subclasses implement `call`
+    """
+    def call(self, name, *args, **kwargs):
+        """
+        Call a client method by name and return its result
+        """
+        raise NotImplementedError
+
+    def test_get_balance(self):
+        """
+        Test get balance functionality
+        """
+        self.assertEqual(self.call("get_balance"), 1000)
+
+    def test_send_sms(self):
+        """
+        Test send SMS functionality
+        """
+        response = self.call("send_sms", 998901234567, "Test message")
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(response.status, "waiting")
+
+    def test_send_batch_sms(self):
+        """
+        Test send batch SMS functionality
+        """
+        messages = [{"user_sms_id": "msg1", "to": 998901234567, "text": "First message"}]
+        response = self.call("send_batch_sms", messages)
+        self.assertTrue(response.id)
+
+    def test_send_global_sms(self):
+        """
+        Test send global SMS functionality
+        """
+        response = self.call("send_global_sms", "12025550123", "Hello", "US")
+        self.assertTrue(response.success)
+
+    def test_get_user_messages(self):
+        """
+        Test get user messages functionality
+        """
+        response = self.call("get_user_messages", "2023-01-01 00:00", "2023-12-31 23:59")
+        self.assertEqual(response.data.total, 2)
+        self.assertEqual(response.data.result[1].to, "998901234568")
+
+    def test_get_user_messages_by_dispatch(self):
+        """
+        Test get user messages by dispatch functionality
+        """
+        response = self.call("get_user_messages_by_dispatch", "123")
+        self.assertEqual(len(response.data.result), 2)
+
+    def test_get_dispatch_status(self):
+        """
+        Test get dispatch status functionality
+        """
+        response = self.call("get_dispatch_status", "1", "123")
+        self.assertEqual(response.data[0].status, "delivered")
+        self.assertEqual(response.data[0].total, 2)
+
+    def test_get_message_status(self):
+        """
+        Test get message status functionality
+        """
+        response = self.call("get_message_status", "mock-message-id-12345")
+        self.assertEqual(response.data.id, "mock-message-id-12345")
+        self.assertEqual(response.data.status, "delivered")
+
+    def test_get_templates(self):
+        """
+        Test get templates functionality
+        """
+        response = self.call("get_templates")
+        self.assertEqual(len(response.result), 2)
+        self.assertEqual(response.result[1].template, "Your verification code is {code}.")
+
+    def test_export_messages(self):
+        """
+        Test export messages returns the CSV text
+        """
+        response = self.call("export_messages", "2023", "1")
+        self.assertTrue(response.startswith("\ufeffid,to,message,status"))
+        self.assertIn('"Привет, ""клиент"" 3\nline two"', response)
+
+
+class TestSyncClientParity(ClientParityCases, unittest.TestCase):
+    """
+    Shared cases against ClientSync
+    """
+    def call(self, name, *args, **kwargs):
+        with ClientSync(email="test@example.com", password="password", network=self.network) as client:
+            return getattr(client, name)(*args, **kwargs)
+
+
+class TestAsyncClientParity(ClientParityCases, unittest.TestCase):
+    """
+    Shared cases against AsyncClient
+    """
+    def call(self, name, *args, **kwargs):
+        async def run():
+            async with AsyncClient(email="test@example.com", password="password", network=self.network) as client:
+                return await getattr(client, name)(*args, **kwargs)
+
+        return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the delivery tracker
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.delivery import AsyncDeliveryTracker, DeliveryTracker, PollSchedule  # noqa: E402
+from eskiz.response import SendSMSResponse  # noqa: E402
+
+FAST = PollSchedule(min_interval=0.01, max_interval=0.05, growth=0.5, max_age=5)
+
+
+class TestPollSchedule(unittest.TestCase):
+    """
+    Test cases for the adaptive intervals
+    """
+    def test_interval(self):
+        """
+        Test the interval grows with age between its bounds
+        """
+        schedule = PollSchedule(min_interval=2, max_interval=60, growth=0.5)
+        self.assertEqual(schedule.interval(1), 2)
+        self.assertEqual(schedule.interval(30), 15)
+        self.assertEqual(schedule.interval(3600), 60)
+
+
+class TestDeliveryTracker(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both trackers follow statuses on the mock server
+    """
+    def setUp(self):
+        """
+        Reset the request counters and the scripted statuses
+        """
+        self.httpd.hits.clear()
+        self.httpd.statuses.clear()
+        self.httpd.dispatches.clear()
+
+    def make_client(self):
+        """
+        Create a sync client that does not need to log in
+        """
+        return ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        )
+
+    def test_single_message(self):
+        """
+        Test a message is polled by ID until it reaches a terminal status
+        """
+        self.httpd.statuses["101"] = ["waiting", "TRANSMTD", "DELIVRD"]
+        with self.make_client() as client:
+            tracker = DeliveryTracker(client, schedule=FAST)
+            tracker.track(SendSMSResponse(id="101", message="Waiting for SMS provider", status="waiting"))
+            transitions = list(tracker.transitions())
+
+        self.assertEqual([t.status for t in transitions], ["waiting", "TRANSMTD", "DELIVRD"])
+        self.assertEqual(transitions[-1].previous_status, "TRANSMTD")
+        self.assertTrue(transitions[-1].terminal)
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/status_by_id/101"], 3)
+
+    def test_batch_uses_dispatch(self):
+        """
+        Test a large batch is refreshed with one request per poll
+        """
+        self.httpd.dispatches["55"] = list(range(1, 21))
+        for message_id in range(1, 21):
+            self.httpd.statuses[str(message_id)] = ["waiting", "delivered"]
+
+        seen = []
+        with self.make_client() as client:
+            tracker = DeliveryTracker(client, schedule=FAST, on_transition=seen.append)
+            tracker.track_batch(55, [{"user_sms_id": f"msg{i}", "to": 998900000000 + i, "text": "Hi"}
+                                     for i in range(1, 21)])
+            transitions = list(tracker.transitions())
+
+        self.assertEqual(transitions, seen)
+        self.assertEqual(len([t for t in transitions if t.terminal]), 20)
+        self.assertEqual({t.message_id for t in transitions if t.terminal}, {str(i) for i in range(1, 21)})
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/get-user-messages-by-dispatch"], 2)
+        self.assertEqual(sum(v for k, v in self.httpd.hits.items() if "status_by_id" in k), 0)
+
+    def test_small_batch_uses_status_by_id(self):
+        """
+        Test a small batch is polled by ID once the IDs are known
+        """
+        self.httpd.dispatches["56"] = [1, 2]
+        self.httpd.statuses.update({"1": ["waiting", "waiting", "delivered"], "2": ["waiting", "waiting", "delivered"]})
+
+        with self.make_client() as client:
+            tracker = DeliveryTracker(client, schedule=FAST)
+            tracker.track_batch("56", ["msg1", "msg2"])
+            statuses = [t.status for t in tracker.transitions()]
+
+        self.assertEqual(statuses, ["waiting", "waiting", "delivered", "delivered"])
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/get-user-messages-by-dispatch"], 1)
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/status_by_id/1"], 2)
+
+    def test_timeout(self):
+        """
+        Test a message that never completes is given up after max_age
+        """
+        self.httpd.statuses["102"] = ["waiting"]
+        with self.make_client() as client:
+            tracker = DeliveryTracker(client, schedule=PollSchedule(min_interval=0.01, max_interval=0.01, max_age=0.1))
+            tracker.track("102")
+            transitions = list(tracker.transitions())
+
+        self.assertTrue(transitions[-1].timed_out)
+        self.assertEqual(transitions[-1].status, "waiting")
+        self.assertEqual(len(tracker), 0)
+
+    async def test_async(self):
+        """
+        Test the async tracker yields transitions of single and batch messages
+        """
+        self.httpd.statuses["103"] = ["waiting", "delivered"]
+        self.httpd.dispatches["57"] = [7, 8, 9]
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            tracker = AsyncDeliveryTracker(client, schedule=FAST)
+            tracker.track("103")
+            tracker.track_batch("57", ["msg7", "msg8", "msg9"])
+            terminal = {t.message_id async for t in tracker.transitions() if t.terminal}
+
+        self.assertEqual(terminal, {"103", "7", "8", "9"})
+        self.assertEqual(len(tracker), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
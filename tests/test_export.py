@@ -0,0 +1,178 @@
+"""
+Tests for the streaming CSV export
+"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin, make_export_csv  # noqa: E402
+from eskiz.client.export import RowReader  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+
+
+def expected_row(message_id):
+    """
+    Return the parsed export row of `message_id`
+    """
+    return {
+        "id": str(message_id),
+        "to": str(998900000000 + message_id),
+        "message": f'Привет, "клиент" {message_id}\nline two',
+        "status": "delivered",
+    }
+
+
+class TestRowReader(unittest.TestCase):
+    """
+    Test cases for the incremental CSV parser
+    """
+    def test_any_chunk_size(self):
+        """
+        Test rows survive chunks splitting characters, quotes and newlines
+        """
+        data = make_export_csv(5)
+        for size in (1, 2, 3, 7, 64, len(data)):
+            reader = RowReader()
+            rows = []
+            for start in range(0, len(data), size):
+                rows.extend(reader.feed(data[start:start + size]))
+            rows.extend(reader.feed(b"", final=True))
+            self.assertEqual(rows, [expected_row(message_id) for message_id in range(1, 6)], size)
+
+    def test_without_trailing_newline(self):
+        """
+        Test the last record is flushed by the final feed
+        """
+        reader = RowReader()
+        self.assertEqual(reader.feed(b"id,status\n1,delivered"), [])
+        self.assertEqual(reader.feed(b"", final=True), [{"id": "1", "status": "delivered"}])
+
+
+class TestStreamingExport(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients stream the export from the mock server
+    """
+    def setUp(self):
+        """
+        Serve a 2000 row export
+        """
+        self.httpd.export_rows = 2000
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "export.csv")
+
+    def tearDown(self):
+        """
+        Restore the default export and remove the temporary directory
+        """
+        self.httpd.export_rows = 3
+        self.directory.cleanup()
+
+    def make_client(self):
+        """
+        Create a sync client that does not need to log in
+        """
+        return ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        )
+
+    def make_async_client(self):
+        """
+        Create an async client that does not need to log in
+        """
+        return AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        )
+
+    def test_sync_to_path(self):
+        """
+        Test the export is written to a path byte for byte
+        """
+        with self.make_client() as client:
+            written = client.export_messages_to(self.path, "2023", "1", chunk_size=1024)
+
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), make_export_csv(2000))
+        self.assertEqual(written, len(make_export_csv(2000)))
+
+    def test_sync_to_file_object(self):
+        """
+        Test the export is written to a binary file object
+        """
+        buffer = io.BytesIO()
+        with self.make_client() as client:
+            client.export_messages_to(buffer, "2023", "1")
+        self.assertEqual(buffer.getvalue(), make_export_csv(2000))
+
+    def test_sync_rows(self):
+        """
+        Test the export is parsed into rows
+        """
+        with self.make_client() as client:
+            rows = list(client.iter_export_rows("2023", "1", chunk_size=1000))
+        self.assertEqual(rows, [expected_row(message_id) for message_id in range(1, 2001)])
+
+    async def test_async_to_path(self):
+        """
+        Test the async client writes the export to a path
+        """
+        async with self.make_async_client() as client:
+            written = await client.export_messages_to(self.path, "2023", "1", chunk_size=1024)
+
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), make_export_csv(2000))
+        self.assertEqual(written, len(make_export_csv(2000)))
+
+    async def test_async_rows(self):
+        """
+        Test the async client parses the export into rows
+        """
+        async with self.make_async_client() as client:
+            rows = [row async for row in client.iter_export_rows("2023", "1", chunk_size=1000)]
+        self.assertEqual(rows, [expected_row(message_id) for message_id in range(1, 2001)])
+
+
+class TestContentType(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test JSON is decoded whatever its content type while the export stays text
+    """
+    def setUp(self):
+        """
+        Serve the JSON responses as HTML
+        """
+        self.httpd.json_content_type = "text/html; charset=utf-8"
+
+    def tearDown(self):
+        """
+        Restore the JSON content type
+        """
+        self.httpd.json_content_type = "application/json"
+
+    def test_sync(self):
+        """
+        Test the sync client decodes JSON served as HTML and returns the export as text
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            self.assertEqual(client.get_balance(), 1000)
+            self.assertEqual(client.export_messages("2023", "1"), make_export_csv(3).decode())
+
+    async def test_async(self):
+        """
+        Test the async client decodes JSON served as HTML and returns the export as text
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+            self.assertEqual(await client.export_messages("2023", "1"), make_export_csv(3).decode())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""
+Tests for the hedged requests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.client.hedge import hedged  # noqa: E402
+from eskiz.enum import Endpoint  # noqa: E402
+from eskiz.hedge import HedgePolicy  # noqa: E402
+from eskiz.metrics import MetricsRegistry, PrometheusExporter  # noqa: E402
+
+SEND = "POST /api/message/sms/send"
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """
+    Test cases for the hedge delay and budget
+    """
+    def test_delay(self):
+        """
+        Test the delay is the initial one until enough latencies are known, then their clamped quantile
+        """
+        policy = HedgePolicy(quantile=0.5, initial_delay=0.3, min_delay=0.05, max_delay=1.0,
+                             min_samples=10, window_size=10, buckets=(0.1, 0.2, 10.0))
+        for _ in range(9):
+            policy.observe(0.15)
+        self.assertEqual(policy.delay(), 0.3)
+        policy.observe(0.15)
+        self.assertAlmostEqual(policy.delay(), 0.15)
+
+        # A new window keeps the previous quantile until it holds enough latencies
+        policy.observe(8.0)
+        self.assertAlmostEqual(policy.delay(), 0.15)
+        for _ in range(9):
+            policy.observe(8.0)
+        self.assertEqual(policy.delay(), 1.0)
+
+    def test_budget(self):
+        """
+        Test hedges are capped by the budget, which refills with each request
+        """
+        policy = HedgePolicy(max_hedge_rate=0.5, burst=2)
+        policy.start()
+        self.assertTrue(policy.try_hedge())
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        policy.start()
+        self.assertFalse(policy.try_hedge())
+        policy.start()
+        self.assertTrue(policy.try_hedge())
+        self.assertEqual(policy.stats.snapshot(), {"requests": 3, "hedged": 3, "wins": 0, "suppressed": 2})
+
+    def test_invalid(self):
+        """
+        Test out of range settings are rejected
+        """
+        with self.assertRaises(ValueError):
+            HedgePolicy(quantile=1.0)
+        with self.assertRaises(ValueError):
+            HedgePolicy(min_samples=10, window_size=5)
+
+    def test_hedges_not_queued_behind_sends(self):
+        """
+        Test hedges run while every thread for first attempts is busy
+        """
+        policy = HedgePolicy(initial_delay=0.05)
+        released = threading.Event()
+
+        def send(hedging):
+            if not hedging:
+                released.wait(5)
+            return hedging
+
+        with ThreadPoolExecutor(max_workers=1) as executor, ThreadPoolExecutor(max_workers=1) as hedge_executor:
+            with ThreadPoolExecutor(max_workers=2) as callers:
+                started = time.perf_counter()
+                results = list(callers.map(
+                    lambda _: hedged(send, policy, executor, hedge_executor, "send"), range(2)
+                ))
+                elapsed = time.perf_counter() - started
+                released.set()
+
+        self.assertEqual(results, [True, True])
+        self.assertLess(elapsed, 2)
+        self.assertEqual(policy.stats.snapshot()["wins"], 2)
+
+
+class TestClientHedge(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients hedge slow sends
+    """
+    def setUp(self):
+        """
+        Clear the send delays and the recorded requests
+        """
+        self.httpd.send_delays.clear()
+        self.httpd.idempotency_keys.clear()
+        self.httpd.hits.clear()
+
+    def assert_hedge_won(self, policy, metrics):
+        """
+        Assert one send was hedged by a second request with the same key, which won
+        """
+        self.assertEqual(self.httpd.hits[SEND], 2)
+        first, second = self.httpd.idempotency_keys
+        self.assertIsNotNone(first)
+        self.assertEqual(first, second)
+        self.assertEqual(policy.stats.snapshot(), {"requests": 1, "hedged": 1, "wins": 1, "suppressed": 0})
+        endpoint = Endpoint.SEND_SMS.value
+        self.assertEqual(metrics.snapshot()["hedges"], {(endpoint, "fired"): 1, (endpoint, "won"): 1})
+
+    def test_sync(self):
+        """
+        Test a slow send is answered by its hedge
+        """
+        policy = HedgePolicy(initial_delay=0.05)
+        metrics = MetricsRegistry()
+        self.httpd.send_delays.extend([1.0, 0])
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hedge_policy=policy, metrics=metrics,
+        ) as client:
+            response = client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assert_hedge_won(policy, metrics)
+        self.assertIn('eskiz_hedges_total{endpoint="%s",event="won"} 1\n' % Endpoint.SEND_SMS.value,
+                      PrometheusExporter(metrics).render())
+
+    def test_sync_expired_token(self):
+        """
+        Test a hedged send rejected with 401 is resent with the refreshed token
+        """
+        policy = HedgePolicy(initial_delay=1.0)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="expired_token",
+            hedge_policy=policy,
+        ) as client:
+            response = client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+
+    def test_fast_send(self):
+        """
+        Test a send answered within the delay is not hedged
+        """
+        policy = HedgePolicy(initial_delay=1.0)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hedge_policy=policy,
+        ) as client:
+            client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(self.httpd.hits[SEND], 1)
+        self.assertEqual(policy.stats.snapshot()["hedged"], 0)
+
+    def test_budget_spent(self):
+        """
+        Test a slow send is not hedged once the budget is spent
+        """
+        policy = HedgePolicy(initial_delay=0.05, max_hedge_rate=0, burst=0)
+        metrics = MetricsRegistry()
+        self.httpd.send_delays.append(0.2)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hedge_policy=policy, metrics=metrics,
+        ) as client:
+            client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(self.httpd.hits[SEND], 1)
+        self.assertEqual(policy.stats.snapshot()["suppressed"], 1)
+        self.assertEqual(metrics.snapshot()["hedges"], {(Endpoint.SEND_SMS.value, "suppressed"): 1})
+
+    async def test_async(self):
+        """
+        Test the async client answers a slow send with its hedge
+        """
+        policy = HedgePolicy(initial_delay=0.05)
+        metrics = MetricsRegistry()
+        self.httpd.send_delays.extend([1.0, 0])
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hedge_policy=policy, metrics=metrics,
+        ) as client:
+            response = await client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assert_hedge_won(policy, metrics)
+
+    async def test_async_expired_token(self):
+        """
+        Test a hedged async send rejected with 401 is resent with the refreshed token
+        """
+        policy = HedgePolicy(initial_delay=1.0)
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="expired_token",
+            hedge_policy=policy,
+        ) as client:
+            response = await client.send_sms(998901234567, "Your code is 1234")
+
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
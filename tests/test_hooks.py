@@ -0,0 +1,186 @@
+"""
+Tests for the request lifecycle hooks
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import Endpoint, Phase  # noqa: E402
+from eskiz.hooks import HookChain, PhaseTimings, RequestContext, RequestHooks, run_phase  # noqa: E402
+from eskiz.retry import RetryPolicy  # noqa: E402
+
+CALL = [
+    ("start", Phase.BUILD), ("finish", Phase.BUILD),
+    ("start", Phase.SERIALIZE), ("finish", Phase.SERIALIZE),
+    ("start", Phase.NETWORK), ("finish", Phase.NETWORK),
+    ("start", Phase.DECODE), ("finish", Phase.DECODE),
+    ("start", Phase.VALIDATE), ("finish", Phase.VALIDATE),
+]
+
+
+class RecordingHooks(RequestHooks):
+    """
+    Hooks keeping every event with a copy of the context fields
+    """
+    def __init__(self, name="hooks", log=None):
+        self.name = name
+        self.events = [] if log is None else log
+        self.contexts = []
+        self.errors = []
+
+    def start_phase(self, phase, context):
+        self.events.append(("start", phase))
+
+    def finish_phase(self, phase, context, seconds, error):
+        self.events.append(("finish", phase))
+        self.contexts.append((phase, context.endpoint, context.attempt, context.status))
+        self.errors.append(error)
+        assert seconds >= 0
+
+
+class TestRunPhase(unittest.TestCase):
+    """
+    Test cases for the phase context manager and the hook chain
+    """
+    def test_untraced(self):
+        """
+        Test nothing is reported without a context
+        """
+        hooks = RecordingHooks()
+        with run_phase(hooks, Phase.BUILD, None):
+            pass
+        self.assertEqual(hooks.events, [])
+
+    def test_error(self):
+        """
+        Test a failing phase reports its exception and still raises
+        """
+        hooks = RecordingHooks()
+        with self.assertRaises(ValueError):
+            with run_phase(hooks, Phase.VALIDATE, RequestContext("/api/a", "GET")):
+                raise ValueError("bad")
+        self.assertIsInstance(hooks.errors[0], ValueError)
+
+    def test_chain(self):
+        """
+        Test chained hooks finish in the reverse order they started
+        """
+        log = []
+
+        class Named(RequestHooks):
+            def __init__(self, name):
+                self.name = name
+
+            def start_phase(self, phase, context):
+                log.append(("start", self.name))
+
+            def finish_phase(self, phase, context, seconds, error):
+                log.append(("finish", self.name))
+
+        with run_phase(HookChain(Named("a"), Named("b")), Phase.NETWORK, RequestContext("/api/a", "GET")):
+            pass
+        self.assertEqual(log, [("start", "a"), ("start", "b"), ("finish", "b"), ("finish", "a")])
+
+
+class TestClientHooks(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients report each phase of their calls
+    """
+    def setUp(self):
+        """
+        Clear injected faults
+        """
+        self.httpd.faults.clear()
+
+    def test_sync(self):
+        """
+        Test a send reports every phase in order with its context
+        """
+        hooks = RecordingHooks()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hooks=hooks,
+        ) as client:
+            client.send_sms(998901234567, "Hello")
+        self.assertEqual(hooks.events, CALL)
+        self.assertEqual(hooks.contexts[-1], (Phase.VALIDATE, Endpoint.SEND_SMS.value, 1, 200))
+
+    def test_sync_retry(self):
+        """
+        Test the network phases run again for a retried attempt
+        """
+        hooks = RecordingHooks()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hooks=hooks, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0.01),
+        ) as client:
+            self.httpd.faults.append((503, None))
+            client.get_templates()
+
+        network = [context for context in hooks.contexts if context[0] is Phase.NETWORK]
+        self.assertEqual(network, [
+            (Phase.NETWORK, Endpoint.TEMPLATES.value, 1, 503),
+            (Phase.NETWORK, Endpoint.TEMPLATES.value, 2, 200),
+        ])
+        self.assertEqual(hooks.errors, [None] * len(hooks.errors))
+
+    def test_sync_batch_context(self):
+        """
+        Test batch sends carry the user_sms_id of each message and the dispatch ID
+        """
+        contexts = []
+
+        class Capture(RequestHooks):
+            def start_phase(self, phase, context):
+                contexts.append((context.user_sms_ids, context.dispatch_id))
+
+        timings = PhaseTimings()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hooks=HookChain(Capture(), timings),
+        ) as client:
+            client.send_batch_sms([
+                {"user_sms_id": "a1", "to": 998901234567, "text": "a"},
+                {"user_sms_id": "a2", "to": 998901234568, "text": "b"},
+            ], dispatch_id=7)
+
+        self.assertEqual(contexts[-1], (("a1", "a2"), 7))
+        histograms = timings.snapshot()
+        self.assertEqual(
+            {phase for endpoint, phase in histograms if endpoint == Endpoint.SEND_BATCH.value}, set(Phase)
+        )
+        self.assertEqual(histograms[(Endpoint.SEND_BATCH.value, Phase.NETWORK)].count, 1)
+
+    async def test_async(self):
+        """
+        Test the async client reports the same phases, including retries
+        """
+        hooks = RecordingHooks()
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            hooks=hooks, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0.01),
+        ) as client:
+            await client.send_sms(998901234567, "Hello")
+            self.assertEqual(hooks.events, CALL)
+            self.assertEqual(hooks.contexts[-1], (Phase.VALIDATE, Endpoint.SEND_SMS.value, 1, 200))
+
+            hooks.contexts.clear()
+            self.httpd.faults.append((503, None))
+            await client.get_templates()
+
+        network = [context for context in hooks.contexts if context[0] is Phase.NETWORK]
+        self.assertEqual(network, [
+            (Phase.NETWORK, Endpoint.TEMPLATES.value, 1, 503),
+            (Phase.NETWORK, Endpoint.TEMPLATES.value, 2, 200),
+        ])
+        self.assertEqual(hooks.errors[-len(hooks.contexts):], [None] * len(hooks.contexts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Tests for the lazy login of the synchronous client
+"""
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+
+
+class TestLazyLogin(MockServerMixin, unittest.TestCase):
+    """
+    Test cases for lazy construction
+    """
+    def setUp(self):
+        """
+        Reset the request counters
+        """
+        self.httpd.hits.clear()
+
+    def test_construction_is_offline(self):
+        """
+        Test a lazy client can be created while the API is unreachable
+        """
+        client = ClientSync(email="test@example.com", password="password", network="http://127.0.0.1:9", lazy=True)
+        self.assertIsNone(client.token)
+        self.assertNotIn("Authorization", client.headers)
+
+    def test_login_on_first_use(self):
+        """
+        Test the first request logs in
+        """
+        with ClientSync(email="test@example.com", password="password", network=self.network, lazy=True) as client:
+            self.assertEqual(self.httpd.hits["POST /api/auth/login"], 0)
+            self.assertEqual(client.get_balance(), 1000)
+            self.assertEqual(client.token, "mock_token_12345")
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 1)
+
+    def test_parallel_first_calls(self):
+        """
+        Test parallel first calls trigger a single login
+        """
+        client = ClientSync(email="test@example.com", password="password", network=self.network, lazy=True)
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            balances = list(executor.map(lambda _: client.get_balance(), range(20)))
+
+        client.close()
+        self.assertEqual(balances, [1000] * 20)
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests for the request metrics
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import Endpoint  # noqa: E402
+from eskiz.metrics import Histogram, MetricsRegistry, PrometheusExporter  # noqa: E402
+from eskiz.retry import RetryPolicy  # noqa: E402
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    Test cases for the latency histogram
+    """
+    def test_buckets(self):
+        """
+        Test observations fall in the first bucket whose bound holds them
+        """
+        histogram = Histogram((0.1, 0.5, 1.0))
+        for value in (0.05, 0.1, 0.3, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 0, 1])
+        self.assertEqual(histogram.cumulative(), [2, 3, 3, 4])
+        self.assertAlmostEqual(histogram.sum, 2.45)
+
+    def test_quantile(self):
+        """
+        Test quantiles are interpolated within their bucket
+        """
+        histogram = Histogram((0.1, 0.2))
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for _ in range(10):
+            histogram.observe(0.15)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.15)
+        histogram.observe(5.0)
+        self.assertEqual(histogram.quantile(1.0), 0.2)
+
+
+class TestPrometheusExporter(unittest.TestCase):
+    """
+    Test cases for the Prometheus text format
+    """
+    def test_render(self):
+        """
+        Test each family is rendered with escaped labels and cumulative buckets
+        """
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.start_request("/api/a")
+        registry.finish_request("/api/a", "GET", "200", 0.05, 10, 200)
+        registry.start_request('/api/"b"')
+        registry.record_retry("/api/a", "503")
+        registry.record_refresh()
+
+        text = PrometheusExporter(registry, namespace="sms").render()
+        self.assertIn('sms_requests_total{endpoint="/api/a",method="GET",status="200"} 1\n', text)
+        self.assertIn('sms_request_duration_seconds_bucket{endpoint="/api/a",le="0.1"} 1\n', text)
+        self.assertIn('sms_request_duration_seconds_bucket{endpoint="/api/a",le="+Inf"} 1\n', text)
+        self.assertIn('sms_request_duration_seconds_count{endpoint="/api/a"} 1\n', text)
+        self.assertIn('sms_response_bytes_total{endpoint="/api/a"} 200\n', text)
+        self.assertIn('sms_requests_in_flight{endpoint="/api/\\"b\\""} 1\n', text)
+        self.assertIn('sms_retries_total{endpoint="/api/a",reason="503"} 1\n', text)
+        self.assertIn("# TYPE sms_token_refreshes_total counter\nsms_token_refreshes_total 1\n", text)
+
+
+class TestClientMetrics(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients report their requests to the metrics
+    """
+    def setUp(self):
+        """
+        Clear injected faults
+        """
+        self.httpd.faults.clear()
+
+    def test_sync(self):
+        """
+        Test latencies, statuses, sizes, retries, refreshes and logins are recorded
+        """
+        metrics = MetricsRegistry()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="expired_token",
+            metrics=metrics, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0.01),
+        ) as client:
+            self.assertEqual(client.get_balance(), 1000)
+            self.httpd.faults.append((503, None))
+            client.get_templates()
+            client.login()
+
+        snapshot = metrics.snapshot()
+        limit = Endpoint.GET_LIMIT.value
+        self.assertEqual(snapshot["requests"][(limit, "GET", "401")], 1)
+        self.assertEqual(snapshot["requests"][(limit, "GET", "200")], 1)
+        self.assertEqual(snapshot["requests"][(Endpoint.TEMPLATES.value, "GET", "503")], 1)
+        self.assertEqual(snapshot["retries"], {(Endpoint.TEMPLATES.value, "503"): 1})
+        self.assertEqual(snapshot["latency"][limit].count, 2)
+        self.assertGreater(snapshot["received_bytes"][limit], 0)
+        self.assertGreater(snapshot["sent_bytes"][Endpoint.LOGIN.value], 0)
+        self.assertEqual(snapshot["in_flight"][limit], 0)
+        self.assertEqual((snapshot["refreshes"], snapshot["logins"]), (1, 1))
+
+    def test_connection_error(self):
+        """
+        Test failures without a response are recorded under the error name
+        """
+        metrics = MetricsRegistry()
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            metrics=metrics,
+        ) as client:
+            self.httpd.faults.append((None, None))
+            with self.assertRaises(Exception):
+                client.get_templates()
+
+        self.assertEqual(
+            metrics.snapshot()["requests"], {(Endpoint.TEMPLATES.value, "GET", "ConnectionError"): 1}
+        )
+
+    async def test_async(self):
+        """
+        Test the async client records the same metrics
+        """
+        metrics = MetricsRegistry()
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="expired_token",
+            metrics=metrics, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0.01),
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+            self.httpd.faults.append((503, None))
+            await client.get_templates()
+            await client.send_sms(998901234567, "Hello")
+
+        snapshot = metrics.snapshot()
+        limit = Endpoint.GET_LIMIT.value
+        self.assertEqual(snapshot["requests"][(limit, "GET", "401")], 1)
+        self.assertEqual(snapshot["requests"][(Endpoint.REFRESH.value, "PATCH", "200")], 1)
+        self.assertEqual(snapshot["requests"][(Endpoint.SEND_SMS.value, "POST", "200")], 1)
+        self.assertEqual(snapshot["retries"], {(Endpoint.TEMPLATES.value, "503"): 1})
+        self.assertGreater(snapshot["sent_bytes"][Endpoint.SEND_SMS.value], 0)
+        self.assertGreater(snapshot["received_bytes"][Endpoint.SEND_SMS.value], 0)
+        self.assertEqual(snapshot["refreshes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the user message paginator
+"""
+import os
+import sys
+import threading
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin, make_message_result  # noqa: E402
+from eskiz.client import paginate  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.response import MessageData  # noqa: E402
+
+
+def make_page(number, last_page):
+    """
+    Build a page holding a single message
+    """
+    return MessageData(
+        current_page=number, path="/", first_page_url="/", last_page_url="/", per_page=1,
+        last_page=last_page, to=number, total=last_page, links=[],
+        result=[make_message_result(number)], **{"from": number},
+    )
+
+
+class TestIterPages(unittest.TestCase):
+    """
+    Test cases for the page iteration helpers
+    """
+    def test_order_and_prefetch_bound(self):
+        """
+        Test pages come back in order with at most `prefetch` fetches running
+        """
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def fetch(number):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            try:
+                return make_page(number, 30)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        pages = [page.current_page for page in paginate.iter_pages(fetch, prefetch=3)]
+        self.assertEqual(pages, list(range(1, 31)))
+        self.assertLessEqual(running[1], 3)
+
+    def test_without_prefetch(self):
+        """
+        Test prefetch=0 fetches one page at a time
+        """
+        pages = list(paginate.iter_pages(lambda number: make_page(number, 3), prefetch=0))
+        self.assertEqual([page.current_page for page in pages], [1, 2, 3])
+
+
+class TestIterUserMessages(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients stream every message of a range from the mock server
+    """
+    def setUp(self):
+        """
+        Serve 1050 generated messages
+        """
+        self.httpd.hits.clear()
+        self.httpd.user_messages = 1050
+
+    def tearDown(self):
+        """
+        Restore the fixed get-user-messages response
+        """
+        self.httpd.user_messages = None
+
+    def test_sync(self):
+        """
+        Test the sync client yields every message once, in order
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            ids = [message.id for message in client.iter_user_messages(
+                "2023-01-01 00:00", "2023-01-31 23:59", page_size="100", prefetch=4
+            )]
+
+        self.assertEqual(ids, list(range(1, 1051)))
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/get-user-messages"], 11)
+
+    def test_sync_stop_early(self):
+        """
+        Test stopping after the first page does not fetch the whole range
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            messages = client.iter_user_messages("2023-01-01 00:00", "2023-01-31 23:59", page_size="10")
+            self.assertEqual(next(messages).id, 1)
+            messages.close()
+
+        self.assertLessEqual(self.httpd.hits["GET /api/message/sms/get-user-messages"], 1 + paginate.DEFAULT_PREFETCH)
+
+    async def test_async(self):
+        """
+        Test the async client yields every message once, in order
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            ids = [message.id async for message in client.iter_user_messages(
+                "2023-01-01 00:00", "2023-01-31 23:59", page_size="100", prefetch=4
+            )]
+
+        self.assertEqual(ids, list(range(1, 1051)))
+        self.assertEqual(self.httpd.hits["GET /api/message/sms/get-user-messages"], 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Tests for phone number normalization
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.exception import InvalidPhoneNumber  # noqa: E402
+from eskiz.phone import (  # noqa: E402
+    iter_normalized_messages, normalize_batch, normalize_messages, normalize_number, normalize_numbers
+)
+from eskiz.request import BatchSMSMessage  # noqa: E402
+
+
+class TestNormalizeNumbers(unittest.TestCase):
+    """
+    Test cases for the batch normalizer
+    """
+    def test_formats(self):
+        """
+        Test common local and international formats become E.164 integers
+        """
+        raw = [
+            "+998 90 123-45-67", "998901234567", "0901234567", "(90) 123 45 67",
+            998901234567, "8 90 1234567", "00998901234567", "90 123 45 67",
+        ]
+        numbers, rejected = normalize_numbers(raw)
+        self.assertEqual(numbers, [998901234567] * len(raw))
+        self.assertEqual(rejected, [False] * len(raw))
+
+    def test_rejection_mask(self):
+        """
+        Test invalid numbers are 0 and masked, aligned with the input
+        """
+        raw = ["901234567", "", "123", "+1 202 555 0123", "abc", "99890123456", "9989012345678", None, "٩٠١٢٣٤٥٦٧"]
+        numbers, rejected = normalize_numbers(iter(raw))
+        self.assertEqual(numbers, [998901234567] + [0] * 8)
+        self.assertEqual(rejected, [False] + [True] * 8)
+
+    def test_line_break_in_number(self):
+        """
+        Test a number holding a line break does not shift the others
+        """
+        numbers, rejected = normalize_numbers(["90 123\n4567", "901234567"])
+        self.assertEqual(numbers, [0, 998901234567])
+        self.assertEqual(rejected, [True, False])
+
+    def test_other_country(self):
+        """
+        Test the country code and national length are configurable
+        """
+        numbers, _ = normalize_numbers(
+            ["+1 (202) 555-0123", "2025550123", "012025550123"], country_code=1, national_length=10, trunk_prefixes=""
+        )
+        self.assertEqual(numbers, [12025550123, 12025550123, 0])
+
+    def test_matches_single_number(self):
+        """
+        Test the batch pass agrees with normalizing each number alone
+        """
+        raw = ["+998 90 123-45-67", "0901234567", "x", "", "998", "+998", "98901234567", "00998901234567"]
+        expected = []
+        for number in raw:
+            try:
+                expected.append(normalize_number(number))
+            except InvalidPhoneNumber:
+                expected.append(0)
+        self.assertEqual(normalize_numbers(raw).numbers, expected)
+        self.assertEqual(normalize_numbers([]), ([], []))
+
+        with self.assertRaises(InvalidPhoneNumber) as context:
+            normalize_number("12345")
+        self.assertEqual(context.exception.numbers, ["12345"])
+
+
+class TestNormalizeMessages(unittest.TestCase):
+    """
+    Test cases for normalizing batch messages
+    """
+    def test_normalize_messages(self):
+        """
+        Test accepted messages are rewritten and rejected ones returned unchanged
+        """
+        bad = {"user_sms_id": "2", "to": "12345", "text": "b"}
+        accepted, rejected = normalize_messages([
+            {"user_sms_id": "1", "to": "+998 90 123 45 67", "text": "a"},
+            bad,
+            BatchSMSMessage(user_sms_id="3", to=901234568, text="c"),
+        ])
+        self.assertEqual(accepted, [
+            {"user_sms_id": "1", "to": 998901234567, "text": "a"},
+            {"user_sms_id": "3", "to": 998901234568, "text": "c"},
+        ])
+        self.assertEqual(rejected, [bad])
+
+    def test_normalize_batch(self):
+        """
+        Test a batch with only invalid numbers raises
+        """
+        with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+            self.assertEqual(len(normalize_batch([
+                {"user_sms_id": "1", "to": "901234567", "text": "a"},
+                {"user_sms_id": "2", "to": "1", "text": "b"},
+            ])), 1)
+        with self.assertRaises(InvalidPhoneNumber):
+            normalize_batch([{"user_sms_id": "1", "to": "1", "text": "a"}])
+
+    def test_iter_normalized_messages(self):
+        """
+        Test a stream is normalized lazily in windows
+        """
+        messages = ({"user_sms_id": str(i), "to": f"90 {i:07d}" if i % 3 else "bad", "text": "a"} for i in range(10))
+        with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+            accepted = list(iter_normalized_messages(messages, window=4))
+        self.assertEqual([message["user_sms_id"] for message in accepted], ["1", "2", "4", "5", "7", "8"])
+        self.assertEqual(accepted[0]["to"], 998900000001)
+
+
+class TestClientNormalization(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients normalize numbers before building batch requests
+    """
+    MESSAGES = [
+        {"user_sms_id": "1", "to": "+998 (90) 123-45-67", "text": "a"},
+        {"user_sms_id": "2", "to": "not a number", "text": "b"},
+    ]
+
+    def test_sync(self):
+        """
+        Test the sync client sends only the normalized valid numbers
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+                client.send_batch_sms(self.MESSAGES, normalize=True)
+            self.assertEqual(self.httpd.last_form["messages"], [{"user_sms_id": "1", "to": 998901234567, "text": "a"}])
+
+            with self.assertRaises(InvalidPhoneNumber):
+                client.send_batch_sms(self.MESSAGES[1:], normalize=True)
+
+            with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+                responses = list(client.send_bulk(iter(self.MESSAGES * 3), chunk_size=2, normalize=True))
+            self.assertEqual(len(responses), 2)
+
+    async def test_async(self):
+        """
+        Test the async client sends only the normalized valid numbers
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+                await client.send_batch_sms(self.MESSAGES, normalize=True)
+            self.assertEqual(self.httpd.last_form["messages"], [{"user_sms_id": "1", "to": 998901234567, "text": "a"}])
+
+            with self.assertLogs("eskiz.phone.normalize", "WARNING"):
+                responses = [response async for response in client.send_bulk(self.MESSAGES * 3, normalize=True)]
+            self.assertEqual(len(responses), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
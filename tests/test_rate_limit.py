@@ -0,0 +1,173 @@
+"""
+Tests for the client-side rate limiters
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import Endpoint  # noqa: E402
+from eskiz.exception import RateLimitExceeded  # noqa: E402
+from eskiz.ratelimit import FileRateLimiter, InMemoryRateLimiter, TokenBucket  # noqa: E402
+
+
+class TestInMemoryRateLimiter(unittest.TestCase):
+    """
+    Test cases for the in-process token bucket
+    """
+    def test_burst_then_fail_fast(self):
+        """
+        Test the burst is allowed and the next request is rejected
+        """
+        limiter = InMemoryRateLimiter(rate=1, burst=3, blocking=False)
+        for _ in range(3):
+            limiter.acquire(Endpoint.SEND_SMS)
+
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            limiter.acquire(Endpoint.SEND_SMS)
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+    def test_blocking_waits_for_refill(self):
+        """
+        Test a blocking limiter waits for a token
+        """
+        limiter = InMemoryRateLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        limiter.acquire(Endpoint.SEND_SMS)
+        limiter.acquire(Endpoint.SEND_SMS)
+        self.assertGreaterEqual(time.monotonic() - started, 0.015)
+
+    def test_max_wait(self):
+        """
+        Test a blocking limiter gives up after max_wait
+        """
+        limiter = InMemoryRateLimiter(rate=0.1, burst=1, max_wait=0.5)
+        limiter.acquire(Endpoint.SEND_SMS)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(Endpoint.SEND_SMS)
+
+    def test_endpoint_budget(self):
+        """
+        Test per-endpoint budgets do not affect other endpoints
+        """
+        limiter = InMemoryRateLimiter(
+            endpoint_limits={Endpoint.GET_LIMIT: TokenBucket(rate=1, burst=1)},
+            blocking=False,
+        )
+        limiter.acquire(Endpoint.GET_LIMIT)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(Endpoint.GET_LIMIT)
+
+        for _ in range(10):
+            limiter.acquire(Endpoint.SEND_SMS)
+
+    def test_acquire_async(self):
+        """
+        Test the async acquire honours the burst
+        """
+        limiter = InMemoryRateLimiter(rate=1, burst=1, blocking=False)
+
+        async def run():
+            await limiter.acquire_async(Endpoint.SEND_SMS)
+            await limiter.acquire_async(Endpoint.SEND_SMS)
+
+        with self.assertRaises(RateLimitExceeded):
+            asyncio.run(run())
+
+
+class TestFileRateLimiter(unittest.TestCase):
+    """
+    Test cases for the file-backed token bucket
+    """
+    def test_shared_quota(self):
+        """
+        Test two limiters on the same file share one quota
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "eskiz.ratelimit")
+            first = FileRateLimiter(path, rate=1, burst=2, blocking=False)
+            second = FileRateLimiter(path, rate=1, burst=2, blocking=False)
+
+            first.acquire(Endpoint.SEND_SMS)
+            second.acquire(Endpoint.SEND_SMS)
+            with self.assertRaises(RateLimitExceeded):
+                first.acquire(Endpoint.SEND_SMS)
+
+    def test_acquire_async_off_loop(self):
+        """
+        Test acquire_async waits for a file locked by another process without blocking the event loop
+        """
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        async def main(path):
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            ticker = asyncio.ensure_future(tick())
+            threading.Timer(0.2, os.close, (fd,)).start()
+            await FileRateLimiter(path, rate=10).acquire_async(Endpoint.SEND_SMS)
+            ticker.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(main(os.path.join(directory, "eskiz.ratelimit")))
+        self.assertGreater(len(ticks), 10)
+
+
+class TestRateLimitedClients(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients consult the rate limiter
+    """
+    def test_sync_client(self):
+        """
+        Test the sync client fails fast once the budget is spent
+        """
+        limiter = InMemoryRateLimiter(
+            endpoint_limits={Endpoint.GET_LIMIT: TokenBucket(rate=0.1, burst=2)},
+            blocking=False,
+        )
+        client = ClientSync(
+            email="test@example.com", password="password", network=self.network, rate_limiter=limiter
+        )
+        self.assertEqual(client.get_balance(), 1000)
+        self.assertEqual(client.get_balance(), 1000)
+        with self.assertRaises(RateLimitExceeded):
+            client.get_balance()
+        client.close()
+
+    async def test_async_client(self):
+        """
+        Test the async client fails fast once the budget is spent
+        """
+        limiter = InMemoryRateLimiter(
+            endpoint_limits={Endpoint.GET_LIMIT: TokenBucket(rate=0.1, burst=2)},
+            blocking=False,
+        )
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, rate_limiter=limiter
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+            self.assertEqual(await client.get_balance(), 1000)
+            with self.assertRaises(RateLimitExceeded):
+                await client.get_balance()
+
+
+if __name__ == "__main__":
+    unittest.main()
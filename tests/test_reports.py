@@ -0,0 +1,124 @@
+"""
+Tests for the report methods and their fan-out
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.cache import InMemoryCache  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.client.reports import fan_out, month_range, months_between  # noqa: E402
+
+
+class TestReportHelpers(unittest.TestCase):
+    """
+    Test cases for the month helpers and the thread pool fan-out
+    """
+    def test_months(self):
+        """
+        Test month lists cross years and month ranges end on the last day
+        """
+        self.assertEqual(months_between("2024-11", "2025-02"), [(2024, 11), (2024, 12), (2025, 1), (2025, 2)])
+        self.assertEqual(months_between("2025-03", "2025-02"), [])
+        self.assertEqual(month_range(2024, 2), ("2024-02-01 00:00", "2024-02-29 23:59"))
+
+    def test_fan_out(self):
+        """
+        Test results keep the order of the distinct keys and failures are raised
+        """
+        self.assertEqual(fan_out(lambda key: key * 2, [3, 1, 3, 2]), {3: 6, 1: 2, 2: 4})
+        self.assertEqual(fan_out(lambda key: key, []), {})
+
+        def fail(key):
+            raise ValueError(key)
+
+        with self.assertRaises(ValueError):
+            fan_out(fail, [1, 2])
+
+
+class TestReports(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients' report methods against the mock server
+    """
+    def setUp(self):
+        """
+        Reset the request counts and report concurrency
+        """
+        self.httpd.hits.clear()
+        self.httpd.report_delay = 0
+        self.httpd.peak_reports_in_flight = 0
+
+    def client(self, **kwargs):
+        """
+        Create a sync client for the mock server
+        """
+        return ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345", **kwargs
+        )
+
+    def test_single_reports(self):
+        """
+        Test each report endpoint is parsed into its response model
+        """
+        with self.client() as client:
+            totals = client.get_totals_by_range("2025-03-01 00:00", "2025-03-31 23:59", status="delivered")
+            self.assertEqual(totals.data.total_spent, 1650)
+            self.assertEqual(self.httpd.last_form["start_date"], "2025-03-01 00:00")
+            self.assertEqual(client.get_totals_by_dispatch("7").data.parts, 70)
+            user_totals = client.get_user_totals("2025", "4")
+            self.assertEqual(user_totals.data[0].sent_packets, 400)
+
+    def test_monthly_totals(self):
+        """
+        Test months are fetched concurrently, within the worker bound, and summed
+        """
+        self.httpd.report_delay = 0.05
+        with self.client() as client:
+            summary = client.get_monthly_totals(months_between("2024-10", "2025-03"), max_workers=3)
+
+        self.assertEqual(list(summary.by_key), [(2024, 10), (2024, 11), (2024, 12), (2025, 1), (2025, 2), (2025, 3)])
+        self.assertEqual(summary.by_key[(2024, 12)].parts, 120)
+        self.assertEqual(summary.totals.parts, (10 + 11 + 12 + 1 + 2 + 3) * 10)
+        self.assertEqual(summary.totals.total_spent, (10 + 11 + 12 + 1 + 2 + 3) * 550)
+        self.assertGreater(self.httpd.peak_reports_in_flight, 1)
+        self.assertLessEqual(self.httpd.peak_reports_in_flight, 3)
+
+    def test_cached_reports(self):
+        """
+        Test cached totals are reused until a send changes them
+        """
+        with self.client(cache=InMemoryCache()) as client:
+            client.get_dispatch_totals(["1", "2"])
+            client.get_dispatch_totals(["2", "3"])
+            self.assertEqual(self.httpd.hits["POST /api/report/total-by-dispatch"], 3)
+
+            client.send_sms(998901234567, "Hello")
+            client.get_totals_by_dispatch("1")
+            self.assertEqual(self.httpd.hits["POST /api/report/total-by-dispatch"], 4)
+
+    async def test_async(self):
+        """
+        Test the async client fetches and merges dispatch totals concurrently
+        """
+        self.httpd.report_delay = 0.05
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            summary = await client.get_dispatch_totals(["1", "2", "3", "4"], max_workers=2)
+            user_totals = await client.get_user_totals("2025", "1")
+            monthly = await client.get_monthly_totals([(2025, 1), (2025, 2)])
+
+        self.assertEqual(list(summary.by_key), ["1", "2", "3", "4"])
+        self.assertEqual(summary.totals.ad_parts, 10)
+        self.assertEqual(self.httpd.peak_reports_in_flight, 2)
+        self.assertEqual(user_totals.data[0].packets, 1000)
+        self.assertEqual(monthly.totals.spent, 1500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Tests for the retry policy
+"""
+import os
+import sys
+import unittest
+from email.utils import formatdate
+
+from requests.exceptions import HTTPError
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.retry import RetryPolicy, parse_retry_after  # noqa: E402
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Test cases for the retry decisions and delays
+    """
+    def test_backoff_without_jitter(self):
+        """
+        Test delays grow exponentially up to the cap
+        """
+        policy = RetryPolicy(backoff_base=1, backoff_cap=5, jitter=False)
+        self.assertEqual([policy.backoff(attempt) for attempt in range(1, 5)], [1, 2, 4, 5])
+
+    def test_backoff_with_jitter(self):
+        """
+        Test jittered delays stay below the backoff delay
+        """
+        policy = RetryPolicy(backoff_base=1, backoff_cap=5)
+        self.assertTrue(all(0 <= policy.backoff(3) <= 4 for _ in range(100)))
+
+    def test_retry_after(self):
+        """
+        Test Retry-After takes precedence and is capped
+        """
+        policy = RetryPolicy(max_retry_after=10)
+        self.assertEqual(policy.backoff(1, retry_after=3), 3)
+        self.assertEqual(policy.backoff(1, retry_after=60), 10)
+
+    def test_parse_retry_after(self):
+        """
+        Test seconds and HTTP dates are parsed
+        """
+        self.assertEqual(parse_retry_after("7"), 7)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertAlmostEqual(parse_retry_after(formatdate(0, usegmt=True)), 0)
+
+    def test_idempotency(self):
+        """
+        Test POST is only retried when the request was not processed
+        """
+        policy = RetryPolicy()
+        self.assertTrue(policy.should_retry_status("GET", 503, 1))
+        self.assertFalse(policy.should_retry_status("POST", 503, 1))
+        self.assertTrue(policy.should_retry_status("POST", 429, 1))
+        self.assertFalse(policy.should_retry_status("GET", 400, 1))
+        self.assertTrue(policy.should_retry_error("POST", False, 1))
+        self.assertFalse(policy.should_retry_error("POST", True, 1))
+
+    def test_max_attempts(self):
+        """
+        Test retries stop after max_attempts and are counted as exhausted
+        """
+        policy = RetryPolicy(max_attempts=2)
+        self.assertTrue(policy.should_retry_status("GET", 503, 1))
+        self.assertFalse(policy.should_retry_status("GET", 503, 2))
+        self.assertEqual(policy.stats.exhausted, 1)
+
+
+class TestRetryWithMockServer(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients retry transient failures from the mock server
+    """
+    def setUp(self):
+        """
+        Set up a fast retry policy
+        """
+        self.httpd.faults.clear()
+        self.policy = RetryPolicy(max_attempts=3, backoff_base=0.01)
+
+    def make_client(self):
+        """
+        Create a sync client that does not need to log in
+        """
+        return ClientSync(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token="mock_token_12345",
+            retry_policy=self.policy,
+        )
+
+    def test_sync_retries_5xx(self):
+        """
+        Test the sync client recovers from two 503 responses
+        """
+        self.httpd.faults.extend([(503, None), (503, None)])
+        with self.make_client() as client:
+            self.assertEqual(client.get_balance(), 1000)
+        self.assertEqual(self.policy.stats.retries, 2)
+        self.assertEqual(self.policy.stats.by_reason, {"503": 2})
+
+    def test_sync_gives_up(self):
+        """
+        Test the sync client raises once attempts are exhausted
+        """
+        self.httpd.faults.extend([(503, None)] * 3)
+        with self.make_client() as client:
+            with self.assertRaises(HTTPError):
+                client.get_balance()
+        self.assertEqual(self.policy.stats.exhausted, 1)
+
+    def test_sync_does_not_repeat_send(self):
+        """
+        Test a 5xx on send_sms is not retried
+        """
+        self.httpd.faults.append((503, None))
+        with self.make_client() as client:
+            with self.assertRaises(HTTPError):
+                client.send_sms(998901234567, "Test message")
+        self.assertEqual(self.policy.stats.retries, 0)
+
+    def test_sync_retries_429_send(self):
+        """
+        Test a 429 on send_sms is retried after Retry-After
+        """
+        self.httpd.faults.append((429, {"Retry-After": "0"}))
+        with self.make_client() as client:
+            response = client.send_sms(998901234567, "Test message")
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(self.policy.stats.by_reason, {"429": 1})
+
+    def test_sync_retries_dropped_connection(self):
+        """
+        Test a dropped connection on a GET is retried
+        """
+        self.httpd.faults.append((None, None))
+        with self.make_client() as client:
+            self.assertEqual(client.get_balance(), 1000)
+        self.assertEqual(self.policy.stats.retries, 1)
+
+    async def test_async_retries_5xx(self):
+        """
+        Test the async client recovers from two 503 responses
+        """
+        self.httpd.faults.extend([(503, None), (502, None)])
+        async with AsyncClient(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token="mock_token_12345",
+            retry_policy=self.policy,
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+        self.assertEqual(self.policy.stats.by_reason, {"503": 1, "502": 1})
+
+    async def test_async_retries_multipart_send(self):
+        """
+        Test a retried async send_sms sends its form again, after a 429 and after a 401
+        """
+        self.httpd.faults.append((429, {"Retry-After": "0"}))
+        async with AsyncClient(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token="mock_token_12345",
+            retry_policy=self.policy,
+        ) as client:
+            response = await client.send_sms(998901234567, "Test message")
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(self.policy.stats.by_reason, {"429": 1})
+        self.assertEqual(self.httpd.last_form["message"], "Test message")
+
+        self.httpd.last_form = None
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="expired_token"
+        ) as client:
+            response = await client.send_sms(998901234567, "Test message")
+        self.assertEqual(response.id, "mock-message-id-12345")
+        self.assertEqual(self.httpd.last_form["message"], "Test message")
+
+
+if __name__ == "__main__":
+    unittest.main()
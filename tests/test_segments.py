@@ -0,0 +1,150 @@
+"""
+Tests for the segment calculator
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.enum import Encoding  # noqa: E402
+from eskiz.segments import (  # noqa: E402
+    GSM7_BASIC, GSM7_EXTENDED, analyze, count_parts, count_batch_parts, estimate_cost, unicode_flag
+)
+
+
+def count_parts_loop(text):
+    """
+    Reference counter checking one character at a time
+    """
+    if all(char in GSM7_BASIC or char in GSM7_EXTENDED for char in text):
+        septets = sum(2 if char in GSM7_EXTENDED else 1 for char in text)
+        return 1 if septets <= 160 else -(-septets // 153)
+    units = len(text.encode("utf-16-le")) // 2
+    return 1 if units <= 70 else -(-units // 67)
+
+
+class TestAnalyze(unittest.TestCase):
+    """
+    Test cases for the single message calculator
+    """
+    def test_gsm7(self):
+        """
+        Test GSM-7 text is split into 153-septet parts above 160 septets
+        """
+        self.assertEqual(analyze("a" * 160), (Encoding.GSM7, 160, 1))
+        self.assertEqual(analyze("a" * 161), (Encoding.GSM7, 161, 2))
+        self.assertEqual(count_parts("a" * 306), 2)
+        self.assertEqual(count_parts("a" * 307), 3)
+
+    def test_non_ascii_gsm7(self):
+        """
+        Test Greek and accented letters of the GSM-7 alphabet stay GSM-7
+        """
+        self.assertEqual(analyze("ΔΦΓ èé Ñ" * 20), (Encoding.GSM7, 160, 1))
+
+    def test_extended_characters_take_two_septets(self):
+        """
+        Test characters of the extension table count twice
+        """
+        self.assertEqual(analyze("€" * 80), (Encoding.GSM7, 160, 1))
+        self.assertEqual(analyze("{" * 81), (Encoding.GSM7, 162, 2))
+
+    def test_extended_character_not_split(self):
+        """
+        Test an extension character is moved to the next part instead of
+        being split from its escape
+        """
+        self.assertEqual(analyze("a" * 152 + "[" + "a" * 152), (Encoding.GSM7, 306, 3))
+
+    def test_ucs2(self):
+        """
+        Test Cyrillic text is sent as UCS-2 in 67-unit parts above 70 units
+        """
+        self.assertEqual(analyze("Салом" * 14), (Encoding.UCS2, 70, 1))
+        self.assertEqual(analyze("Салом" * 15), (Encoding.UCS2, 75, 2))
+        self.assertEqual(analyze("Hello `world`").encoding, Encoding.UCS2)
+
+    def test_surrogate_pairs(self):
+        """
+        Test characters outside the BMP take two units and are not split
+        """
+        self.assertEqual(analyze("😀" * 35), (Encoding.UCS2, 70, 1))
+        self.assertEqual(analyze("a" * 66 + "😀" + "a" * 66), (Encoding.UCS2, 134, 3))
+
+    def test_matches_reference(self):
+        """
+        Test the table-driven counter agrees with a per-character count
+        """
+        texts = [
+            "", "Hello", "Your code is 123456", "x" * 500, "Ўзбекистон", "Hello, Салом",
+            "price: 10€", "{name}" * 40, "tab\there", "ÄÖÑÜ§¿" * 30, "ğış" * 10,
+        ]
+        for text in texts:
+            self.assertEqual(count_parts(text), count_parts_loop(text), text)
+
+    def test_unicode_flag(self):
+        """
+        Test the unicode flag follows the encoding
+        """
+        self.assertEqual(unicode_flag("Hello"), "0")
+        self.assertEqual(unicode_flag("Héllo Δ"), "0")
+        self.assertEqual(unicode_flag("Салом"), "1")
+        self.assertEqual(unicode_flag("Ali Салом"), "1")
+        self.assertEqual(analyze("Салом").unicode_flag, "1")
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test cases for the batch helpers
+    """
+    def test_estimate_cost(self):
+        """
+        Test a batch is totalled per encoding
+        """
+        texts = ["Hello"] * 3 + ["Салом" * 15] * 2
+        self.assertEqual(estimate_cost(texts, part_price=50), (5, 7, 3, 2, 350))
+        self.assertEqual(estimate_cost(iter(texts)).parts, count_batch_parts(texts))
+
+    def test_empty_batch(self):
+        """
+        Test an empty batch costs nothing
+        """
+        self.assertEqual(estimate_cost([]), (0, 0, 0, 0, 0))
+
+
+class TestGlobalUnicodeFlag(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients pick the unicode flag of global messages from the text
+    """
+    def test_sync(self):
+        """
+        Test the sync client sends Cyrillic text with unicode=1
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            client.send_global_sms("12025550123", "Салом", "US")
+            self.assertEqual(self.httpd.last_form["unicode"], "1")
+            client.send_global_sms("12025550123", "Hello", "US")
+            self.assertEqual(self.httpd.last_form["unicode"], "0")
+            client.send_global_sms("12025550123", "Hello", "US", unicode="1")
+            self.assertEqual(self.httpd.last_form["unicode"], "1")
+
+    async def test_async(self):
+        """
+        Test the async client sends Cyrillic text with unicode=1
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            await client.send_global_sms("12025550123", "Салом", "US")
+            self.assertEqual(self.httpd.last_form["unicode"], "1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests for the date-range sharded downloader
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client import shard  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+
+START_DATE = "2023-01-01 00:00"
+END_DATE = "2023-01-01 05:49"
+
+
+class TestSplitRange(unittest.TestCase):
+    """
+    Test cases for splitting a date range
+    """
+    def test_split(self):
+        """
+        Test shards cover the range and share their boundaries
+        """
+        self.assertEqual(shard.split_range("2023-01-01 00:00", "2023-01-01 03:00", 3), [
+            ("2023-01-01 00:00", "2023-01-01 01:00"),
+            ("2023-01-01 01:00", "2023-01-01 02:00"),
+            ("2023-01-01 02:00", "2023-01-01 03:00"),
+        ])
+
+    def test_short_range(self):
+        """
+        Test a range shorter than the shard count is not split per second
+        """
+        self.assertEqual(len(shard.split_range("2023-01-01 00:00", "2023-01-01 00:02", 8)), 2)
+        self.assertEqual(shard.split_range(START_DATE, START_DATE, 8), [(START_DATE, START_DATE)])
+
+
+class TestDownloadUserMessages(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test both clients download a range over shards without gaps or duplicates
+    """
+    def setUp(self):
+        """
+        Serve 1050 generated messages, three per minute
+        """
+        self.httpd.user_messages = 1050
+
+    def tearDown(self):
+        """
+        Restore the fixed get-user-messages response
+        """
+        self.httpd.user_messages = None
+
+    def make_client(self):
+        """
+        Create a sync client that does not need to log in
+        """
+        return ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        )
+
+    def test_sync_ordered(self):
+        """
+        Test ordered shards yield every message once, in order
+        """
+        with self.make_client() as client:
+            ids = [message.id for message in client.download_user_messages(
+                START_DATE, END_DATE, shards=7, page_size="50"
+            )]
+        self.assertEqual(ids, list(range(1, 1051)))
+
+    def test_sync_as_completed(self):
+        """
+        Test unordered shards yield every message once
+        """
+        with self.make_client() as client:
+            ids = [message.id for message in client.download_user_messages(
+                START_DATE, END_DATE, shards=7, ordered=False, page_size="50"
+            )]
+        self.assertEqual(sorted(ids), list(range(1, 1051)))
+
+    def test_sync_stop_early(self):
+        """
+        Test closing the iterator stops the workers
+        """
+        with self.make_client() as client:
+            messages = client.download_user_messages(START_DATE, END_DATE, shards=7, page_size="10")
+            self.assertEqual(next(messages).id, 1)
+            messages.close()
+
+    async def test_async(self):
+        """
+        Test the async client yields every message once, in order
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            ids = [message.id async for message in client.download_user_messages(
+                START_DATE, END_DATE, shards=7, page_size="50"
+            )]
+            unordered = [message.id async for message in client.download_user_messages(
+                START_DATE, END_DATE, shards=7, ordered=False, page_size="50"
+            )]
+        self.assertEqual(ids, list(range(1, 1051)))
+        self.assertEqual(sorted(unordered), list(range(1, 1051)))
+
+
+if __name__ == "__main__":
+    unittest.main()
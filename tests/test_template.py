@@ -0,0 +1,192 @@
+"""
+Tests for the template engine
+"""
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.exception import TemplateMismatch  # noqa: E402
+from eskiz.template import AsyncTemplateRegistry, CompiledTemplate, TemplateRegistry  # noqa: E402
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    """
+    Test cases for compiling and rendering one template
+    """
+    def setUp(self):
+        """
+        Compile a template with a repeated placeholder and a literal %
+        """
+        self.template = CompiledTemplate("Hi {name}, {discount}% off for {name}!", template_id=7)
+
+    def test_render(self):
+        """
+        Test values are substituted at every placeholder
+        """
+        self.assertEqual(self.template.names, ("name", "discount"))
+        self.assertEqual(self.template.render(name="Ali", discount=20), "Hi Ali, 20% off for Ali!")
+
+    def test_render_one_or_no_placeholder(self):
+        """
+        Test templates with a single placeholder or none render their values as is
+        """
+        self.assertEqual(CompiledTemplate("Code: {code}").render(code=(1, 2)), "Code: (1, 2)")
+        self.assertEqual(CompiledTemplate("Welcome!").render(), "Welcome!")
+
+    def test_format(self):
+        """
+        Test format renders like render, without validation, also with numbered placeholders
+        """
+        self.assertEqual(self.template.format(name="Ali", discount=20), "Hi Ali, 20% off for Ali!")
+        self.assertEqual(self.template.format(name="", discount=1), "Hi , 1% off for !")
+        self.assertEqual(CompiledTemplate("{0} {{x}}").format(**{"0": "a", "x": "b"}), "a {b}")
+
+    def test_columns_of_different_lengths(self):
+        """
+        Test columns and recipients of different lengths are rejected instead of truncated
+        """
+        with self.assertRaises(ValueError):
+            self.template.render_batch({"name": ["Ali", "Vali"], "discount": [1]})
+        with self.assertRaises(ValueError):
+            list(self.template.iter_render({"name": ["Ali"], "discount": [1, 2]}))
+        with self.assertRaises(ValueError):
+            list(self.template.iter_messages([998901234567, 998901234568], {"name": ["Ali"], "discount": [1]}))
+        with self.assertRaises(ValueError):
+            list(self.template.iter_messages([998901234567], {"name": ["Ali", "Vali"], "discount": [1, 2]}))
+        with self.assertRaises(ValueError):
+            list(self.template.iter_messages([998901234567], {"name": ["Ali"], "discount": [1]}, ["1", "2"]))
+
+        messages = list(CompiledTemplate("Welcome!").iter_messages([998901234567, 998901234568]))
+        self.assertEqual([message["user_sms_id"] for message in messages], ["1", "2"])
+
+    def test_render_invalid_values(self):
+        """
+        Test missing, empty and multi-line values are rejected
+        """
+        with self.assertRaises(TemplateMismatch):
+            self.template.render(name="Ali")
+        with self.assertRaises(TemplateMismatch):
+            self.template.render(name="", discount=1)
+        with self.assertRaises(TemplateMismatch) as context:
+            self.template.render(name="Ali\nBuy now", discount=1)
+        self.assertEqual(context.exception.template_id, 7)
+
+        self.assertEqual(self.template.render(validate=False, name="", discount=1), "Hi , 1% off for !")
+
+    def test_render_batch(self):
+        """
+        Test columns are rendered row by row, and validated as a whole
+        """
+        texts = self.template.render_batch({"name": ("Ali", "Vali"), "discount": iter([10, 0])})
+        self.assertEqual(texts, ["Hi Ali, 10% off for Ali!", "Hi Vali, 0% off for Vali!"])
+
+        with self.assertRaises(TemplateMismatch):
+            self.template.render_batch({"name": ["Ali", None], "discount": [1, 2]})
+        with self.assertRaises(TemplateMismatch):
+            self.template.render_batch({"name": ["Ali"]})
+
+    def test_iter_render_is_lazy(self):
+        """
+        Test rendering stops at the first invalid row
+        """
+        texts = self.template.iter_render({"name": ["Ali", "", "Vali"], "discount": [1, 2, 3]})
+        self.assertEqual(next(texts), "Hi Ali, 1% off for Ali!")
+        with self.assertRaises(TemplateMismatch):
+            next(texts)
+
+    def test_matches(self):
+        """
+        Test texts are matched against the approved template
+        """
+        self.assertTrue(self.template.matches("Hi Ali, 5% off for Ali!"))
+        self.assertFalse(self.template.matches("Hi Ali, 5% off for Ali! Reply STOP"))
+        self.assertFalse(self.template.matches("Hi , 5% off for Ali!"))
+        with self.assertRaises(TemplateMismatch):
+            self.template.check("Hello Ali")
+
+    def test_iter_messages(self):
+        """
+        Test message dicts are built for the bulk sender
+        """
+        messages = list(CompiledTemplate("Code: {code}").iter_messages(
+            [998901234567, 998901234568], {"code": ["1111", "2222"]}
+        ))
+        self.assertEqual(messages, [
+            {"user_sms_id": "1", "to": 998901234567, "text": "Code: 1111"},
+            {"user_sms_id": "2", "to": 998901234568, "text": "Code: 2222"},
+        ])
+
+        static = list(CompiledTemplate("Welcome!").iter_messages([1, 2, 3], user_sms_ids=["a", "b", "c"]))
+        self.assertEqual([message["user_sms_id"] for message in static], ["a", "b", "c"])
+
+
+class TestTemplateRegistry(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test the registries against the mock server templates
+    """
+    def setUp(self):
+        """
+        Reset the request counts
+        """
+        self.httpd.hits.clear()
+
+    def test_sync(self):
+        """
+        Test templates are fetched once, compiled and fed to send_bulk
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            registry = TemplateRegistry(client, statuses=["active"])
+            template = registry.get(1)
+            self.assertIs(registry.match("Hello, Ali! Welcome to our service."), template)
+            self.assertEqual(registry.get(2).names, ("code",))
+            with self.assertRaises(TemplateMismatch):
+                registry.get(3)
+            with self.assertRaises(TemplateMismatch):
+                registry.match("Buy now!")
+
+            responses = list(client.send_bulk(
+                template.iter_messages(range(998900000000, 998900000010), {"name": [f"user{i}" for i in range(10)]}),
+                chunk_size=5,
+            ))
+
+            # Compiled templates are reused across refreshes
+            registry.refresh()
+            self.assertIs(registry.get(1), template)
+
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(self.httpd.hits["GET /api/user/templates"], 2)
+
+    def test_statuses(self):
+        """
+        Test templates with other statuses are not approved
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            self.assertEqual(TemplateRegistry(client, statuses=["rejected"]).templates(), [])
+
+    async def test_async(self):
+        """
+        Test the async registry fetches and matches templates
+        """
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345"
+        ) as client:
+            registry = AsyncTemplateRegistry(client)
+            template = await registry.match("Your verification code is 123456.")
+            self.assertEqual(template.id, 2)
+            self.assertEqual(len(await registry.templates()), 2)
+
+        self.assertEqual(self.httpd.hits["GET /api/user/templates"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Stress tests for the single-flight token refresh
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.token import decode_expiry  # noqa: E402
+
+
+def make_jwt(exp):
+    """
+    Build an unsigned JWT expiring at `exp`
+    """
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    return f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode({'exp': exp, 'role': 'user'})}.signature"
+
+
+class TestSingleFlightRefresh(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Concurrent 401 responses must trigger exactly one refresh
+    """
+    def setUp(self):
+        """
+        Reset the request counters
+        """
+        self.httpd.hits.clear()
+
+    def test_sync_concurrent_refresh(self):
+        """
+        Test 50 threads sharing an expired token refresh it once
+        """
+        client = ClientSync(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token="expired_token",
+            pool_size=50,
+        )
+
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            balances = list(executor.map(lambda _: client.get_balance(), range(50)))
+
+        client.close()
+        self.assertEqual(balances, [1000] * 50)
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 0)
+        self.assertEqual(client.token, "mock_refreshed_token_12345")
+
+    async def test_async_concurrent_refresh(self):
+        """
+        Test 200 coroutines sharing an expired token refresh it once
+        """
+        async with AsyncClient(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token="expired_token",
+        ) as client:
+            balances = await asyncio.gather(*(client.get_balance() for _ in range(200)))
+
+            self.assertEqual(balances, [1000] * 200)
+            self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+            self.assertEqual(self.httpd.hits["POST /api/auth/login"], 0)
+            self.assertEqual(client.token, "mock_refreshed_token_12345")
+
+
+class TestDecodeExpiry(unittest.TestCase):
+    """
+    Test cases for reading the exp claim
+    """
+    def test_jwt(self):
+        """
+        Test the exp claim of a JWT is decoded
+        """
+        self.assertEqual(decode_expiry(make_jwt(1720854955)), 1720854955)
+
+    def test_invalid_tokens(self):
+        """
+        Test tokens without a readable exp claim
+        """
+        self.assertIsNone(decode_expiry("mock_token_12345"))
+        self.assertIsNone(decode_expiry(""))
+        self.assertIsNone(decode_expiry("a.b.c"))
+
+
+class TestProactiveRenewal(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Tokens close to expiry must be renewed before a request fails with 401
+    """
+    def setUp(self):
+        """
+        Reset the request counters
+        """
+        self.httpd.hits.clear()
+
+    def test_sync_lazy_renewal(self):
+        """
+        Test the sync client renews an expiring token before the next request
+        """
+        now = time.time()
+        with ClientSync(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token=make_jwt(now + 600),
+            token_refresh_margin=120,
+        ) as client:
+            self.assertAlmostEqual(client.token_expires_in, 600, delta=5)
+
+            with patch("eskiz.client.sync.time.time", return_value=now + 500):
+                self.assertEqual(client.get_balance(), 1000)
+
+            self.assertEqual(client.token, "mock_refreshed_token_12345")
+            self.assertIsNone(client.token_expires_in)
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+
+    def test_sync_keeps_fresh_token(self):
+        """
+        Test a token far from expiry is not renewed
+        """
+        token = make_jwt(time.time() + 3600)
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, token=token
+        ) as client:
+            client.get_balance()
+            self.assertEqual(client.token, token)
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 0)
+
+    async def test_async_background_renewal(self):
+        """
+        Test the async client renews the token in the background
+        """
+        async with AsyncClient(
+            email="test@example.com",
+            password="password",
+            network=self.network,
+            token=make_jwt(time.time() + 0.4),
+        ) as client:
+            await asyncio.sleep(0.6)
+
+            self.assertEqual(client.token, "mock_refreshed_token_12345")
+            self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+            self.assertEqual(await client.get_balance(), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,285 @@
+"""
+Tests for the token stores
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from tests.test_token_refresh import make_jwt  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.async_client import AsyncClient  # noqa: E402
+from eskiz.token import FileTokenStore, InMemoryTokenStore, token_key  # noqa: E402
+
+
+class TestTokenStores(unittest.TestCase):
+    """
+    Test cases for the store implementations
+    """
+    def setUp(self):
+        """
+        Create a temporary directory for file stores
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tokens.json")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+        """
+        self.directory.cleanup()
+
+    def test_in_memory(self):
+        """
+        Test get, set and delete
+        """
+        store = InMemoryTokenStore()
+        self.assertIsNone(store.get("key"))
+        store.set("key", "token")
+        self.assertEqual(store.get("key"), "token")
+        store.delete("key")
+        self.assertIsNone(store.get("key"))
+
+    def test_file_shared(self):
+        """
+        Test two file stores on the same path see each other's tokens
+        """
+        FileTokenStore(self.path).set("key", "token")
+        self.assertEqual(FileTokenStore(self.path).get("key"), "token")
+        self.assertEqual(oct(os.stat(self.path).st_mode & 0o777), "0o600")
+
+    def test_file_corrupt(self):
+        """
+        Test a corrupt file is treated as empty and replaced
+        """
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("{not json")
+
+        store = FileTokenStore(self.path)
+        self.assertIsNone(store.get("key"))
+        store.set("key", "token")
+        self.assertEqual(store.get("key"), "token")
+
+    def test_file_lock_reentrant(self):
+        """
+        Test the store can be used while its lock is held
+        """
+        store = FileTokenStore(self.path)
+        with store.lock("key"):
+            store.set("key", "token")
+            self.assertEqual(store.get("key"), "token")
+
+    def test_file_async_lock_polls(self):
+        """
+        Test the async lock waits for another process without blocking the event loop
+        """
+        holder = FileTokenStore(self.path)
+        store = FileTokenStore(self.path)
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        async def log_in():
+            async with store.async_lock("key"):
+                store.set("key", "token")
+
+        async def main():
+            ticker = asyncio.ensure_future(tick())
+            with holder.lock("key"):
+                waiter = asyncio.ensure_future(log_in())
+                await asyncio.sleep(0.2)
+                self.assertFalse(waiter.done())
+            await waiter
+            ticker.cancel()
+
+        asyncio.run(main())
+        self.assertGreater(len(ticks), 5)
+        self.assertEqual(holder.get("key"), "token")
+
+    def test_file_async_lock_excludes_threads(self):
+        """
+        Test the async lock and the lock of a thread of the same process exclude each other
+        """
+        store = FileTokenStore(self.path)
+        events = []
+
+        def thread_log_in():
+            with store.lock("key"):
+                events.append("thread in")
+                time.sleep(0.1)
+                events.append("thread out")
+
+        async def log_in():
+            async with store.async_lock("key"):
+                events.append("task in")
+                await asyncio.sleep(0.1)
+                store.set("key", "token")
+                events.append("task out")
+
+        async def main():
+            thread = threading.Thread(target=thread_log_in)
+            thread.start()
+            await asyncio.sleep(0.02)
+            await log_in()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+            thread = threading.Thread(target=thread_log_in)
+            task = asyncio.ensure_future(log_in())
+            await asyncio.sleep(0.02)
+            thread.start()
+            await task
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+        asyncio.run(main())
+        self.assertEqual(events, [
+            "thread in", "thread out", "task in", "task out", "task in", "task out", "thread in", "thread out",
+        ])
+
+
+class TestClientsWithTokenStore(MockServerMixin, unittest.IsolatedAsyncioTestCase):
+    """
+    Test clients sharing a token store log in once
+    """
+    def setUp(self):
+        """
+        Reset the request counters and create a store file
+        """
+        self.httpd.hits.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tokens.json")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+        """
+        self.directory.cleanup()
+
+    def make_client(self, store):
+        """
+        Create a sync client using `store`
+        """
+        return ClientSync(
+            email="test@example.com", password="password", network=self.network, token_store=store
+        )
+
+    def test_workers_log_in_once(self):
+        """
+        Test workers with their own store objects on one file log in once
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: self.make_client(FileTokenStore(self.path)), range(8)))
+
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 1)
+        self.assertTrue(all(client.token == "mock_token_12345" for client in clients))
+        self.assertEqual(
+            FileTokenStore(self.path).get(token_key("test@example.com", self.network)), "mock_token_12345"
+        )
+
+    def test_expired_token_ignored(self):
+        """
+        Test an expired stored token is replaced by a login
+        """
+        store = InMemoryTokenStore()
+        store.set(token_key("test@example.com", self.network), make_jwt(time.time() - 10))
+
+        client = self.make_client(store)
+        self.assertEqual(client.token, "mock_token_12345")
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 1)
+
+    def test_refresh_written_back(self):
+        """
+        Test a refreshed token is written back and adopted by other clients
+        """
+        store = InMemoryTokenStore()
+        first = self.make_client(store)
+        second = self.make_client(store)
+
+        first.refresh_token()
+        key = token_key("test@example.com", self.network)
+        self.assertEqual(store.get(key), "mock_refreshed_token_12345")
+
+        self.assertTrue(second._handle_token_expired(second.headers["Authorization"]))
+        self.assertEqual(second.token, "mock_refreshed_token_12345")
+        self.assertEqual(self.httpd.hits["PATCH /api/auth/refresh"], 1)
+
+    async def test_async_uses_stored_token(self):
+        """
+        Test the async client starts with the stored token
+        """
+        store = InMemoryTokenStore()
+        store.set(token_key("test@example.com", self.network), "mock_token_12345")
+
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token_store=store
+        ) as client:
+            self.assertEqual(await client.get_balance(), 1000)
+            self.assertEqual(client.token, "mock_token_12345")
+        self.assertEqual(self.httpd.hits["POST /api/auth/login"], 0)
+
+    async def test_async_clients_log_in_once(self):
+        """
+        Test concurrent async clients sharing an in-memory or file store log in once per store
+        """
+        for store in (InMemoryTokenStore(), FileTokenStore(self.path)):
+            self.httpd.hits.clear()
+            clients = [
+                AsyncClient(email="test@example.com", password="password", network=self.network, token_store=store)
+                for _ in range(10)
+            ]
+            await asyncio.gather(*(client.initialize() for client in clients))
+            for client in clients:
+                await client.close()
+
+            self.assertEqual(self.httpd.hits["POST /api/auth/login"], 1)
+            self.assertTrue(all(client.token == "mock_token_12345" for client in clients))
+
+    async def test_async_store_off_loop(self):
+        """
+        Test the async client waits for a file store locked by another process without blocking the event loop
+        """
+        holder = FileTokenStore(self.path)
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        def hold():
+            with holder.lock("key"):
+                locked.set()
+                time.sleep(0.3)
+
+        async with AsyncClient(
+            email="test@example.com", password="password", network=self.network, token="mock_token_12345",
+            token_store=FileTokenStore(self.path),
+        ) as client:
+            locked = threading.Event()
+            thread = threading.Thread(target=hold)
+            thread.start()
+            locked.wait()
+            ticker = asyncio.ensure_future(tick())
+            self.assertTrue(await client._handle_token_expired(client.headers["Authorization"]))
+            ticker.cancel()
+            thread.join()
+
+        self.assertGreater(len(ticks), 10)
+        self.assertEqual(client.token, "mock_refreshed_token_12345")
+        self.assertEqual(
+            holder.get(token_key("test@example.com", self.network)), "mock_refreshed_token_12345"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
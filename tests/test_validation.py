@@ -0,0 +1,64 @@
+"""
+Tests for the send path validation helpers
+"""
+import os
+import sys
+import unittest
+
+from pydantic import ValidationError
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.mock_server import MockServerMixin  # noqa: E402
+from eskiz.client.sync import ClientSync  # noqa: E402
+from eskiz.client.validation import send_sms_files, prepare_batch_messages  # noqa: E402
+
+
+class TestValidationHelpers(unittest.TestCase):
+    """
+    Test cases for the validated and fast paths
+    """
+    def test_send_files_match(self):
+        """
+        Test both paths build the same multipart fields
+        """
+        args = (998901234567, "Test message", "4546", "")
+        self.assertEqual(send_sms_files(*args, validate=True), send_sms_files(*args, validate=False))
+
+    def test_batch_messages_coerced(self):
+        """
+        Test batch messages are coerced in one pass and keep extra keys
+        """
+        messages = [{"user_sms_id": 1, "to": "998901234567", "text": "Test", "extra": 1}]
+        self.assertEqual(
+            prepare_batch_messages(messages, validate=True),
+            [{"user_sms_id": "1", "to": 998901234567, "text": "Test", "extra": 1}],
+        )
+
+    def test_batch_messages_invalid(self):
+        """
+        Test an invalid batch message is only rejected when validation is asked for
+        """
+        messages = [{"user_sms_id": "msg1", "text": "Test"}]
+        with self.assertRaises(ValidationError):
+            prepare_batch_messages(messages, validate=True)
+        self.assertIs(prepare_batch_messages(messages), messages)
+
+
+class TestClientWithoutValidation(MockServerMixin, unittest.TestCase):
+    """
+    Test the client sends with validation turned off
+    """
+    def test_send_sms(self):
+        """
+        Test send_sms with validate=False
+        """
+        with ClientSync(
+            email="test@example.com", password="password", network=self.network, validate=False
+        ) as client:
+            self.assertEqual(client.send_sms(998901234567, "Test message").id, "mock-message-id-12345")
+
+
+if __name__ == "__main__":
+    unittest.main()
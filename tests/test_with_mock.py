@@ -111,6 +111,24 @@ class TestWithMockServer(unittest.TestCase):
         self.assertEqual(response.data.result[0].to, "998901234567")
         self.assertEqual(response.data.result[1].to, "998901234568")
 
+    def test_context_manager_closes_pool(self):
+        """
+        Test the client closes its pooled session on exit
+        """
+        with ClientSync(
+            email="test@example.com",
+            password="password",
+            network=f"http://localhost:{self.mock_server_port}",
+            pool_size=2,
+        ) as client:
+            self.assertEqual(client.get_balance(), 1000)
+            adapter = client.client.session.get_adapter(client.network)
+            self.assertEqual(adapter._pool_maxsize, 2)
+
+        with patch.object(client.client.session, "close") as mock_close:
+            client.close()
+            mock_close.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()